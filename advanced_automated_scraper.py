@@ -9,15 +9,17 @@ from urllib.parse import urljoin
 import random
 from pathlib import Path
 import logging
+from http_clients import get_image_session, DEFAULT_IMAGE_POOL_SIZE
 
 # Configure logging
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class AdvancedAutomatedScraper:
-    def __init__(self, max_products_per_category=150):
+    def __init__(self, max_products_per_category=150, image_pool_size=DEFAULT_IMAGE_POOL_SIZE):
         self.max_products = max_products_per_category
         self.driver = None
+        self.image_session = get_image_session(pool_size=image_pool_size)
         self.products = []
         self.setup_directories()
         
@@ -229,7 +231,7 @@ class AdvancedAutomatedScraper:
             filepath = category_dir / filename
             
             # Download image
-            response = requests.get(image_url, stream=True, timeout=30)
+            response = self.image_session.get(image_url, stream=True, timeout=30)
             if response.status_code == 200:
                 with open(filepath, 'wb') as f:
                     for chunk in response.iter_content(chunk_size=8192):
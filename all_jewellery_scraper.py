@@ -11,15 +11,96 @@ from urllib.parse import urljoin, urlparse
 from bs4 import BeautifulSoup
 from pathlib import Path
 import re
+from functools import lru_cache
+from http_clients import get_image_session, DEFAULT_IMAGE_POOL_SIZE
+from image_pipeline import ImagePipeline, DEFAULT_IMAGE_WORKERS
+from image_store import get_image_store
+from image_variants import get_image_processor
+from rate_limiter import get_rate_limiter
+from response_cache import get_response_cache
+from clearance_pool import get_clearance_pool
+from listing_parser import LinkSelector, site_url, strip_query
+from structured_data import extract_structured_fields
+from selector_profiler import get_selector_profiler
+from page_templates import classify_page
+from url_predictor import get_url_predictor
+from image_urls import canonical_image_urls
+
+# Multiple selectors to catch all possible product links
+LINK_SELECTORS = (
+    'a[href*=".html"]',                    # All HTML links
+    'a[href*="/jewellery/"]',              # Jewellery category links
+    'a[href*="ring"]', 'a[href*="earring"]',  # Specific jewelry types
+    'a[href*="necklace"]', 'a[href*="pendant"]',
+    'a[href*="bracelet"]', 'a[href*="chain"]',
+    'a[href*="bangles"]', 'a[href*="mangalsutra"]',
+    '.product-item a', '.pdt-item a',      # Product containers
+    '.category-link', '.sub-category a',   # Category links
+    'a[title*="View"]', 'a[title*="Shop"]' # Action links
+)
+PAGINATION_SELECTOR = 'a[href*="page="], a[href*="p="], .pagination a, .load-more'
+PAGE_LINKS = LinkSelector({'html': 'a[href*=".html"]'})
+SKIP_LINK_PATTERN = re.compile(r'login|register|cart|checkout|account|contact')
+# Fields that, once filled from structured data, make the DOM pass unnecessary
+STRUCTURED_REQUIRED_FIELDS = ('name', 'price', 'image_urls')
+
+@lru_cache(maxsize=16)
+def listing_links(selectors):
+    """LinkSelector scanning the given link selectors (one group each) and pagination in one pass"""
+    groups = {selector: selector for selector in selectors}
+    groups['pagination'] = PAGINATION_SELECTOR
+    return LinkSelector(groups)
+
+@lru_cache(maxsize=65536)
+def strip_fragment(url):
+    """URL without its fragment"""
+    return url.split('#')[0]
+
+@lru_cache(maxsize=65536)
+def clean_link(href, base_url):
+    """Absolute URL without query parameters and fragments, memoized across pages"""
+    if href.startswith('/'):
+        href = urljoin(base_url, href)
+    elif not href.startswith('http'):
+        href = urljoin(base_url, '/' + href)
+    return strip_fragment(strip_query(href))
 
 class AllJewelleryScraper:
     """Comprehensive scraper for all-jewellery and ready-to-ship pages"""
     
-    def __init__(self):
-        self.scraper = cloudscraper.create_scraper(
-            browser={'browser': 'chrome', 'platform': 'linux', 'desktop': True}
-        )
+    def __init__(self, image_pool_size=DEFAULT_IMAGE_POOL_SIZE, rate_limiter=None, response_cache=None,
+                 selector_profiler=None, adaptive_selectors=False, url_predictor=None, drop_predicted_non_products=False,
+                 image_workers=DEFAULT_IMAGE_WORKERS, image_queue_size=None, image_store=None,
+                 image_processor=None, process_images=True, image_size=None):
+        # Longest side in pixels to pick among resized copies of a photo (None: the largest copy)
+        self.image_size = image_size
+        # Cached records are only reused by a scraper picking the same image size
+        self.record_name = 'all_jewellery' if image_size is None else f"all_jewellery@{image_size}px"
+        # Shared clearance pool: challenge solved once, per-thread sessions reuse it
+        self.scraper = get_clearance_pool()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.response_cache = response_cache or get_response_cache()
+        self.image_session = get_image_session(pool_size=image_pool_size)
+        # Images download in the background while the next product page is fetched
+        self.images = ImagePipeline(workers=image_workers, max_queued=image_queue_size)
+        # Image bytes are stored once by content hash; images/ holds links to them
+        self.image_store = image_store or get_image_store()
+        # Thumbnails / web-sized variants are made in worker processes as images land
+        self.image_processor = (image_processor or get_image_processor()) if process_images else None
+        if self.image_processor is not None:
+            self.image_store.processor = self.image_processor
+        # Per-selector hit rate and cost; adaptive reorders and prunes the fallback lists
+        self.selector_profiler = selector_profiler or get_selector_profiler()
+        if adaptive_selectors:
+            self.selector_profiler.adaptive = True
         self.base_url = "https://www.pcjeweller.com"
+        # Page template -> extractor; only pages with product markers or a product URL are parsed,
+        # listing, challenge and unknown (category / CMS) pages are skipped and counted
+        self.page_extractors = {'product': self.extract_product_page}
+        self.skipped_pages = {}
+        # Product-vs-other guess from the URL alone, so detail fetches go to likely products first
+        self.url_predictor = url_predictor or get_url_predictor()
+        self.drop_predicted_non_products = drop_predicted_non_products
         self.setup_directories()
         
     def setup_directories(self):
@@ -38,58 +119,33 @@ class AllJewelleryScraper:
         print(f"   URL: {url}")
         
         try:
-            response = self.scraper.get(url, timeout=30)
+            response = self.response_cache.fetch(self.scraper, url, rate_limiter=self.rate_limiter, timeout=30)
             if response.status_code != 200:
                 print(f"❌ Failed to access {url} - Status: {response.status_code}")
                 return []
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # All selectors share one pass, so only their hit rate is profiled
+            selectors = tuple(self.selector_profiler.order('all_jewellery.links', LINK_SELECTORS, reorder=False))
+            links = listing_links(selectors).scan(response.content)
             all_links = set()
             
-            # Multiple selectors to catch all possible product links
-            selectors = [
-                'a[href*=".html"]',                    # All HTML links
-                'a[href*="/jewellery/"]',              # Jewellery category links
-                'a[href*="ring"]', 'a[href*="earring"]',  # Specific jewelry types
-                'a[href*="necklace"]', 'a[href*="pendant"]',
-                'a[href*="bracelet"]', 'a[href*="chain"]',
-                'a[href*="bangles"]', 'a[href*="mangalsutra"]',
-                '.product-item a', '.pdt-item a',      # Product containers
-                '.category-link', '.sub-category a',   # Category links
-                'a[title*="View"]', 'a[title*="Shop"]' # Action links
-            ]
-            
             for selector in selectors:
-                try:
-                    links = soup.select(selector)
-                    for link in links:
-                        href = link.get('href')
-                        if href:
-                            # Clean and normalize URL
-                            if href.startswith('/'):
-                                href = urljoin(self.base_url, href)
-                            elif not href.startswith('http'):
-                                href = urljoin(self.base_url, '/' + href)
-                            
-                            # Remove query parameters and fragments
-                            clean_href = href.split('?')[0].split('#')[0]
-                            
-                            # Filter for relevant links
-                            if (clean_href.endswith('.html') and 
-                                self.base_url in clean_href and 
-                                not any(skip in clean_href.lower() for skip in 
-                                       ['login', 'register', 'cart', 'checkout', 'account', 'contact'])):
-                                all_links.add(clean_href)
-                except Exception as e:
-                    print(f"⚠️ Error with selector {selector}: {e}")
-                    continue
+                hit = False
+                for href in links[selector]:
+                    clean_href = clean_link(href, self.base_url)
+                    
+                    # Filter for relevant links
+                    if (clean_href.endswith('.html') and 
+                        self.base_url in clean_href and 
+                        not SKIP_LINK_PATTERN.search(clean_href.lower())):
+                        all_links.add(clean_href)
+                        hit = True
+                self.selector_profiler.record('all_jewellery.links', selector, hit, 0.0)
             
             # Also look for pagination and load more links
             try:
                 # Check for pagination
-                pagination_links = soup.select('a[href*="page="], a[href*="p="], .pagination a, .load-more')
-                for link in pagination_links:
-                    href = link.get('href')
+                for href in links['pagination']:
                     if href:
                         if href.startswith('/'):
                             href = urljoin(self.base_url, href)
@@ -103,19 +159,12 @@ class AllJewelleryScraper:
                             
                             print(f"   📄 Checking page {page_num}: {page_url}")
                             try:
-                                page_response = self.scraper.get(page_url, timeout=20)
+                                page_response = self.response_cache.fetch(self.scraper, page_url, rate_limiter=self.rate_limiter, timeout=20)
                                 if page_response.status_code == 200:
-                                    page_soup = BeautifulSoup(page_response.content, 'html.parser')
-                                    page_links = page_soup.select('a[href*=".html"]')
-                                    
                                     page_count = 0
-                                    for page_link in page_links:
-                                        page_href = page_link.get('href')
+                                    for page_href in PAGE_LINKS.scan(page_response.content)['html']:
                                         if page_href:
-                                            if page_href.startswith('/'):
-                                                page_href = urljoin(self.base_url, page_href)
-                                            
-                                            clean_href = page_href.split('?')[0].split('#')[0]
+                                            clean_href = strip_fragment(strip_query(site_url(page_href, self.base_url)))
                                             if (clean_href.endswith('.html') and 
                                                 self.base_url in clean_href):
                                                 all_links.add(clean_href)
@@ -126,8 +175,6 @@ class AllJewelleryScraper:
                                         break  # No more products on this page
                                 else:
                                     break  # Page doesn't exist
-                                
-                                time.sleep(2)  # Delay between pages
                             except:
                                 break  # Stop if page fails
                             
@@ -144,13 +191,31 @@ class AllJewelleryScraper:
             return []
     
     def extract_product_details(self, product_url):
-        """Extract detailed product information"""
+        """Extract detailed product information, skipping pages that are not product pages"""
         try:
-            response = self.scraper.get(product_url, timeout=30)
+            response = self.response_cache.fetch(self.scraper, product_url, rate_limiter=self.rate_limiter, timeout=30)
             if response.status_code != 200:
                 return None
             
-            soup = BeautifulSoup(response.content, 'html.parser')
+            # Route on a cheap look at the page template before any parsing
+            template = classify_page(response.content, product_url, getattr(response, 'page_kind', None))
+            extractor = self.page_extractors.get(template)
+            if extractor is None:
+                self.skipped_pages[product_url] = template
+                return None
+            return extractor(product_url, response)
+            
+        except Exception as e:
+            print(f"❌ Error extracting product details from {product_url}: {str(e)}")
+            return None
+    
+    def extract_product_page(self, product_url, response):
+        """Extract a product record from a product page"""
+        try:
+            # Unchanged page (cache hit or 304): reuse the record extracted last time
+            previous = self.response_cache.load_record(product_url, self.record_name, response)
+            if previous is not None:
+                return previous
             
             product = {
                 'name': '',
@@ -171,18 +236,57 @@ class AllJewelleryScraper:
                 'image_urls': []
             }
             
-            # Extract name
+            # Structured data first: JSON-LD, OpenGraph and embedded gallery JSON
+            structured = extract_structured_fields(response.content, self.base_url)
+            keywords = structured.pop('keywords', '').lower()
+            product.update(structured)
+            
+            # Try to extract material info from keywords
+            if 'gold' in keywords:
+                product['metal'] = product['metal'] or 'Gold'
+            elif 'silver' in keywords:
+                product['metal'] = product['metal'] or 'Silver'
+            elif 'diamond' in keywords:
+                product['stone'] = 'Diamond'
+            
+            # DOM selectors only for what the structured data left empty
+            if not all(product[field] for field in STRUCTURED_REQUIRED_FIELDS):
+                self.extract_dom_fields(response.content, product)
+            
+            # JSON-LD, gallery and alt-text images often repeat one photo at several sizes
+            product['image_urls'] = canonical_image_urls(product['image_urls'], size=self.image_size)
+            
+            # Try to extract from URL
+            if not product['name']:
+                url_parts = product_url.split('/')[-1].replace('.html', '').replace('-', ' ')
+                product['name'] = url_parts.title()
+            
+            if product['name']:
+                self.response_cache.save_record(product_url, self.record_name, response, product)
+                return product
+            return None
+            
+        except Exception as e:
+            print(f"❌ Error extracting product details from {product_url}: {str(e)}")
+            return None
+    
+    def extract_dom_fields(self, content, product):
+        """Fill name, price and images from the page DOM where structured data had none"""
+        soup = BeautifulSoup(content, 'html.parser')
+
+        # Extract name
+        if not product['name']:
             name_selectors = [
-                'h1', '.product-name', '.pdt-name', 
+                'h1', '.product-name', '.pdt-name',
                 '.product-title', '.item-name', 'title'
             ]
-            for selector in name_selectors:
-                elem = soup.select_one(selector)
-                if elem and elem.get_text(strip=True):
-                    product['name'] = elem.get_text(strip=True)
-                    break
-            
-            # Extract price information
+            elem = self.selector_profiler.select_first(soup, 'all_jewellery.name', name_selectors,
+                                                       accept=lambda e: e.get_text(strip=True))
+            if elem:
+                product['name'] = elem.get_text(strip=True)
+
+        # Extract price information
+        if not product['price']:
             price_patterns = [
                 r'₹\s*[\d,]+',
                 r'Rs\.?\s*[\d,]+',
@@ -190,7 +294,7 @@ class AllJewelleryScraper:
                 r'\$\s*[\d,]+',
                 r'Price:?\s*₹?\s*[\d,]+'
             ]
-            
+
             page_text = soup.get_text()
             for pattern in price_patterns:
                 matches = re.findall(pattern, page_text)
@@ -199,8 +303,9 @@ class AllJewelleryScraper:
                     if len(matches) > 1:
                         product['original_price'] = matches[1].strip()
                     break
-            
-            # Extract images
+
+        # Extract images
+        if not product['image_urls']:
             img_selectors = [
                 'img[src*="catalog/product"]',
                 'img[src*="uploads"]',
@@ -212,9 +317,8 @@ class AllJewelleryScraper:
                 'img[alt*="Necklace"]', 'img[alt*="Pendant"]',
                 'img[alt*="Bracelet"]', 'img[alt*="Chain"]'
             ]
-            
-            for selector in img_selectors:
-                images = soup.select(selector)
+
+            for images in self.selector_profiler.select_each(soup, 'all_jewellery.images', img_selectors):
                 for img in images:
                     src = img.get('src') or img.get('data-src') or img.get('data-original')
                     if src:
@@ -222,90 +326,25 @@ class AllJewelleryScraper:
                             src = 'https:' + src
                         elif src.startswith('/'):
                             src = urljoin(self.base_url, src)
-                        
-                        if src not in product['image_urls'] and any(keyword in src.lower() for keyword in 
+
+                        if src not in product['image_urls'] and any(keyword in src.lower() for keyword in
                                                                    ['catalog', 'upload', 'product', 'jewelry', 'jewellery']):
                             product['image_urls'].append(src)
-            
-            # Extract additional details from meta tags
-            meta_tags = soup.select('meta')
-            for meta in meta_tags:
-                name = meta.get('name', '').lower()
-                content = meta.get('content', '')
-                
-                if name in ['description', 'og:description'] and not product['description']:
-                    product['description'] = content[:400]
-                elif name == 'keywords':
-                    # Try to extract material info from keywords
-                    keywords = content.lower()
-                    if 'gold' in keywords:
-                        product['metal'] = 'Gold'
-                    elif 'silver' in keywords:
-                        product['metal'] = 'Silver'
-                    elif 'diamond' in keywords:
-                        product['stone'] = 'Diamond'
-            
-            # Extract specifications from structured data
-            scripts = soup.select('script[type="application/ld+json"]')
-            for script in scripts:
-                try:
-                    data = json.loads(script.get_text())
-                    if isinstance(data, dict):
-                        if 'name' in data and not product['name']:
-                            product['name'] = data['name']
-                        if 'price' in data and not product['price']:
-                            product['price'] = str(data['price'])
-                        if 'image' in data:
-                            images = data['image'] if isinstance(data['image'], list) else [data['image']]
-                            for img_url in images:
-                                if img_url not in product['image_urls']:
-                                    product['image_urls'].append(img_url)
-                except:
-                    continue
-            
-            # Try to extract from URL
-            if not product['name']:
-                url_parts = product_url.split('/')[-1].replace('.html', '').replace('-', ' ')
-                product['name'] = url_parts.title()
-            
-            return product if product['name'] else None
-            
-        except Exception as e:
-            print(f"❌ Error extracting product details from {product_url}: {str(e)}")
-            return None
-    
+
+        return product
+
     def download_image(self, image_url, product_name, img_index):
         """Download product image"""
         try:
             # Create safe filename
-            name_safe = re.sub(r'[^\w\s-]', '', product_name[:40]).strip().replace(' ', '_')
-            
-            # Get file extension
-            ext = 'jpg'
-            if '.' in image_url:
-                ext = image_url.split('.')[-1].split('?')[0].lower()
-                if ext not in ['jpg', 'jpeg', 'png', 'webp', 'gif']:
-                    ext = 'jpg'
-            
-            filename = f"{name_safe}_{img_index}.{ext}"
-            filepath = self.images_dir / filename
-            
-            # Skip if exists
-            if filepath.exists():
-                return str(filepath)
-            
-            # Download
-            headers = {
-                'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
-                'Referer': 'https://www.pcjeweller.com/'
-            }
-            
-            response = requests.get(image_url, stream=True, timeout=20, headers=headers)
-            if response.status_code == 200:
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
+            name_safe = re.sub(r'[^\w\s-]', '', product_name[:40]).strip().replace(' ', '_') or 'product'
+            
+            # Download over the shared keep-alive session; URLs already in the store are not fetched again
+            filepath, result = self.image_store.save(
+                self.image_session, image_url, self.images_dir, f"{name_safe}_{img_index}",
+                rate_limiter=self.rate_limiter, timeout=20, cache=self.response_cache
+            )
+            if result:
                 return str(filepath)
             
         except Exception as e:
@@ -330,7 +369,6 @@ class AllJewelleryScraper:
         
         all_links = {}
         all_products = []
-        images_downloaded = 0
         
         # Phase 1: Extract all links
         print("🔍 PHASE 1: EXTRACTING ALL LINKS")
@@ -346,7 +384,6 @@ class AllJewelleryScraper:
                 json.dump(links, f, indent=2, ensure_ascii=False)
             
             print(f"💾 Saved {len(links)} links to {links_file}")
-            time.sleep(5)
         
         # Combine all unique links
         unique_links = set()
@@ -356,13 +393,26 @@ class AllJewelleryScraper:
         unique_links = list(unique_links)
         print(f"\\n✅ Total unique links across all pages: {len(unique_links)}")
         
+        # Likely products first, predicted category / CMS pages last; with drop_predicted_non_products
+        # only the confident, keyword-less misses are left out
+        likely_products, predicted_other = self.url_predictor.partition(unique_links)
+        print(f"🔮 Predicted {len(likely_products)} product links, {len(predicted_other)} other pages")
+        if self.drop_predicted_non_products:
+            kept_other = [url for url in predicted_other if not self.url_predictor.droppable(url)]
+            print(f"🔮 Dropping {len(predicted_other) - len(kept_other)} confident non-product links")
+            detail_links = likely_products + kept_other
+        else:
+            detail_links = likely_products + predicted_other
+        
         # Save combined links
         combined_file = self.json_dir / "all_combined_links.json"
         with open(combined_file, 'w', encoding='utf-8') as f:
             json.dump({
                 'total_count': len(unique_links),
                 'pages': all_links,
-                'all_unique_links': unique_links
+                'all_unique_links': unique_links,
+                'predicted_products': likely_products,
+                'predicted_other': predicted_other
             }, f, indent=2, ensure_ascii=False)
         
         print(f"💾 Combined links saved to {combined_file}")
@@ -370,35 +420,32 @@ class AllJewelleryScraper:
         # Phase 2: Extract product details and images
         print(f"\\n🔍 PHASE 2: EXTRACTING PRODUCT DETAILS AND IMAGES")
         print("=" * 50)
-        print(f"📦 Processing {len(unique_links)} unique product links...")
+        print(f"📦 Processing {len(detail_links)} unique product links...")
         
-        for i, product_url in enumerate(unique_links):
-            print(f"\\n🔄 Product {i+1}/{len(unique_links)}: ", end='', flush=True)
+        for i, product_url in enumerate(detail_links):
+            print(f"\\n🔄 Product {i+1}/{len(detail_links)}: ", end='', flush=True)
             
             # Extract product details
             product = self.extract_product_details(product_url)
             if product:
                 print(f"✅ {product['name'][:50]}...")
                 
-                # Download images
+                # Queue images
                 for j, img_url in enumerate(product['image_urls'][:5]):  # Max 5 images per product
-                    downloaded_path = self.download_image(img_url, product['name'], j)
-                    if downloaded_path:
-                        images_downloaded += 1
-                    time.sleep(0.3)  # Small delay between images
+                    self.images.submit(self.download_image, img_url, product['name'], j)
                 
                 all_products.append(product)
                 
                 # Save progress every 50 products
                 if len(all_products) % 50 == 0:
                     self.save_progress(all_products, f"progress_{len(all_products)}")
-                    print(f"\\n💾 Progress saved: {len(all_products)} products, {images_downloaded} images")
+                    print(f"\\n💾 Progress saved: {len(all_products)} products, "
+                          f"{self.images.stats()['succeeded']} images ({self.images.pending()} queued)")
+            elif product_url in self.skipped_pages:
+                print(f"⏭️  Skipped {self.skipped_pages[product_url]} page")
             else:
                 print("❌ Failed to extract")
             
-            # Respectful delay
-            time.sleep(random.uniform(2, 4))
-            
             # Optional: Limit for testing (remove for full scraping)
             # if len(all_products) >= 100:
             #     print(f"\\n⚠️ Stopped at {len(all_products)} products for testing")
@@ -408,12 +455,22 @@ class AllJewelleryScraper:
         print(f"\\n💾 PHASE 3: SAVING FINAL RESULTS")
         print("=" * 40)
         
+        # Let queued image downloads finish before counting them
+        self.images.close()
+        self.image_store.write_manifest()
+        if self.image_processor is not None:
+            self.image_processor.close()
+        self.scraper.close()
+        images_downloaded = self.images.stats()['succeeded']
         self.save_final_results(all_products, images_downloaded)
+        self.selector_profiler.log_summary()
+        self.selector_profiler.save()
         
         print(f"\\n🎉 SCRAPING COMPLETED SUCCESSFULLY!")
         print(f"📊 Final Statistics:")
         print(f"   🔗 Total unique links: {len(unique_links)}")
         print(f"   📦 Products extracted: {len(all_products)}")
+        print(f"   ⏭️  Non-product pages skipped: {len(self.skipped_pages)}")
         print(f"   📷 Images downloaded: {images_downloaded}")
         print(f"   📁 Results saved in: {self.base_dir}")
         
@@ -0,0 +1,239 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+import cloudscraper
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STATE_FILE = "cf_clearance.json"
+DEFAULT_BROWSER = {'browser': 'chrome', 'platform': 'linux', 'desktop': True}
+WARMUP_URL = "https://www.pcjeweller.com/"
+CLEARANCE_COOKIE = 'cf_clearance'
+
+class ClearanceSessionPool:
+    """Cloudflare clearance solved once, shared by every worker thread
+
+    A master cloudscraper session solves the challenge; its cookies and
+    user agent are persisted to disk with an expiry and copied into one
+    session per thread. A background thread re-solves shortly before the
+    clearance lapses, so workers never block on a challenge mid-crawl.
+
+    The pool is session-like: pool.get(url, **kwargs) runs on the calling
+    thread's own session, so it can stand in wherever a cloudscraper
+    session was used.
+
+    Only a warm-up that returned 200 and set cf_clearance counts as solved.
+    Failed warm-ups are retried with backoff (solve_attempts, retry_delay)
+    and never written to the state file; until a solve succeeds, threads
+    get plain sessions and the pool tries again after retry_after seconds.
+    """
+
+    def __init__(self, state_file=DEFAULT_STATE_FILE, browser=None, delay=None,
+                 warmup_url=WARMUP_URL, ttl=1800, refresh_margin=300,
+                 solve_attempts=3, retry_delay=5.0, retry_after=300):
+        self.state_file = Path(state_file)
+        self.browser = browser or DEFAULT_BROWSER
+        self.delay = delay
+        self.warmup_url = warmup_url
+        self.ttl = ttl
+        self.refresh_margin = refresh_margin
+        self.solve_attempts = solve_attempts
+        self.retry_delay = retry_delay
+        self.retry_after = retry_after
+        self.state = None
+        self.generation = 0
+        self.lock = threading.Lock()
+        # Signalled when a solve started by _ensure_state finishes, whatever its outcome
+        self.solved = threading.Condition(self.lock)
+        self.solving = False
+        self.retry_at = 0.0
+        self.local = threading.local()
+        self.sessions = []
+        self.refresher = None
+        self.stop_event = threading.Event()
+
+    def _create_scraper(self):
+        kwargs = {'browser': self.browser}
+        if self.delay is not None:
+            kwargs['delay'] = self.delay
+        return cloudscraper.create_scraper(**kwargs)
+
+    def _load_state(self):
+        """Clearance saved by a previous run, if it has not expired"""
+        try:
+            with open(self.state_file, 'r', encoding='utf-8') as f:
+                state = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return None
+        if state.get('expires_at', 0) - self.refresh_margin <= time.time():
+            return None
+        return state
+
+    def _solve(self):
+        """Solve the challenge on a fresh master session and persist the result
+
+        Returns None, leaving the state file alone, when no attempt got a
+        200 with a cf_clearance cookie.
+        """
+        for attempt in range(self.solve_attempts):
+            if attempt and self.stop_event.wait(self.retry_delay * 2 ** (attempt - 1)):
+                return None
+            master = self._create_scraper()
+            try:
+                try:
+                    response = master.get(self.warmup_url, timeout=60)
+                except Exception as e:
+                    logger.warning(f"⚠️  Clearance warm-up failed: {e}")
+                    continue
+                clearance = [cookie for cookie in master.cookies if cookie.name == CLEARANCE_COOKIE]
+                if response.status_code != 200 or not clearance:
+                    logger.warning(f"⚠️  Clearance warm-up returned {response.status_code}"
+                                   f"{'' if clearance else ' without a cf_clearance cookie'}")
+                    continue
+                logger.info(f"🛡️  Clearance solved ({response.status_code})")
+                return self._save_state(master)
+            finally:
+                master.close()
+        logger.warning(f"⚠️  No clearance after {self.solve_attempts} attempts")
+        return None
+
+    def _save_state(self, master):
+        """Clearance state of a solved master session, written to the state file"""
+        expires_at = time.time() + self.ttl
+        cookies = []
+        for cookie in master.cookies:
+            cookies.append({
+                'name': cookie.name, 'value': cookie.value,
+                'domain': cookie.domain, 'path': cookie.path, 'expires': cookie.expires
+            })
+            if cookie.name == CLEARANCE_COOKIE and cookie.expires:
+                expires_at = min(expires_at, cookie.expires)
+
+        state = {
+            'user_agent': master.headers.get('User-Agent'),
+            'cookies': cookies,
+            'expires_at': expires_at
+        }
+        try:
+            with open(self.state_file, 'w', encoding='utf-8') as f:
+                json.dump(state, f, indent=2)
+        except OSError as e:
+            logger.warning(f"⚠️  Could not persist clearance: {e}")
+        return state
+
+    def _ensure_state(self):
+        """(state or None, generation); the first caller solves outside the lock while others wait for it"""
+        with self.lock:
+            while self.solving and self.state is None:
+                self.solved.wait()
+            if self.state is not None or time.time() < self.retry_at:
+                return self.state, self.generation
+            self.solving = True
+        state = None
+        try:
+            state = self._load_state()
+            if state is not None:
+                logger.info("🛡️  Reusing saved clearance")
+            else:
+                state = self._solve()
+        finally:
+            with self.lock:
+                self.solving = False
+                if state is not None:
+                    self.state = state
+                    self.generation += 1
+                    self._start_refresher()
+                else:
+                    self.retry_at = time.time() + self.retry_after
+                self.solved.notify_all()
+        with self.lock:
+            return self.state, self.generation
+
+    def _start_refresher(self):
+        """Background thread that re-solves before the clearance lapses (lock held)"""
+        if self.refresher is not None:
+            return
+        self.refresher = threading.Thread(target=self._refresh_loop, args=(self.stop_event,),
+                                          name="clearance-refresh", daemon=True)
+        self.refresher.start()
+
+    def _refresh_loop(self, stop_event):
+        # stop_event is the one current at start; close() swaps in a fresh one for later use
+        while not stop_event.is_set():
+            current = self.state
+            if current is None:
+                return
+            wait = current['expires_at'] - self.refresh_margin - time.time()
+            if stop_event.wait(max(wait, 30)):
+                return
+            if current['expires_at'] - self.refresh_margin > time.time():
+                continue
+            state = self._solve()
+            if state is None:
+                # Keep the old clearance; the next pass retries
+                continue
+            with self.lock:
+                if stop_event.is_set():
+                    return
+                self.state = state
+                self.generation += 1
+            logger.info("🛡️  Clearance refreshed in background")
+
+    def get_session(self):
+        """The calling thread's session, carrying the current clearance cookies"""
+        state, generation = self._ensure_state()
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self._create_scraper()
+            self.local.session = session
+            self.local.generation = None
+            with self.lock:
+                self.sessions.append(session)
+        if state is not None and self.local.generation != generation:
+            if state.get('user_agent'):
+                session.headers['User-Agent'] = state['user_agent']
+            for cookie in state['cookies']:
+                session.cookies.set(
+                    cookie['name'], cookie['value'],
+                    domain=cookie['domain'], path=cookie['path'], expires=cookie['expires']
+                )
+            self.local.generation = generation
+        return session
+
+    def get(self, url, **kwargs):
+        """GET on the calling thread's session"""
+        return self.get_session().get(url, **kwargs)
+
+    def close(self):
+        """Stop the background refresher and close every thread's session
+
+        The pool stays usable: a later get_session() starts over from the
+        saved clearance.
+        """
+        self.stop_event.set()
+        if self.refresher is not None:
+            self.refresher.join(timeout=5)
+        with self.lock:
+            sessions, self.sessions = self.sessions, []
+            self.refresher = None
+            self.state = None
+            self.retry_at = 0.0
+            self.stop_event = threading.Event()
+            self.local = threading.local()
+        for session in sessions:
+            session.close()
+
+_shared_pool = None
+_shared_pool_lock = threading.Lock()
+
+def get_clearance_pool(delay=None):
+    """Return the process-wide clearance pool shared by every scraper"""
+    global _shared_pool
+    with _shared_pool_lock:
+        if _shared_pool is None:
+            _shared_pool = ClearanceSessionPool(delay=delay)
+        return _shared_pool
@@ -14,6 +14,12 @@ from fake_useragent import UserAgent
 import cloudscraper
 from concurrent.futures import ThreadPoolExecutor, as_completed
 import threading
+from http_clients import get_image_session, download_to_file, stream_get, DEFAULT_IMAGE_POOL_SIZE, SNIFF_BYTES
+from rate_limiter import get_rate_limiter
+from response_cache import get_response_cache
+from clearance_pool import get_clearance_pool
+from fetch_strategy import FetchLadder, get_browser_fetcher
+from retry_scheduler import RetryScheduler
 
 # Configure logging
 logging.basicConfig(
@@ -29,10 +35,14 @@ logger = logging.getLogger(__name__)
 class CloudflareBypasser:
     """Advanced Cloudflare bypass using multiple techniques"""
     
-    def __init__(self):
+    def __init__(self, rate_limiter=None, response_cache=None, max_workers=4, retry_scheduler=None):
         self.ua = UserAgent()
         self.session = None
         self.cloudscraper_session = None
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.response_cache = response_cache or get_response_cache()
+        self.max_workers = max_workers
+        self.retry_scheduler = retry_scheduler or RetryScheduler(base_delay=5, max_delay=60, max_attempts=3)
         self.success_count = 0
         self.fail_count = 0
         self.setup_sessions()
@@ -40,13 +50,9 @@ class CloudflareBypasser:
     def setup_sessions(self):
         """Setup multiple session types"""
         try:
-            # CloudScraper - specialized for Cloudflare bypass
-            self.cloudscraper_session = cloudscraper.create_scraper(
-                browser={
-                    'browser': 'chrome',
-                    'platform': 'linux',
-                    'desktop': True
-                },
+            # CloudScraper - shared clearance pool, challenge solved once per run
+            # (or reused from disk) instead of once per session
+            self.cloudscraper_session = get_clearance_pool(
                 delay=10  # Wait for challenge completion
             )
             logger.info("✅ CloudScraper session initialized")
@@ -55,6 +61,13 @@ class CloudflareBypasser:
             self.session = requests.Session()
             self.session.headers.update(self.get_advanced_headers())
             
+            # Cheapest first; the scoreboard reorders per URL kind as results come in
+            self.fetch_ladder = FetchLadder({
+                'requests': self._fetch_with_requests,
+                'cloudscraper': self._fetch_with_cloudscraper,
+                'browser': self._fetch_with_browser,
+            }, is_valid=self.is_real_page, rate_limiter=self.rate_limiter)
+            
         except Exception as e:
             logger.error(f"❌ Error setting up sessions: {e}")
     
@@ -78,71 +91,86 @@ class CloudflareBypasser:
             'sec-ch-ua-platform': '"Linux"'
         }
     
-    def fetch_page(self, url, method='cloudscraper', retries=3):
-        """Fetch page with advanced bypass techniques"""
+    def is_real_page(self, response):
+        """True for a 304 or a 200 carrying actual content rather than a challenge page"""
+        if response.status_code == 304:
+            return True
+        if response.status_code != 200 or getattr(response, 'page_kind', 'page') != 'page':
+            return False
+        # Real pages name the shop early on; no need to lowercase the whole body
+        head = response.content[:SNIFF_BYTES].lower()
+        return any(keyword in head for keyword in [b'jewellery', b'jewelry', b'ring', b'necklace', b'product'])
+    
+    # Rungs only wait for the rate limiter; the ladder records the outcome of the whole fetch
+    def _fetch_with_requests(self, url, headers):
+        # Regular requests with rotating headers
+        self.rate_limiter.acquire(url)
+        return stream_get(
+            self.session, url,
+            headers={**self.get_advanced_headers(), **headers},
+            timeout=30, allow_redirects=True
+        )
+    
+    def _fetch_with_cloudscraper(self, url, headers):
+        self.rate_limiter.acquire(url)
+        return stream_get(
+            self.cloudscraper_session, url,
+            headers=headers, timeout=30, allow_redirects=True
+        )
+    
+    def _fetch_with_browser(self, url, headers):
+        self.rate_limiter.acquire(url)
+        return get_browser_fetcher()(url, headers)
+    
+    def fetch_page(self, url, method=None):
+        """Fetch page with advanced bypass techniques (one attempt; see fetch_many for retries)"""
+        cached = self.response_cache.lookup(url)
+        if cached is not None:
+            logger.info(f"💾 Cache hit: {url}")
+            return BeautifulSoup(cached.content, 'html.parser')
         
-        for attempt in range(retries):
-            try:
-                logger.info(f"🔍 Attempt {attempt + 1}: Fetching {url}")
-                
-                if method == 'cloudscraper':
-                    # Use CloudScraper for Cloudflare bypass
-                    response = self.cloudscraper_session.get(
-                        url, 
-                        timeout=30,
-                        allow_redirects=True
-                    )
-                else:
-                    # Use regular requests with rotating headers
-                    headers = self.get_advanced_headers()
-                    response = self.session.get(
-                        url,
-                        headers=headers,
-                        timeout=30,
-                        allow_redirects=True
-                    )
-                
-                # Check response
-                if response.status_code == 200:
-                    # Verify we got actual content, not a challenge page
-                    content = response.text.lower()
-                    if any(keyword in content for keyword in ['jewellery', 'jewelry', 'ring', 'necklace', 'product']):
-                        self.success_count += 1
-                        logger.info(f"✅ SUCCESS: {url} (method: {method})")
-                        return BeautifulSoup(response.content, 'html.parser')
-                    else:
-                        logger.warning(f"⚠️  Got challenge/block page for {url}")
-                
-                elif response.status_code == 403:
-                    logger.warning(f"⚠️  403 Forbidden: {url}")
-                    
-                elif response.status_code == 429:
-                    logger.warning(f"⚠️  Rate limited: {url}")
-                    time.sleep(30)  # Wait longer for rate limit
-                    
-                else:
-                    logger.warning(f"⚠️  Status {response.status_code}: {url}")
-                
-            except requests.exceptions.Timeout:
-                logger.warning(f"⏰ Timeout for {url}")
-                
-            except Exception as e:
-                logger.error(f"❌ Error fetching {url}: {str(e)}")
-            
-            # Wait before retry
-            wait_time = random.uniform(5, 15) * (attempt + 1)
-            logger.info(f"⏳ Waiting {wait_time:.1f}s before retry...")
-            time.sleep(wait_time)
+        # A stale cached copy lets the server answer 304 instead of resending the page
+        conditional = self.response_cache.conditional_headers(url)
+        
+        logger.info(f"🔍 Fetching {url}")
+        method_name, response = self.fetch_ladder.fetch(url, headers=conditional, preferred=method)
+        
+        if method_name is not None and response.status_code == 304:
+            cached = self.response_cache.revalidate(url, response)
+            if cached is not None:
+                self.success_count += 1
+                logger.info(f"✅ NOT MODIFIED: {url}")
+                return BeautifulSoup(cached.content, 'html.parser')
+            method_name, response = self.fetch_ladder.fetch(url, preferred=method_name)
         
-        self.fail_count += 1
-        logger.error(f"❌ FAILED after {retries} attempts: {url}")
+        if method_name is not None and response.status_code == 200:
+            # Only real pages are cached, never challenge pages
+            self.response_cache.store(url, response)
+            self.success_count += 1
+            logger.info(f"✅ SUCCESS: {url} (method: {method_name})")
+            return BeautifulSoup(response.content, 'html.parser')
+        
+        logger.warning(f"⚠️  Every method failed for {url}")
         return None
+    
+    def fetch_many(self, urls, method=None):
+        """Fetch pages on the worker pool, yielding (url, soup) as each one finishes
+        
+        Failed pages wait in the retry queue instead of holding a worker, so
+        the rest keep flowing; soup is None once a page has used up its attempts.
+        """
+        for url, soup in self.retry_scheduler.run(urls, lambda u: self.fetch_page(u, method), self.max_workers):
+            if soup is None:
+                self.fail_count += 1
+                logger.error(f"❌ FAILED after {self.retry_scheduler.max_attempts} attempts: {url}")
+            yield url, soup
 
 class ProductScraper:
     """Main product scraping class"""
     
-    def __init__(self, max_products_per_category=150):
-        self.bypasser = CloudflareBypasser()
+    def __init__(self, max_products_per_category=150, image_pool_size=DEFAULT_IMAGE_POOL_SIZE, max_workers=4):
+        self.bypasser = CloudflareBypasser(max_workers=max_workers)
+        self.image_session = get_image_session(pool_size=image_pool_size)
         self.max_products = max_products_per_category
         self.products = []
         self.failed_urls = []
@@ -174,7 +202,7 @@ class ProductScraper:
     
     def get_product_links(self, category_url):
         """Extract product links from category page"""
-        soup = self.bypasser.fetch_page(category_url)
+        _, soup = next(self.bypasser.fetch_many([category_url]))
         if not soup:
             return []
         
@@ -215,30 +243,32 @@ class ProductScraper:
         # Try pagination for more products
         try:
             pagination_links = soup.select('a[href*="page"], .pagination a, .pager a')
+            page_hrefs = []
             for page_link in pagination_links[:3]:  # Check first 3 pages only
                 page_href = page_link.get('href')
                 if page_href and page_href not in [category_url]:
                     if page_href.startswith('/'):
                         page_href = urljoin("https://www.pcjeweller.com", page_href)
+                    page_hrefs.append(page_href)
+            
+            logger.info(f"🔍 Checking {len(page_hrefs)} pagination pages")
+            for page_href, page_soup in self.bypasser.fetch_many(page_hrefs):
+                if page_soup:
+                    for selector in selectors[:3]:  # Use fewer selectors for speed
+                        page_links = page_soup.select(selector)
+                        for link in page_links:
+                            href = link.get('href')
+                            if href:
+                                if href.startswith('/'):
+                                    href = urljoin("https://www.pcjeweller.com", href)
+                                if any(keyword in href.lower() for keyword in ['product', 'jewellery']):
+                                    product_links.add(href)
+                                    if len(product_links) >= self.max_products:
+                                        break
+                
+                if len(product_links) >= self.max_products:
+                    break
                     
-                    logger.info(f"🔍 Checking pagination: {page_href}")
-                    page_soup = self.bypasser.fetch_page(page_href)
-                    if page_soup:
-                        for selector in selectors[:3]:  # Use fewer selectors for speed
-                            page_links = page_soup.select(selector)
-                            for link in page_links:
-                                href = link.get('href')
-                                if href:
-                                    if href.startswith('/'):
-                                        href = urljoin("https://www.pcjeweller.com", href)
-                                    if any(keyword in href.lower() for keyword in ['product', 'jewellery']):
-                                        product_links.add(href)
-                                        if len(product_links) >= self.max_products:
-                                            break
-                    
-                    if len(product_links) >= self.max_products:
-                        break
-                        
         except Exception as e:
             logger.warning(f"⚠️  Error processing pagination: {e}")
         
@@ -246,9 +276,10 @@ class ProductScraper:
         logger.info(f"📦 Found {len(result)} product links")
         return result
     
-    def extract_product_data(self, product_url, category):
+    def extract_product_data(self, product_url, category, soup=None):
         """Extract data from individual product page"""
-        soup = self.bypasser.fetch_page(product_url)
+        if soup is None:
+            soup = self.bypasser.fetch_page(product_url)
         if not soup:
             return None
         
@@ -429,18 +460,17 @@ class ProductScraper:
             filename = f"{name_safe}_{img_index}.{ext}"
             filepath = category_dir / filename
             
-            # Download with timeout
-            response = requests.get(image_url, stream=True, timeout=30)
-            if response.status_code == 200:
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
+            # Download with timeout (existing files are revalidated)
+            result = download_to_file(
+                self.image_session, image_url, filepath,
+                cache=self.bypasser.response_cache, rate_limiter=self.bypasser.rate_limiter, timeout=30
+            )
+            if result == 'downloaded':
                 self.images_downloaded += 1
                 logger.info(f"📷 Downloaded image {self.images_downloaded}: {filename}")
+            if result:
                 return str(filepath)
-            else:
-                logger.warning(f"⚠️  Failed to download image: {response.status_code}")
+            logger.warning(f"⚠️  Failed to download image: {image_url}")
                 
         except Exception as e:
             logger.error(f"❌ Error downloading image {image_url}: {str(e)}")
@@ -463,17 +493,16 @@ class ProductScraper:
         
         category_products = []
         
-        # Process products one by one
-        for i, product_url in enumerate(product_links):
+        # Pages arrive as they finish; failing ones are retried in the background
+        for i, (product_url, soup) in enumerate(self.bypasser.fetch_many(product_links)):
             logger.info(f"\n📦 Product {i+1}/{len(product_links)}: {product_url}")
             
             # Extract product data
-            product = self.extract_product_data(product_url, category)
+            product = self.extract_product_data(product_url, category, soup) if soup else None
             if product:
                 # Download images (limit to 3 per product)
                 for j, img_url in enumerate(product['image_urls'][:3]):
                     filepath = self.download_image(img_url, category, product['name'], j)
-                    time.sleep(1)  # Small delay between image downloads
                 
                 category_products.append(product)
                 
@@ -483,11 +512,6 @@ class ProductScraper:
                     logger.info(f"💾 Saved progress: {len(category_products)} products")
             else:
                 self.failed_urls.append(product_url)
-            
-            # Delay between products to be respectful
-            delay = random.uniform(3, 8)
-            logger.info(f"⏳ Waiting {delay:.1f}s...")
-            time.sleep(delay)
         
         logger.info(f"✅ COMPLETED {category}: {len(category_products)} products extracted")
         return category_products
@@ -546,17 +570,11 @@ class ProductScraper:
                 
                 category_products = self.scrape_category(url)
                 all_products.extend(category_products)
-                
-                # Longer delay between category pages
-                if i < len(category_urls[:2]) - 1:
-                    delay = random.uniform(10, 20)
-                    logger.info(f"⏳ Waiting {delay:.1f}s before next URL...")
-                    time.sleep(delay)
-            
-            # Delay between categories
-            delay = random.uniform(15, 30)
-            logger.info(f"⏳ Category completed. Waiting {delay:.1f}s before next category...")
-            time.sleep(delay)
+        
+        self.bypasser.fetch_ladder.scoreboard.save()
+        if self.bypasser.cloudscraper_session is not None:
+            self.bypasser.cloudscraper_session.close()
+        get_browser_fetcher().close()
         
         # Final save
         if all_products:
@@ -0,0 +1,127 @@
+#!/usr/bin/env python3
+
+import asyncio
+import logging
+import threading
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from functools import partial
+from urllib.parse import urlparse
+from rate_limiter import get_rate_limiter
+from http_clients import stream_get
+
+logger = logging.getLogger(__name__)
+
+class AsyncFetchEngine:
+    """Asyncio fetch engine with bounded global and per-host in-flight requests
+
+    The engine owns an event loop running in a background thread, so the
+    synchronous scrapers can keep calling plain methods while dozens of
+    requests are in flight. Blocking sessions (cloudscraper / requests) are
+    driven through a thread pool sized to the global limit. Request starts
+    are paced by the shared adaptive rate limiter, so concurrency hides
+    latency without raising the per-host request rate. When a response
+    cache is given, fresh entries are served without taking a slot.
+    """
+
+    def __init__(self, session, max_in_flight=32, per_host_limit=8, rate_limiter=None, cache=None, timeout=30):
+        self.session = session
+        self.cache = cache
+        self.max_in_flight = max_in_flight
+        self.per_host_limit = per_host_limit
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.timeout = timeout
+
+        self.executor = ThreadPoolExecutor(max_workers=max_in_flight, thread_name_prefix="fetch")
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self._run_loop, name="fetch-engine", daemon=True)
+        self.thread.start()
+
+        self.global_slots = None
+        self.host_slots = {}
+        self.in_flight = 0
+        self.completed = 0
+        asyncio.run_coroutine_threadsafe(self._setup(), self.loop).result()
+
+    def _run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.loop.run_forever()
+
+    async def _setup(self):
+        self.global_slots = asyncio.Semaphore(self.max_in_flight)
+
+    def _host_slots(self, host):
+        """Per-host semaphore, created lazily on the loop"""
+        if host not in self.host_slots:
+            self.host_slots[host] = asyncio.Semaphore(self.per_host_limit)
+        return self.host_slots[host]
+
+    def _get(self, url, kwargs):
+        """Blocking GET run on a worker thread; stale cache entries are revalidated"""
+        if self.cache is not None:
+            return self.cache.fetch(self.session, url, timeout=self.timeout, **kwargs)
+        return stream_get(self.session, url, timeout=self.timeout, **kwargs)
+
+    async def _fetch(self, url, kwargs):
+        if self.cache is not None:
+            # SQLite and body reads block, so they stay off the loop thread
+            lookup = partial(self.cache.lookup, url, record_extractor=kwargs.get('record_extractor'))
+            cached = await self.loop.run_in_executor(self.executor, lookup)
+            if cached is not None:
+                return cached
+        host = urlparse(url).netloc
+        async with self.global_slots:
+            async with self._host_slots(host):
+                delay = self.rate_limiter.reserve(url)
+                if delay > 0:
+                    await asyncio.sleep(delay)
+                self.in_flight += 1
+                try:
+                    call = partial(self._get, url, kwargs)
+                    response = await self.loop.run_in_executor(self.executor, call)
+                except Exception:
+                    # Timeouts and dropped connections count against the host like a throttle
+                    self.rate_limiter.record(url, None)
+                    raise
+                else:
+                    self.rate_limiter.record(url, response.status_code)
+                    return response
+                finally:
+                    self.in_flight -= 1
+                    self.completed += 1
+
+    def submit(self, url, **kwargs):
+        """Schedule a GET and return a concurrent.futures.Future for the response"""
+        return asyncio.run_coroutine_threadsafe(self._fetch(url, kwargs), self.loop)
+
+    def fetch(self, url, **kwargs):
+        """Blocking GET routed through the engine's limits"""
+        return self.submit(url, **kwargs).result()
+
+    def fetch_many(self, urls, url_kwargs=None, **kwargs):
+        """Yield (url, response) pairs as they complete; failed fetches yield None
+
+        url_kwargs(url), if given, returns extra GET kwargs for that URL only.
+        """
+        if url_kwargs is None:
+            futures = {self.submit(url, **kwargs): url for url in urls}
+        else:
+            futures = {self.submit(url, **kwargs, **url_kwargs(url)): url for url in urls}
+        try:
+            for future in as_completed(futures):
+                url = futures[future]
+                try:
+                    yield url, future.result()
+                except Exception as e:
+                    logger.error(f"❌ Error fetching {url}: {str(e)}")
+                    yield url, None
+        finally:
+            # Caller stopped early (e.g. product limit reached) - drop queued work
+            for future in futures:
+                future.cancel()
+
+    def close(self):
+        """Stop the event loop and release worker threads"""
+        if self.loop.is_running():
+            self.loop.call_soon_threadsafe(self.loop.stop)
+            self.thread.join(timeout=5)
+        self.executor.shutdown(wait=False)
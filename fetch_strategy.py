@@ -0,0 +1,206 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+from url_patterns import url_kind
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_SCOREBOARD_FILE = "fetch_scoreboard.json"
+
+class MethodScoreboard:
+    """Success rate and latency per fetch method and URL kind
+
+    Kept as exponential moving averages so a method that starts failing
+    (or recovers) is re-ranked within a handful of requests. Persisted to
+    disk so the next run starts with what this one learned.
+    """
+
+    def __init__(self, path=DEFAULT_SCOREBOARD_FILE, alpha=0.2, min_trials=3,
+                 min_success=0.5, save_every=25):
+        self.path = Path(path) if path else None
+        self.alpha = alpha
+        self.min_trials = min_trials
+        self.min_success = min_success
+        self.save_every = save_every
+        self.stats = {}
+        self.pending = 0
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                self.stats = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            self.stats = {}
+
+    def save(self):
+        if self.path is None:
+            return
+        with self.lock:
+            data = json.dumps(self.stats, indent=2)
+            self.pending = 0
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+    def record(self, kind, method, ok, latency):
+        key = f"{kind}|{method}"
+        with self.lock:
+            entry = self.stats.setdefault(key, {
+                'attempts': 0, 'successes': 0, 'success_rate': float(ok), 'latency': latency
+            })
+            entry['attempts'] += 1
+            entry['successes'] += int(ok)
+            entry['success_rate'] += self.alpha * (float(ok) - entry['success_rate'])
+            if ok:
+                entry['latency'] += self.alpha * (latency - entry['latency'])
+            self.pending += 1
+            should_save = self.pending >= self.save_every
+        if should_save:
+            self.save()
+
+    def order(self, kind, methods):
+        """Methods to try for a URL kind: known-good by latency, then untried, then known-bad"""
+        known_good, untried, known_bad = [], [], []
+        with self.lock:
+            for position, method in enumerate(methods):
+                entry = self.stats.get(f"{kind}|{method}")
+                if entry is None or entry['attempts'] < self.min_trials:
+                    untried.append(method)
+                elif entry['success_rate'] >= self.min_success:
+                    known_good.append((entry['latency'], position, method))
+                else:
+                    known_bad.append((-entry['success_rate'], position, method))
+        return [m for _, _, m in sorted(known_good)] + untried + [m for _, _, m in sorted(known_bad)]
+
+    def report(self):
+        with self.lock:
+            return {key: dict(entry) for key, entry in self.stats.items()}
+
+def is_usable_response(response):
+    """A 304, or a 200 that is not a challenge / block page"""
+    return response.status_code in (200, 304) and getattr(response, 'page_kind', 'page') == 'page'
+
+class FetchLadder:
+    """Fetch strategy layer: cheapest method known to work first, escalate on failure
+
+    fetchers maps method name -> callable(url, headers) returning a
+    requests-style response; their insertion order is the escalation order
+    for URL kinds nothing is known about yet. Fetchers only pace themselves
+    with the rate limiter; the ladder records one outcome per fetch, so a
+    cheap rung's 403 that a later rung gets past does not slow the host down.
+    """
+
+    def __init__(self, fetchers, scoreboard=None, is_valid=None, rate_limiter=None):
+        self.fetchers = dict(fetchers)
+        self.scoreboard = scoreboard or get_scoreboard()
+        self.is_valid = is_valid or is_usable_response
+        self.rate_limiter = rate_limiter
+
+    def fetch(self, url, headers=None, preferred=None):
+        """Return (method, response) from the first method that succeeds, or (None, last response)"""
+        kind = url_kind(url)
+        methods = self.scoreboard.order(kind, list(self.fetchers))
+        if preferred in self.fetchers:
+            methods = [preferred] + [m for m in methods if m != preferred]
+
+        response = None
+        for method in methods:
+            start = time.monotonic()
+            try:
+                response = self.fetchers[method](url, headers or {})
+                ok = self.is_valid(response)
+            except Exception as e:
+                logger.warning(f"✗ {method} failed for {url}: {str(e)}")
+                response, ok = None, False
+            self.scoreboard.record(kind, method, ok, time.monotonic() - start)
+            if ok:
+                self._record(url, response)
+                return method, response
+            if response is not None:
+                logger.info(f"↗️  {method} got {response.status_code} for {url}, escalating")
+        self._record(url, response)
+        return None, response
+
+    def _record(self, url, response):
+        if self.rate_limiter is not None:
+            self.rate_limiter.record(url, response.status_code if response is not None else None)
+
+class BrowserResponse:
+    """Response-like wrapper around a page source rendered by the browser"""
+
+    def __init__(self, url, status_code, content):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = {}
+        self.encoding = 'utf-8'
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+class BrowserFetcher:
+    """Top rung of the ladder: undetected-chromedriver via AdvancedAutomatedScraper
+
+    The driver is started on first use only and serves one page at a time.
+    """
+
+    def __init__(self, wait_time=3):
+        self.wait_time = wait_time
+        self.scraper = None
+        self.unavailable = False
+        self.lock = threading.Lock()
+
+    def __call__(self, url, headers=None):
+        with self.lock:
+            if self.unavailable:
+                raise RuntimeError("browser fetcher unavailable")
+            if self.scraper is None:
+                try:
+                    from advanced_automated_scraper import AdvancedAutomatedScraper
+                    scraper = AdvancedAutomatedScraper()
+                    ready = scraper.setup_driver()
+                except Exception as e:
+                    logger.error(f"❌ Browser fetcher unavailable: {e}")
+                    ready = False
+                if not ready:
+                    self.unavailable = True
+                    raise RuntimeError("browser fetcher unavailable")
+                self.scraper = scraper
+            page_source = self.scraper.get_page_source(url, wait_time=self.wait_time)
+        if page_source is None:
+            return BrowserResponse(url, 403, b'')
+        return BrowserResponse(url, 200, page_source.encode('utf-8'))
+
+    def close(self):
+        with self.lock:
+            if self.scraper is not None and self.scraper.driver:
+                self.scraper.driver.quit()
+            self.scraper = None
+
+_shared_scoreboard = None
+_shared_browser = None
+_shared_lock = threading.Lock()
+
+def get_scoreboard():
+    """Return the process-wide method scoreboard"""
+    global _shared_scoreboard
+    with _shared_lock:
+        if _shared_scoreboard is None:
+            _shared_scoreboard = MethodScoreboard()
+        return _shared_scoreboard
+
+def get_browser_fetcher():
+    """Return the process-wide browser fetcher (driver started lazily)"""
+    global _shared_browser
+    with _shared_lock:
+        if _shared_browser is None:
+            _shared_browser = BrowserFetcher()
+        return _shared_browser
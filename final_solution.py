@@ -264,6 +264,55 @@ import requests
 import json
 import os
 from urllib.parse import urlparse
+from PIL import Image
+
+def image_ok(path):
+    # Pillow checks the file's structure without decoding it; a JPEG must
+    # also end with its EOI marker, which a cut-off download does not
+    try:
+        with Image.open(path) as image:
+            is_jpeg = image.format == 'JPEG'
+            image.verify()
+        if is_jpeg:
+            with open(path, 'rb') as f:
+                f.seek(max(0, os.path.getsize(path) - 1024))
+                return b'\\xff\\xd9' in f.read()
+        return True
+    except Exception:
+        return False
+
+def download_image(img_url, filename, attempts=3):
+    # Stream into a .part file, resume it with a Range request if the
+    # connection drops, and only rename it into place once it verifies
+    part = filename + '.part'
+    for _ in range(attempts):
+        done = os.path.getsize(part) if os.path.exists(part) else 0
+        headers = {'Range': f'bytes={done}-'} if done else {}
+        try:
+            with requests.get(img_url, headers=headers, stream=True, timeout=30) as response:
+                if response.status_code == 416:  # nothing past what the .part holds
+                    break
+                if response.status_code not in (200, 206):
+                    return False
+                resumed = response.status_code == 206
+                with open(part, 'ab' if resumed else 'wb') as f:
+                    for chunk in response.iter_content(chunk_size=65536):
+                        f.write(chunk)
+                length = response.headers.get('Content-Length')
+            # Without a Content-Length the size cannot tell; image_ok below decides
+            if length is None or os.path.getsize(part) >= int(length) + (done if resumed else 0):
+                break
+        except requests.RequestException as e:
+            print(f'Retrying {img_url}: {e}')
+    else:
+        return False
+    # However the download ended, only an image that verifies is renamed into place
+    if not os.path.exists(part) or not image_ok(part):
+        if os.path.exists(part):
+            os.remove(part)
+        return False
+    os.replace(part, filename)
+    return True
 
 def download_images(product_data_file):
     with open(product_data_file, 'r') as f:
@@ -274,16 +323,14 @@ def download_images(product_data_file):
         os.makedirs(f'images/{category}', exist_ok=True)
         
         for j, img_url in enumerate(product.get('images', [])):
-            try:
-                response = requests.get(img_url, timeout=30)
-                if response.status_code == 200:
-                    ext = urlparse(img_url).path.split('.')[-1] or 'jpg'
-                    filename = f'images/{category}/product_{i}_{j}.{ext}'
-                    with open(filename, 'wb') as f:
-                        f.write(response.content)
-                    print(f'Downloaded: {filename}')
-            except Exception as e:
-                print(f'Failed to download {img_url}: {e}')
+            ext = urlparse(img_url).path.split('.')[-1] or 'jpg'
+            filename = f'images/{category}/product_{i}_{j}.{ext}'
+            if os.path.exists(filename):
+                continue
+            if download_image(img_url, filename):
+                print(f'Downloaded: {filename}')
+            else:
+                print(f'Failed to download {img_url}')
 
 # Usage: download_images('products_data.json')
 ```
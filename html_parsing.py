@@ -0,0 +1,106 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import logging
+from bs4 import BeautifulSoup
+
+logger = logging.getLogger(__name__)
+
+SELECTOLAX_AVAILABLE = importlib.util.find_spec("selectolax") is not None
+LXML_AVAILABLE = importlib.util.find_spec("lxml") is not None
+
+PARSER_BACKENDS = ('html.parser', 'lxml', 'selectolax')
+# A BeautifulSoup parser by default; selectolax is opt-in through a scraper's parser_backend
+DEFAULT_PARSER_BACKEND = 'lxml' if LXML_AVAILABLE else 'html.parser'
+if SELECTOLAX_AVAILABLE:
+    from selectolax.lexbor import LexborHTMLParser
+
+# Strings under these tags are not page text (bs4's get_text skips them too)
+NON_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+
+def _text_nodes(node):
+    """Text node contents under a selectolax node, in document order"""
+    texts = []
+    stack = [iter([node])]
+    while stack:
+        child = next(stack[-1], None)
+        if child is None:
+            stack.pop()
+        elif child.tag == '-text':
+            texts.append(child.text_content or '')
+        elif child.tag not in NON_TEXT_TAGS and child.tag != '-comment':
+            stack.append(child.iter(include_text=True))
+    return texts
+
+class SelectolaxNode:
+    """BeautifulSoup-style view of a selectolax node
+
+    Covers the part of the bs4 API the extractors use (select, select_one,
+    get, get_text, name) so they run unchanged on the Lexbor C parser.
+    """
+
+    __slots__ = ('node',)
+
+    def __init__(self, node):
+        self.node = node
+
+    @property
+    def name(self):
+        return getattr(self.node, 'tag', '[document]')
+
+    @property
+    def attrs(self):
+        return {key: value if value is not None else '' for key, value in self.node.attributes.items()}
+
+    def get(self, key, default=None):
+        attributes = self.node.attributes
+        if key not in attributes:
+            return default
+        # Valueless attributes (<option selected>) read as '' like in bs4
+        value = attributes[key]
+        return '' if value is None else value
+
+    def __getitem__(self, key):
+        value = self.node.attributes[key]
+        return '' if value is None else value
+
+    def select(self, selector):
+        # Lexbor's css() also matches the context node itself; bs4 only looks at descendants
+        return [SelectolaxNode(node) for node in self.node.css(selector) if node != self.node]
+
+    def select_one(self, selector):
+        for node in self.node.css(selector):
+            if node != self.node:
+                return SelectolaxNode(node)
+        return None
+
+    def get_text(self, separator='', strip=False):
+        root = self.node.root if isinstance(self.node, LexborHTMLParser) else self.node
+        if root is None:
+            return ''
+        texts = _text_nodes(root)
+        if strip:
+            texts = [text.strip() for text in texts]
+            texts = [text for text in texts if text]
+        return separator.join(texts)
+
+    @property
+    def text(self):
+        return self.get_text()
+
+def resolve_backend(backend=None):
+    """Backend name to use, falling back to html.parser when a parser is not installed"""
+    backend = backend or DEFAULT_PARSER_BACKEND
+    if backend not in PARSER_BACKENDS:
+        raise ValueError(f"Unknown parser backend {backend!r}, expected one of {PARSER_BACKENDS}")
+    if (backend == 'selectolax' and not SELECTOLAX_AVAILABLE) or (backend == 'lxml' and not LXML_AVAILABLE):
+        logger.warning(f"⚠️  {backend} is not installed, parsing with html.parser")
+        return 'html.parser'
+    return backend
+
+def parse_html(content, backend=None):
+    """Parse an HTML document with the chosen backend into a bs4-compatible tree"""
+    backend = resolve_backend(backend)
+    if backend == 'selectolax':
+        return SelectolaxNode(LexborHTMLParser(content))
+    return BeautifulSoup(content, backend)
@@ -0,0 +1,271 @@
+#!/usr/bin/env python3
+
+import logging
+import os
+import re
+import threading
+from pathlib import Path
+import requests
+from requests.adapters import HTTPAdapter
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_POOL_SIZE = 16
+
+# Page bodies are read in chunks; the first SNIFF_BYTES decide whether the
+# rest is worth reading at all
+DEFAULT_MAX_BODY_BYTES = 8 * 1024 * 1024
+SNIFF_BYTES = 8192
+CHALLENGE_MARKERS = (b'cf-chl', b'challenge-platform', b'just a moment', b'checking your browser')
+BLOCK_MARKERS = (b'access denied', b'attention required', b'you have been blocked', b'error code: 1020')
+
+# Interrupted image downloads are resumed with Range requests this many times per call
+DEFAULT_RESUME_ATTEMPTS = 3
+# Some encoders pad after the end-of-image marker
+JPEG_EOI = b'\xff\xd9'
+JPEG_TAIL_BYTES = 1024
+CONTENT_RANGE_PATTERN = re.compile(r'bytes (\d+|\*)(?:-\d+)?/(\d+|\*)')
+
+IMAGE_HEADERS = {
+    'User-Agent': 'Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36',
+    'Referer': 'https://www.pcjeweller.com/',
+    'Accept': 'image/avif,image/webp,image/apng,image/*,*/*;q=0.8',
+    'Connection': 'keep-alive'
+}
+
+class ResponseTooLarge(IOError):
+    """Body exceeded the configured size cap"""
+
+_image_session = None
+_image_session_lock = threading.Lock()
+
+def create_pooled_session(pool_size=DEFAULT_IMAGE_POOL_SIZE, headers=None):
+    """Create a requests session whose connections are pooled and kept alive"""
+    session = requests.Session()
+    # pool_block makes extra threads wait for a warm connection instead of
+    # opening (and then discarding) one-off connections
+    adapter = HTTPAdapter(pool_connections=4, pool_maxsize=pool_size, pool_block=True)
+    session.mount("http://", adapter)
+    session.mount("https://", adapter)
+    if headers:
+        session.headers.update(headers)
+    return session
+
+def get_image_session(pool_size=DEFAULT_IMAGE_POOL_SIZE):
+    """Return the process-wide image download session
+
+    Every scraper shares this session so image requests to the CDN reuse
+    keep-alive connections. The first caller decides the pool size.
+    """
+    global _image_session
+    with _image_session_lock:
+        if _image_session is None:
+            _image_session = create_pooled_session(pool_size, IMAGE_HEADERS)
+            logger.info(f"📷 Image client ready (pool size {pool_size})")
+        return _image_session
+
+def image_file_ok(filepath):
+    """Cheap integrity check: Pillow identifies the file and its structure verifies (no full decode)
+
+    Pillow's verify() does not look at JPEG scan data, so a JPEG must also
+    end with its EOI marker (a truncated one does not).
+    """
+    try:
+        with Image.open(filepath) as image:
+            is_jpeg = image.format == 'JPEG'
+            image.verify()
+        if is_jpeg:
+            with open(filepath, 'rb') as f:
+                f.seek(max(0, os.path.getsize(filepath) - JPEG_TAIL_BYTES))
+                return JPEG_EOI in f.read()
+        return True
+    except Exception:
+        return False
+
+def _content_range(response):
+    """(first byte, total length or None) from a 206 response's Content-Range"""
+    match = CONTENT_RANGE_PATTERN.match(response.headers.get('Content-Range', ''))
+    if not match:
+        return None, None
+    start, total = match.groups()
+    return int(start) if start != '*' else None, int(total) if total != '*' else None
+
+def download_to_file(session, url, filepath, cache=None, rate_limiter=None, timeout=20, headers=None,
+                     resume_attempts=DEFAULT_RESUME_ATTEMPTS, verify=True):
+    """Stream an image into filepath, revalidating a copy that is already there
+
+    An existing file is checked with If-None-Match / If-Modified-Since when
+    the cache holds validators for the URL, and kept as-is otherwise.
+    The body is written to <filepath>.part and streamed in chunks, so memory
+    stays flat whatever the image size. A dropped connection is resumed
+    with a Range request (up to resume_attempts times, and again on the next
+    call for the same filepath). Once the length matches and, with verify,
+    Pillow accepts the file, it is renamed into place atomically, so
+    filepath only ever holds a complete image.
+    Returns 'downloaded', 'not_modified', or None when the server refused
+    or the body failed verification.
+    """
+    filepath = Path(filepath)
+    part_path = filepath.with_name(filepath.name + '.part')
+    request_headers = dict(headers or {})
+    if filepath.exists():
+        if verify and not image_file_ok(filepath):
+            # Left behind truncated by an older, non-atomic download
+            logger.warning(f"⚠️  Replacing damaged image {filepath}")
+            filepath.unlink()
+        else:
+            validators = cache.validator_headers(url) if cache is not None else {}
+            if not validators:
+                return 'not_modified'
+            request_headers.update(validators)
+
+    etag = None
+    attempts = 0
+    while True:
+        offset = part_path.stat().st_size if part_path.exists() else 0
+        attempt_headers = dict(request_headers)
+        if offset:
+            attempt_headers['Range'] = f"bytes={offset}-"
+            if etag:
+                # Server sends the whole image (200) if it changed since the first part
+                attempt_headers['If-Range'] = etag
+        try:
+            if rate_limiter is not None:
+                response = rate_limiter.get(session, url, stream=True, timeout=timeout, headers=attempt_headers)
+            else:
+                response = session.get(url, stream=True, timeout=timeout, headers=attempt_headers)
+
+            with response:
+                if response.status_code == 304:
+                    return 'not_modified'
+                if response.status_code == 416 and offset:
+                    # Part already complete (or unusable) - start over if it does not check out
+                    _, total = _content_range(response)
+                    if total != offset:
+                        part_path.unlink()
+                        continue
+                    expected = offset
+                elif response.status_code == 206 and offset:
+                    start, expected = _content_range(response)
+                    if start != offset:
+                        part_path.unlink()
+                        continue
+                    mode = 'ab'
+                elif response.status_code == 200:
+                    length = response.headers.get('Content-Length')
+                    expected = int(length) if length and not response.headers.get('Content-Encoding') else None
+                    offset = 0
+                    mode = 'wb'
+                else:
+                    return None
+                etag = response.headers.get('ETag') or etag
+                if response.status_code != 416:
+                    with open(part_path, mode) as f:
+                        for chunk in response.iter_content(chunk_size=65536):
+                            f.write(chunk)
+        except (requests.ConnectionError, requests.Timeout, requests.exceptions.ChunkedEncodingError) as e:
+            attempts += 1
+            if attempts > resume_attempts:
+                raise
+            logger.info(f"🔁 Resuming {url} after {part_path.stat().st_size if part_path.exists() else 0} bytes: {e}")
+            continue
+
+        size = part_path.stat().st_size
+        if expected is not None and size < expected:
+            attempts += 1
+            if attempts > resume_attempts:
+                logger.warning(f"⚠️  Incomplete image {url}: {size} of {expected} bytes")
+                return None
+            continue
+        break
+
+    if (expected is not None and size != expected) or (verify and not image_file_ok(part_path)):
+        logger.warning(f"⚠️  Discarding corrupt image {url}")
+        part_path.unlink()
+        return None
+    os.replace(part_path, filepath)
+    if cache is not None:
+        cache.save_validators(url, response)
+    return 'downloaded'
+
+def classify_head(head):
+    """'challenge', 'block' or 'page' from the first bytes of an HTML body"""
+    head = head.lower()
+    if any(marker in head for marker in CHALLENGE_MARKERS):
+        return 'challenge'
+    if any(marker in head for marker in BLOCK_MARKERS):
+        return 'block'
+    return 'page'
+
+def read_body(response, max_bytes=DEFAULT_MAX_BODY_BYTES, sniff_bytes=SNIFF_BYTES, consumer=None):
+    """Read a streamed response (requests or httpx) into response.content
+
+    Once sniff_bytes have arrived the page is classified; challenge and block
+    pages are not read any further and the connection is closed. The body is
+    joined into a single buffer at the end, and a body over max_bytes raises
+    ResponseTooLarge. Sets response.page_kind and returns it.
+
+    consumer, if given, is called with each chunk of a real page as it
+    arrives (e.g. IncrementalProductExtractor.feed). When it returns True
+    the rest of the body is not read, the connection is closed and
+    response.truncated is set.
+    """
+    if hasattr(response, 'iter_content'):
+        chunks_iter = response.iter_content(chunk_size=16384)
+    else:
+        chunks_iter = response.iter_bytes(chunk_size=16384)
+
+    chunks = []
+    size = 0
+    kind = None
+    fed = 0
+    truncated = False
+    try:
+        for chunk in chunks_iter:
+            chunks.append(chunk)
+            size += len(chunk)
+            if size > max_bytes:
+                raise ResponseTooLarge(f"body of {response.url} exceeds {max_bytes} bytes")
+            if kind is None and size >= sniff_bytes:
+                kind = classify_head(b''.join(chunks)[:sniff_bytes])
+                if kind != 'page':
+                    break
+            if consumer is not None and kind == 'page':
+                while fed < len(chunks) and not truncated:
+                    truncated = bool(consumer(chunks[fed]))
+                    fed += 1
+                if truncated:
+                    break
+    finally:
+        if kind not in (None, 'page') or size > max_bytes or truncated:
+            response.close()
+
+    body = b''.join(chunks)
+    if kind is None:
+        kind = classify_head(body[:sniff_bytes])
+    if consumer is not None and kind == 'page':
+        # Bodies shorter than sniff_bytes are only classified here
+        while fed < len(chunks) and not truncated:
+            truncated = bool(consumer(chunks[fed]))
+            fed += 1
+    # Both requests and httpx serve .content / .text from _content once set
+    response._content = body
+    response.page_kind = kind
+    response.truncated = truncated
+    return kind
+
+def stream_get(session, url, rate_limiter=None, max_bytes=DEFAULT_MAX_BODY_BYTES, sniff_bytes=SNIFF_BYTES,
+               consumer=None, **kwargs):
+    """GET a page with a streamed, size-capped body read (see read_body)"""
+    kwargs['stream'] = True
+    if rate_limiter is not None:
+        response = rate_limiter.get(session, url, **kwargs)
+    else:
+        response = session.get(url, **kwargs)
+    if response.status_code == 304:
+        response.page_kind = 'page'
+        response.close()
+        return response
+    read_body(response, max_bytes, sniff_bytes, consumer)
+    return response
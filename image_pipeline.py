@@ -0,0 +1,113 @@
+#!/usr/bin/env python3
+
+import logging
+import queue
+import threading
+import time
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_IMAGE_WORKERS = 8
+# Jobs allowed to wait per worker before submit() blocks the producer
+DEFAULT_QUEUE_PER_WORKER = 8
+
+_STOP = object()
+
+class ImagePipeline:
+    """Image downloads on their own worker threads, fed through a bounded queue
+
+    Scrapers submit() one job per image and carry on with the next
+    product; the workers run the download callables in the background.
+    When the queue is full, submit() blocks until a worker frees a place,
+    so a slow CDN throttles page fetching instead of growing the backlog
+    without bound. workers and max_queued tune image throughput
+    independently of the page fetchers. join() waits for everything
+    submitted so far, e.g. before results are written out.
+    """
+
+    def __init__(self, workers=DEFAULT_IMAGE_WORKERS, max_queued=None, name="images"):
+        self.workers = workers
+        self.max_queued = max_queued or workers * DEFAULT_QUEUE_PER_WORKER
+        self.name = name
+        self.jobs = queue.Queue(maxsize=self.max_queued)
+        self.threads = []
+        self.lock = threading.Lock()
+        self.submitted = 0
+        self.completed = 0
+        self.failed = 0
+        # Time producers spent blocked on a full queue
+        self.blocked_seconds = 0.0
+
+    def start(self):
+        if not self.threads:
+            for i in range(self.workers):
+                thread = threading.Thread(target=self._work, name=f"{self.name}-{i}", daemon=True)
+                thread.start()
+                self.threads.append(thread)
+            logger.info(f"📷 Image pipeline: {self.workers} workers, queue of {self.max_queued}")
+
+    def submit(self, download, *args, on_done=None):
+        """Queue download(*args); on_done(result) runs on the worker once it returns"""
+        self.start()
+        job = (download, args, on_done)
+        try:
+            self.jobs.put_nowait(job)
+        except queue.Full:
+            start = time.perf_counter()
+            self.jobs.put(job)
+            with self.lock:
+                self.blocked_seconds += time.perf_counter() - start
+        with self.lock:
+            self.submitted += 1
+
+    def _work(self):
+        while True:
+            job = self.jobs.get()
+            try:
+                if job is _STOP:
+                    return
+                download, args, on_done = job
+                try:
+                    result = download(*args)
+                    if on_done is not None:
+                        on_done(result)
+                except Exception as e:
+                    result = None
+                    logger.warning(f"⚠️  Image job failed: {str(e)}")
+                with self.lock:
+                    self.completed += 1
+                    if not result:
+                        self.failed += 1
+            finally:
+                self.jobs.task_done()
+
+    def pending(self):
+        with self.lock:
+            return self.submitted - self.completed
+
+    def join(self):
+        """Block until every job submitted so far has finished"""
+        if self.threads:
+            self.jobs.join()
+
+    def stats(self):
+        with self.lock:
+            return {
+                'submitted': self.submitted,
+                'completed': self.completed,
+                'succeeded': self.completed - self.failed,
+                'failed': self.failed,
+                'blocked_seconds': round(self.blocked_seconds, 2),
+            }
+
+    def close(self):
+        """Finish queued jobs, then stop the workers"""
+        for _ in self.threads:
+            self.jobs.put(_STOP)
+        for thread in self.threads:
+            thread.join()
+        self.threads = []
+        if self.submitted:
+            stats = self.stats()
+            logger.info(f"📷 Image jobs: {stats['completed']} done, {stats['failed']} failed, "
+                        f"producers blocked {stats['blocked_seconds']}s on a full queue")
@@ -0,0 +1,247 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from pathlib import Path
+import requests
+from urllib.parse import urlsplit
+from url_patterns import normalize_url
+from http_clients import download_to_file
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_STORE_DIR = "image_store"
+IMAGE_EXTENSIONS = ('jpg', 'jpeg', 'png', 'webp', 'gif')
+
+def image_extension(url):
+    """File extension from the image URL path, 'jpg' when missing or unknown"""
+    path = urlsplit(url).path
+    ext = path.rsplit('.', 1)[-1].lower() if '.' in path.rsplit('/', 1)[-1] else ''
+    return ext if ext in IMAGE_EXTENSIONS else 'jpg'
+
+def file_sha256(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(65536), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+class ImageStore:
+    """Content-addressed image store shared by every scraper
+
+    Image bytes live once under objects/ab/<sha256>.<ext>, whichever
+    products, categories or URLs they came from. A SQLite index maps
+    normalized image URLs to their hash, so a URL that was stored once is
+    not downloaded again unless it changed. Scrapers ask for views - paths under their own
+    images directories - which are hardlinks to the stored object, or,
+    with hardlinks=False or on a filesystem without them, entries in
+    manifest.json only. Every view is recorded in the index either way.
+    With a processor (image_variants.ImageProcessor) attached, every
+    image saved is handed to it for its resized / transcoded variants.
+
+    Given the response cache, downloads record the image's ETag /
+    Last-Modified, and a URL stored before is revalidated with them once
+    per store lifetime: a 304 keeps the stored object, a changed image is
+    downloaded and stored again under its new hash.
+    """
+
+    def __init__(self, root=DEFAULT_STORE_DIR, hardlinks=True, processor=None):
+        self.root = Path(root)
+        self.objects_dir = self.root / "objects"
+        self.tmp_dir = self.root / "tmp"
+        self.objects_dir.mkdir(parents=True, exist_ok=True)
+        self.tmp_dir.mkdir(exist_ok=True)
+        self.hardlinks = hardlinks
+        self.processor = processor
+        self.downloaded = 0
+        self.known_urls = 0
+        self.duplicates = 0
+        self.not_modified = 0
+        self.lock = threading.Lock()
+        # Normalized URLs revalidated (or downloaded) by this store, so each is checked once per run
+        self.checked = set()
+        # URL -> Event for downloads in progress, so concurrent workers fetch a URL once
+        self.in_flight = {}
+        self.db = sqlite3.connect(str(self.root / "index.sqlite3"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS urls (
+                url TEXT PRIMARY KEY,
+                image_hash TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                fetched_at REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS urls_hash ON urls (image_hash)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS views (
+                path TEXT PRIMARY KEY,
+                image_hash TEXT NOT NULL,
+                ext TEXT NOT NULL,
+                linked INTEGER NOT NULL
+            )
+        """)
+        self.db.commit()
+
+    def object_path(self, image_hash, ext):
+        return self.objects_dir / image_hash[:2] / f"{image_hash}.{ext}"
+
+    def lookup(self, url):
+        """Stored object path for an image URL, or None if it has not been stored"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT image_hash, ext FROM urls WHERE url = ?", (normalize_url(url),)
+            ).fetchone()
+        if row is None:
+            return None
+        path = self.object_path(*row)
+        return path if path.exists() else None
+
+    def fetch(self, session, url, rate_limiter=None, timeout=20, headers=None, cache=None):
+        """(object path, 'downloaded' | 'known') for an image URL; (None, None) when the server refused"""
+        key = normalize_url(url)
+        while True:
+            path = self.lookup(url)
+            with self.lock:
+                revalidate = (path is not None and cache is not None and key not in self.checked)
+                if path is not None and not revalidate:
+                    self.known_urls += 1
+                    return path, 'known'
+                waiting = self.in_flight.get(key)
+                if waiting is None:
+                    self.in_flight[key] = threading.Event()
+                    self.checked.add(key)
+            if waiting is None:
+                break
+            # Another worker is downloading this URL - use its result
+            waiting.wait()
+            if self.lookup(url) is None:
+                return None, None
+
+        try:
+            return self._download(session, url, key, rate_limiter, timeout, headers, cache, path)
+        finally:
+            with self.lock:
+                self.in_flight.pop(key).set()
+
+    def _download(self, session, url, key, rate_limiter, timeout, headers, cache, known_path):
+        request_headers = dict(headers or {})
+        if known_path is not None:
+            validators = cache.validator_headers(url)
+            if not validators:
+                with self.lock:
+                    self.known_urls += 1
+                return known_path, 'known'
+            request_headers.update(validators)
+        # Named by URL, so a download interrupted in an earlier run resumes from its .part file
+        url_hash = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        tmp_path = self.tmp_dir / url_hash
+        try:
+            try:
+                result = download_to_file(session, url, tmp_path, cache=cache, rate_limiter=rate_limiter,
+                                          timeout=timeout, headers=request_headers)
+            except requests.RequestException as e:
+                if known_path is None:
+                    raise
+                logger.warning(f"⚠️  Could not revalidate {url}, keeping the stored copy: {e}")
+                result = None
+            if known_path is not None and result != 'downloaded':
+                with self.lock:
+                    self.known_urls += 1
+                    if result == 'not_modified':
+                        self.not_modified += 1
+                return known_path, 'known'
+            if result is None:
+                return None, None
+            image_hash = file_sha256(tmp_path)
+            ext = image_extension(url)
+            path = self.object_path(image_hash, ext)
+            size = tmp_path.stat().st_size
+            if path.exists():
+                duplicate = True
+            else:
+                duplicate = False
+                path.parent.mkdir(exist_ok=True)
+                os.replace(tmp_path, path)
+        finally:
+            tmp_path.unlink(missing_ok=True)
+
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO urls VALUES (?, ?, ?, ?, ?)",
+                (key, image_hash, ext, size, time.time())
+            )
+            self.db.commit()
+            self.downloaded += 1
+            if duplicate:
+                self.duplicates += 1
+        return path, 'downloaded'
+
+    def link(self, object_path, view_path):
+        """Expose a stored object at view_path; returns the path to use for it"""
+        object_path, view_path = Path(object_path), Path(view_path)
+        linked = False
+        if self.hardlinks:
+            view_path.parent.mkdir(parents=True, exist_ok=True)
+            try:
+                if not (view_path.exists() and os.path.samefile(view_path, object_path)):
+                    tmp_view = view_path.with_name(f".{view_path.name}.{threading.get_ident()}")
+                    os.link(object_path, tmp_view)
+                    os.replace(tmp_view, view_path)
+                linked = True
+            except OSError as e:
+                logger.warning(f"⚠️  Hardlink failed for {view_path}, keeping a manifest entry: {e}")
+                self.hardlinks = False
+        image_hash, ext = object_path.stem, object_path.suffix[1:]
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO views VALUES (?, ?, ?, ?)",
+                (str(view_path), image_hash, ext, int(linked))
+            )
+            self.db.commit()
+        return view_path if linked else object_path
+
+    def save(self, session, url, view_dir, stem, rate_limiter=None, timeout=20, headers=None, cache=None):
+        """Store an image and expose it as view_dir/<stem>_<hash prefix>.<ext>
+
+        The hash prefix keeps views of different images apart even when
+        their products share a name. Returns (path, 'downloaded' | 'known')
+        or (None, None). cache is the response cache used for revalidation (see fetch).
+        """
+        object_path, result = self.fetch(session, url, rate_limiter=rate_limiter, timeout=timeout,
+                                         headers=headers, cache=cache)
+        if object_path is None:
+            return None, None
+        if self.processor is not None:
+            self.processor.submit(object_path)
+        view_path = Path(view_dir) / f"{stem}_{object_path.stem[:12]}{object_path.suffix}"
+        return self.link(object_path, view_path), result
+
+    def write_manifest(self):
+        """Dump every view as {view path: stored object path} to manifest.json"""
+        with self.lock:
+            rows = self.db.execute("SELECT path, image_hash, ext FROM views ORDER BY path").fetchall()
+        manifest = {path: str(self.object_path(image_hash, ext)) for path, image_hash, ext in rows}
+        with open(self.root / "manifest.json", 'w', encoding='utf-8') as f:
+            json.dump(manifest, f, indent=2, ensure_ascii=False)
+        return manifest
+
+    def stats(self):
+        return {'downloaded': self.downloaded, 'known_urls': self.known_urls, 'duplicates': self.duplicates,
+                'not_modified': self.not_modified}
+
+_shared_store = None
+_shared_store_lock = threading.Lock()
+
+def get_image_store():
+    """Return the process-wide image store shared by every scraper"""
+    global _shared_store
+    with _shared_store_lock:
+        if _shared_store is None:
+            _shared_store = ImageStore()
+        return _shared_store
@@ -0,0 +1,80 @@
+#!/usr/bin/env python3
+
+import math
+import re
+from functools import lru_cache
+from urllib.parse import urlsplit
+
+# Longest side in pixels of each resize folder on the pcjeweller CDN
+# (.../catalog/product/<variant>/<letter>/<file>), measured on downloaded images
+IMAGE_VARIANT_SIZES = {
+    'preview': 500,
+    'custom': 380,
+    'thumb': 380,
+    'small': 100,
+}
+
+CDN_VARIANT_PATTERN = re.compile(r'/catalog/product/(%s)/(.+)$' % '|'.join(IMAGE_VARIANT_SIZES), re.I)
+# The uploaded file itself, outranking every resized copy
+CATALOG_FILE_PATTERN = re.compile(r'/catalog/product/(.+)$', re.I)
+ORIGINAL_SIZE = math.inf
+# Image roles Magento 1 names in its resize cache path. Only these may be taken for the
+# role folder: the file's own dispersion folders (a/b/) are single letters too
+MAGENTO_IMAGE_ROLES = ('image', 'small_image', 'thumbnail', 'swatch_image')
+# Magento resize cache: /media/catalog/product/cache/<id>/[<role>/][<W>x<H>/][<hash>/]a/b/file.jpg
+MAGENTO_CACHE_PATTERN = re.compile(
+    r'/catalog/product/cache/(?:\d+/)?(?:(?:%s)/)?(?:(\d+)x(\d*)/)?(?:[0-9a-f]{32}/)?(.+)$'
+    % '|'.join(MAGENTO_IMAGE_ROLES), re.I
+)
+
+@lru_cache(maxsize=8192)
+def image_key(url):
+    """(key, size) for an image URL: key is the same for every resized copy of one catalog file
+
+    size is the variant's longest side in pixels when the URL tells,
+    ORIGINAL_SIZE for the uploaded file, None otherwise. Query strings
+    (cache-busters) never take part in the key. URLs outside the product
+    catalog key on their host and path alone.
+    """
+    parts = urlsplit(url)
+    path = parts.path
+    match = MAGENTO_CACHE_PATTERN.search(path)
+    if match:
+        width, height, file_path = match.groups()
+        size = max(int(width), int(height or 0)) if width else None
+        return 'catalog:' + file_path.lower(), size
+    match = CDN_VARIANT_PATTERN.search(path)
+    if match:
+        variant, file_path = match.groups()
+        return 'catalog:' + file_path.lower(), IMAGE_VARIANT_SIZES[variant.lower()]
+    match = CATALOG_FILE_PATTERN.search(path)
+    if match:
+        return 'catalog:' + match.group(1).lower(), ORIGINAL_SIZE
+    return f"{parts.netloc.lower()}{path}", None
+
+def canonical_image_urls(urls, size=None):
+    """One URL per underlying image, groups in first-seen order
+
+    With size=None the largest known variant of each group wins; with a
+    size, the smallest variant at least that large (or the largest one
+    when none is). Variants of unknown size rank below known ones, and
+    among equals the first URL seen is kept.
+    """
+    groups = {}
+    for url in urls:
+        key, variant_size = image_key(url)
+        groups.setdefault(key, []).append((variant_size, url))
+
+    canonical = []
+    for candidates in groups.values():
+        known = [(variant_size, url) for variant_size, url in candidates if variant_size is not None]
+        if not known:
+            canonical.append(candidates[0][1])
+            continue
+        if size is not None:
+            large_enough = [entry for entry in known if entry[0] >= size]
+            if large_enough:
+                canonical.append(min(large_enough, key=lambda entry: entry[0])[1])
+                continue
+        canonical.append(max(known, key=lambda entry: entry[0])[1])
+    return canonical
@@ -0,0 +1,221 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import logging
+import multiprocessing
+import os
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from pathlib import Path
+from PIL import Image
+
+logger = logging.getLogger(__name__)
+
+# Pillow before 11.3 only writes AVIF with the pillow-avif-plugin package
+if importlib.util.find_spec("pillow_avif") is not None:
+    import pillow_avif  # noqa: F401  (registers the AVIF codec)
+
+DEFAULT_VARIANTS_DIR = "image_store/variants"
+
+# name -> longest side in pixels (never upscaled), output format and encoder options
+DEFAULT_VARIANTS = {
+    'thumb': {'max_size': 256, 'format': 'webp', 'quality': 80},
+    'web': {'max_size': 1024, 'format': 'webp', 'quality': 85},
+}
+
+# Fill behind transparent pixels in JPEG variants; a variant spec can set its own 'background'
+DEFAULT_BACKGROUND = (255, 255, 255)
+
+FORMAT_EXTENSIONS = {'jpeg': 'jpg', 'png': 'png', 'webp': 'webp', 'avif': 'avif'}
+
+def format_supported(fmt):
+    Image.init()
+    return fmt.upper() in Image.SAVE
+
+def variant_path(variants_dir, name, image_hash, fmt):
+    return Path(variants_dir) / name / image_hash[:2] / f"{image_hash}.{FORMAT_EXTENSIONS[fmt]}"
+
+def fitted_size(size, max_size):
+    """size scaled down so its longer side is at most max_size (aspect kept, never enlarged)"""
+    width, height = size
+    scale = min(1.0, max_size / max(width, height))
+    return max(1, round(width * scale)), max(1, round(height * scale))
+
+def _to_8bit(image):
+    """16/32-bit grayscale scaled down to L (a plain convert clips everything above 255 to white)"""
+    return image.convert('I').point(lambda value: value * (1 / 256)).convert('L')
+
+def _flatten(image, background):
+    """RGB or L copy for formats without alpha, transparent areas composited onto background"""
+    if image.mode in ('RGB', 'L'):
+        return image
+    rgba = image.convert('RGBA')
+    flat = Image.new('RGB', image.size, background)
+    flat.paste(rgba, mask=rgba.getchannel('A'))
+    return flat
+
+def _save(image, path, spec):
+    fmt = spec['format']
+    if image.mode.startswith('I'):
+        image = _to_8bit(image)
+    if fmt == 'jpeg':
+        image = _flatten(image, spec.get('background', DEFAULT_BACKGROUND))
+    elif image.mode not in ('RGB', 'RGBA', 'L', 'LA'):
+        image = image.convert('RGBA' if 'transparency' in image.info else 'RGB')
+    options = {key: value for key, value in spec.items() if key not in ('max_size', 'format', 'background')}
+    path.parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = path.with_name(f".{path.name}.{os.getpid()}")
+    image.save(tmp_path, format=fmt.upper(), **options)
+    os.replace(tmp_path, path)
+
+def make_variants(source_path, variants_dir, variants):
+    """Worker entry point: write the missing variants of one stored image, return their paths
+
+    Sizing decisions come from the header alone. A variant the source
+    already satisfies (small enough, same format) is a hardlink to it,
+    so such images are never decoded. Otherwise the image is decoded
+    once - JPEGs at a reduced scale via draft() when possible - and
+    each variant is resized from the previous, larger one.
+    """
+    source_path = Path(source_path)
+    image_hash = source_path.stem
+    written = {}
+    with Image.open(source_path) as image:
+        source_format = (image.format or '').lower()
+        todo = []
+        for name, spec in variants.items():
+            path = variant_path(variants_dir, name, image_hash, spec['format'])
+            if path.exists():
+                continue
+            target = fitted_size(image.size, spec['max_size'])
+            if target == image.size and spec['format'] == source_format:
+                path.parent.mkdir(parents=True, exist_ok=True)
+                try:
+                    os.link(source_path, path)
+                except FileExistsError:
+                    pass
+                written[name] = str(path)
+            else:
+                todo.append((target, name, spec, path))
+        if not todo:
+            return written
+
+        todo.sort(key=lambda entry: entry[0], reverse=True)
+        largest = todo[0][0]
+        if source_format == 'jpeg':
+            image.draft('RGB', largest)
+        current = image.convert(image.mode) if image.mode != 'P' else image.convert('RGBA')
+        for target, name, spec, path in todo:
+            if current.size != target:
+                current = current.resize(target, Image.LANCZOS)
+            _save(current, path, spec)
+            written[name] = str(path)
+    return written
+
+class ImageProcessor:
+    """Resize / transcode stored images into configured variants in a process pool
+
+    submit() takes an object path from the ImageStore (named by content
+    hash) and schedules only the variants not on disk yet, so unchanged
+    images are never reprocessed and a rerun picks up where the last one
+    stopped. Variants are written under variants_dir/<name>/ab/<hash>.<ext>.
+    submit() blocks while max_pending images are being processed.
+    """
+
+    def __init__(self, variants=None, variants_dir=DEFAULT_VARIANTS_DIR, workers=None, max_pending=None):
+        self.variants = {}
+        for name, spec in (variants or DEFAULT_VARIANTS).items():
+            spec = dict(spec, format=spec['format'].lower())
+            if not format_supported(spec['format']):
+                logger.warning(f"⚠️  Pillow cannot write {spec['format']}, skipping the '{name}' image variant")
+                continue
+            self.variants[name] = spec
+        self.variants_dir = Path(variants_dir)
+        self.workers = workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.workers * 4
+        self.executor = None
+        self.slots = threading.BoundedSemaphore(self.max_pending)
+        self.lock = threading.Lock()
+        # hash -> future for images being processed
+        self.in_flight = {}
+        self.processed = 0
+        self.skipped = 0
+        self.failed = 0
+
+    def start(self):
+        with self.lock:
+            if self.executor is None:
+                # Called from download threads, so workers must not be plain forks
+                if 'forkserver' in multiprocessing.get_all_start_methods():
+                    context = multiprocessing.get_context('forkserver')
+                else:
+                    context = multiprocessing.get_context('spawn')
+                self.executor = ProcessPoolExecutor(max_workers=self.workers, mp_context=context)
+                logger.info(f"🖼️  Image processor: {self.workers} processes, variants {', '.join(self.variants)}")
+
+    def missing(self, image_hash):
+        """Variant specs of an image that are not on disk yet"""
+        return {
+            name: spec for name, spec in self.variants.items()
+            if not variant_path(self.variants_dir, name, image_hash, spec['format']).exists()
+        }
+
+    def submit(self, object_path):
+        """Schedule the missing variants of a stored image; returns the future, or None if there is nothing to do"""
+        image_hash = Path(object_path).stem
+        todo = self.missing(image_hash)
+        with self.lock:
+            if not todo or image_hash in self.in_flight:
+                self.skipped += 1
+                return None
+            # Claimed before the (possibly blocking) submit so other threads skip this image
+            self.in_flight[image_hash] = None
+        self.start()
+        self.slots.acquire()
+        try:
+            future = self.executor.submit(make_variants, str(object_path), str(self.variants_dir), todo)
+        except BaseException:
+            self.slots.release()
+            with self.lock:
+                self.in_flight.pop(image_hash, None)
+            raise
+        with self.lock:
+            self.in_flight[image_hash] = future
+        future.add_done_callback(lambda done: self._finished(image_hash, done))
+        return future
+
+    def _finished(self, image_hash, future):
+        with self.lock:
+            self.in_flight.pop(image_hash, None)
+            if future.cancelled() or future.exception() is not None:
+                self.failed += 1
+                if not future.cancelled():
+                    logger.warning(f"⚠️  Image variants failed for {image_hash[:12]}: {future.exception()}")
+            else:
+                self.processed += 1
+        self.slots.release()
+
+    def stats(self):
+        with self.lock:
+            return {'processed': self.processed, 'skipped': self.skipped, 'failed': self.failed}
+
+    def close(self):
+        """Wait for scheduled images, then stop the worker processes"""
+        with self.lock:
+            executor, self.executor = self.executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+            stats = self.stats()
+            logger.info(f"🖼️  Image variants: {stats['processed']} images processed, "
+                        f"{stats['skipped']} already done, {stats['failed']} failed")
+
+_shared_processor = None
+_shared_lock = threading.Lock()
+
+def get_image_processor():
+    """Return the process-wide image processor with the default variants"""
+    global _shared_processor
+    with _shared_lock:
+        if _shared_processor is None:
+            _shared_processor = ImageProcessor()
+        return _shared_processor
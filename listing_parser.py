@@ -0,0 +1,87 @@
+#!/usr/bin/env python3
+
+from functools import lru_cache
+from urllib.parse import urljoin
+from lxml import etree
+from bs4.dammit import EncodingDetector
+from product_extractor import compile_selector, SelectorIndex
+from url_patterns import BASE_URL
+
+@lru_cache(maxsize=65536)
+def site_url(href, base_url=BASE_URL):
+    """Absolute URL for a site-relative href (others unchanged), memoized across pages"""
+    if href.startswith('/'):
+        return urljoin(base_url, href)
+    return href
+
+@lru_cache(maxsize=65536)
+def strip_query(url):
+    """URL without its query string"""
+    return url.split('?')[0]
+
+class LinkScan:
+    """lxml parser target collecting the hrefs of elements matched by a LinkSelector
+
+    Nothing but the matched hrefs is kept: no tree, no text.
+    """
+
+    def __init__(self, selector):
+        self.selector = selector
+        self.open_counts = [0] * selector.index.ancestor_count
+        self.stack = []
+        self.links = {name: [] for name in selector.names}
+
+    def start(self, tag, attrib):
+        if not isinstance(tag, str):
+            self.stack.append(None)
+            return
+        classes = frozenset(attrib['class'].split()) if 'class' in attrib else frozenset()
+        rule_entries, ancestor_entries = self.selector.index.entries(tag, classes)
+
+        href = attrib.get('href')
+        if href is not None:
+            matched = []
+            for name, compound, ancestor in rule_entries:
+                if (ancestor is None or self.open_counts[ancestor]) and name not in matched \
+                        and compound.matches(tag, classes, attrib):
+                    matched.append(name)
+                    self.links[name].append(href)
+
+        opened = [index for index, compound in ancestor_entries if compound.matches(tag, classes, attrib)]
+        for index in opened:
+            self.open_counts[index] += 1
+        self.stack.append(opened or None)
+
+    def end(self, tag):
+        if not self.stack:
+            return
+        opened = self.stack.pop()
+        if opened:
+            for index in opened:
+                self.open_counts[index] -= 1
+
+    def data(self, text):
+        pass
+
+    def close(self):
+        return self.links
+
+class LinkSelector:
+    """Named link selectors compiled once and evaluated together in one pass over a page
+
+    scan(content) returns {name: [href, ...]} with each name's hrefs in
+    document order, the same elements soup.select(selector) would return
+    (only those carrying an href). Selectors are limited to what
+    product_extractor.compile_selector supports.
+    """
+
+    def __init__(self, selectors):
+        self.selectors = dict(selectors)
+        self.names = list(self.selectors)
+        self.index = SelectorIndex((name, compile_selector(selector)) for name, selector in self.selectors.items())
+
+    def scan(self, content):
+        encoding = EncodingDetector.find_declared_encoding(content, is_html=True) or 'utf-8'
+        parser = etree.HTMLParser(target=LinkScan(self), encoding=encoding)
+        parser.feed(content)
+        return parser.close()
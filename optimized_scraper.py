@@ -8,10 +8,19 @@ import os
 import requests
 import random
 from urllib.parse import urljoin, urlparse
-from bs4 import BeautifulSoup
 from pathlib import Path
 import logging
 import re
+from http_clients import get_image_session, DEFAULT_IMAGE_POOL_SIZE
+from image_pipeline import ImagePipeline, DEFAULT_IMAGE_WORKERS
+from image_store import get_image_store
+from image_variants import get_image_processor
+from rate_limiter import get_rate_limiter
+from response_cache import get_response_cache
+from clearance_pool import get_clearance_pool
+from html_parsing import parse_html, resolve_backend
+from listing_parser import LinkSelector, site_url, strip_query
+from image_urls import canonical_image_urls
 
 # Configure logging
 logging.basicConfig(
@@ -24,14 +33,40 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# Correct selectors based on page analysis, scanned together in one pass
+LISTING_LINK_SELECTORS = [
+    '.productListing a[href*=".html"]',  # Main product container
+    '.pdt-item-list a[href*=".html"]',   # Product item list
+    'a[href*="-ring-"], a[href*="-necklace-"], a[href*="-earring-"]',  # Product-specific patterns
+    'a[title="View Details"]'  # View details links
+]
+LISTING_LINKS = LinkSelector({selector: selector for selector in LISTING_LINK_SELECTORS})
+PRODUCT_LINK_PATTERN = re.compile(r'-(?:ring|necklace|earring|bracelet|pendant|chain)-')
+
 class PCJewellerScraper:
     """Optimized scraper with correct selectors"""
     
-    def __init__(self, max_products_per_category=150):
+    def __init__(self, max_products_per_category=150, image_pool_size=DEFAULT_IMAGE_POOL_SIZE, rate_limiter=None,
+                 response_cache=None, parser_backend=None, image_workers=DEFAULT_IMAGE_WORKERS, image_queue_size=None,
+                 image_store=None, image_processor=None, process_images=True, image_size=None):
         self.max_products = max_products_per_category
-        self.scraper = cloudscraper.create_scraper(
-            browser={'browser': 'chrome', 'platform': 'linux', 'desktop': True}
-        )
+        # Longest side in pixels to pick among resized copies of a photo (None: the largest copy)
+        self.image_size = image_size
+        # 'html.parser', 'lxml' or 'selectolax'; extractors see the same API on each
+        self.parser_backend = resolve_backend(parser_backend)
+        # Shared clearance pool: challenge solved once, per-thread sessions reuse it
+        self.scraper = get_clearance_pool()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.response_cache = response_cache or get_response_cache()
+        self.image_session = get_image_session(pool_size=image_pool_size)
+        # Images download in the background while the next product page is fetched
+        self.images = ImagePipeline(workers=image_workers, max_queued=image_queue_size)
+        # Image bytes are stored once by content hash; category folders hold links to them
+        self.image_store = image_store or get_image_store()
+        # Thumbnails / web-sized variants are made in worker processes as images land
+        self.image_processor = (image_processor or get_image_processor()) if process_images else None
+        if self.image_processor is not None:
+            self.image_store.processor = self.image_processor
         self.products = []
         self.setup_directories()
         
@@ -47,38 +82,25 @@ class PCJewellerScraper:
     def get_product_links(self, category_url):
         """Extract product links using correct selectors"""
         try:
-            response = self.scraper.get(category_url, timeout=30)
+            response = self.response_cache.fetch(self.scraper, category_url, rate_limiter=self.rate_limiter, timeout=30)
             if response.status_code != 200:
                 logger.error(f"❌ Failed to load {category_url}: {response.status_code}")
                 return []
                 
-            soup = BeautifulSoup(response.content, 'html.parser')
+            links = LISTING_LINKS.scan(response.content)
             product_links = set()
             
-            # Correct selectors based on page analysis
-            selectors = [
-                '.productListing a[href*=".html"]',  # Main product container
-                '.pdt-item-list a[href*=".html"]',   # Product item list
-                'a[href*="-ring-"], a[href*="-necklace-"], a[href*="-earring-"]',  # Product-specific patterns
-                'a[title="View Details"]'  # View details links
-            ]
-            
-            for selector in selectors:
-                links = soup.select(selector)
-                logger.info(f"🔍 Selector '{selector}' found {len(links)} links")
+            for selector in LISTING_LINK_SELECTORS:
+                hrefs = links[selector]
+                logger.info(f"🔍 Selector '{selector}' found {len(hrefs)} links")
                 
-                for link in links:
-                    href = link.get('href')
-                    if href and href.endswith('.html'):
-                        # Convert to absolute URL
-                        if href.startswith('/'):
-                            href = urljoin("https://www.pcjeweller.com", href)
-                        
-                        # Filter out bid parameters and duplicates
-                        clean_href = href.split('?')[0]  # Remove query parameters
+                for href in hrefs:
+                    if href.endswith('.html'):
+                        # Absolute URL without query parameters, memoized across pages
+                        clean_href = strip_query(site_url(href))
                         
                         # Only include actual product pages
-                        if any(keyword in clean_href.lower() for keyword in ['-ring-', '-necklace-', '-earring-', '-bracelet-', '-pendant-', '-chain-']):
+                        if PRODUCT_LINK_PATTERN.search(clean_href.lower()):
                             product_links.add(clean_href)
                             
                         if len(product_links) >= self.max_products:
@@ -103,12 +125,12 @@ class PCJewellerScraper:
     def extract_product_details(self, product_url, category):
         """Extract detailed product information"""
         try:
-            response = self.scraper.get(product_url, timeout=30)
+            response = self.response_cache.fetch(self.scraper, product_url, rate_limiter=self.rate_limiter, timeout=30)
             if response.status_code != 200:
                 logger.warning(f"⚠️  Failed to load product page: {response.status_code}")
                 return None
                 
-            soup = BeautifulSoup(response.content, 'html.parser')
+            soup = parse_html(response.content, self.parser_backend)
             
             product = {
                 'name': '',
@@ -227,6 +249,8 @@ class PCJewellerScraper:
                         
                         if src not in product['image_urls'] and 'catalog/product' in src:
                             product['image_urls'].append(src)
+            # One URL per photo, not one per resize of it
+            product['image_urls'] = canonical_image_urls(product['image_urls'], size=self.image_size)
             
             # Extract description
             desc_selectors = [
@@ -272,26 +296,16 @@ class PCJewellerScraper:
             category_dir.mkdir(exist_ok=True)
             
             name_safe = re.sub(r'[^\w\s-]', '', product_name[:30]).strip()
-            name_safe = name_safe.replace(' ', '_')
-            
-            # Get file extension
-            ext = 'jpg'
-            if '.' in image_url:
-                ext = image_url.split('.')[-1].split('?')[0].lower()
-                if ext not in ['jpg', 'jpeg', 'png', 'webp']:
-                    ext = 'jpg'
+            name_safe = name_safe.replace(' ', '_') or 'product'
             
-            filename = f"{name_safe}_{img_index}.{ext}"
-            filepath = category_dir / filename
-            
-            # Download image
-            response = requests.get(image_url, stream=True, timeout=20)
-            if response.status_code == 200:
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
-                logger.info(f"📷 Downloaded: {filename}")
+            # Download image (URLs already in the store are not fetched again)
+            filepath, result = self.image_store.save(
+                self.image_session, image_url, category_dir, f"{name_safe}_{img_index}",
+                rate_limiter=self.rate_limiter, timeout=20, cache=self.response_cache
+            )
+            if result == 'downloaded':
+                logger.info(f"📷 Downloaded: {filepath.name}")
+            if result:
                 return str(filepath)
                 
         except Exception as e:
@@ -319,19 +333,15 @@ class PCJewellerScraper:
             
             product = self.extract_product_details(product_url, category)
             if product:
-                # Download images (limit to 2 per product for speed)
+                # Queue images (limit to 2 per product for speed)
                 for j, img_url in enumerate(product['image_urls'][:2]):
-                    self.download_image(img_url, category, product['name'], j)
-                    time.sleep(0.5)  # Small delay
+                    self.images.submit(self.download_image, img_url, category, product['name'], j)
                 
                 category_products.append(product)
                 
                 # Save progress every 25 products
                 if (i + 1) % 25 == 0:
                     self.save_to_csv(category_products, f"{category}_progress_{i+1}")
-            
-            # Respectful delay between products
-            time.sleep(random.uniform(2, 4))
         
         logger.info(f"✅ {category} completed: {len(category_products)} products")
         return category_products
@@ -381,9 +391,13 @@ class PCJewellerScraper:
                 category_url = categories[category_name][0]
                 products = self.scrape_category(category_url)
                 all_products.extend(products)
-                
-                # Delay between categories
-                time.sleep(random.uniform(10, 15))
+        
+        # Let queued image downloads finish
+        self.images.close()
+        self.image_store.write_manifest()
+        if self.image_processor is not None:
+            self.image_processor.close()
+        self.scraper.close()
         
         # Final save
         if all_products:
@@ -0,0 +1,45 @@
+#!/usr/bin/env python3
+
+from http_clients import classify_head
+from url_patterns import url_kind
+
+# Bytes inspected per page, whatever its size; enough to reach <body> on pcjeweller.com
+TEMPLATE_SNIFF_BYTES = 16384
+
+PAGE_TEMPLATES = ('product', 'listing', 'challenge', 'unknown')
+
+# Structural markers found in the <head> / opening <body> of each template (lower-cased).
+# The listing markers are taken from a saved search page (page_source.html); the product
+# ones are the usual Magento / schema.org tags and may be missing from the live site
+PRODUCT_MARKERS = (
+    b'og:type" content="product', b"og:type' content='product",
+    b'"@type":"product"', b'"@type": "product"',
+    b'catalog-product-view',
+)
+LISTING_MARKERS = (
+    b'listing-outer', b'catalog-category-view', b'ng-controller="searchctrl"',
+)
+
+def classify_page(content, url=None, page_kind=None):
+    """Page template from the first TEMPLATE_SNIFF_BYTES of a body: 'product', 'listing', 'challenge' or 'unknown'
+
+    Structural markers decide first; pages without any fall back to the
+    URL shape (url_patterns.url_kind). 'unknown' means neither told - a
+    category or CMS page, or a product whose markup changed. page_kind, when
+    the fetch already sniffed the body, saves looking for challenge
+    markers again.
+    """
+    head = content[:TEMPLATE_SNIFF_BYTES].lower()
+    if page_kind is None:
+        page_kind = classify_head(head)
+    if page_kind != 'page':
+        return 'challenge'
+    if any(marker in head for marker in PRODUCT_MARKERS):
+        return 'product'
+    if any(marker in head for marker in LISTING_MARKERS):
+        return 'listing'
+    if url is not None:
+        kind = url_kind(url)
+        if kind in ('product', 'listing'):
+            return kind
+    return 'unknown'
@@ -0,0 +1,189 @@
+#!/usr/bin/env python3
+
+import logging
+import multiprocessing
+import os
+import sys
+import threading
+from collections import deque
+from multiprocessing import shared_memory
+from concurrent.futures import ThreadPoolExecutor, ProcessPoolExecutor, wait, FIRST_COMPLETED
+from concurrent.futures.process import BrokenProcessPool
+
+logger = logging.getLogger(__name__)
+
+# Comfortably above a typical product page (page_source.html is 287 KB)
+DEFAULT_SLOT_BYTES = 512 * 1024
+
+class SharedBodyRing:
+    """Reusable page-body slots in one multiprocessing.shared_memory block
+
+    put() copies a body into the next free slot and returns its
+    (offset, length) descriptor, which is all a parse worker receives;
+    release() hands the slot back once the worker is done with it. Bodies
+    larger than a slot, or arriving while every slot is busy, get None and
+    travel pickled instead.
+    """
+
+    def __init__(self, slots=16, slot_bytes=DEFAULT_SLOT_BYTES):
+        self.slot_bytes = slot_bytes
+        self.shm = shared_memory.SharedMemory(create=True, size=slots * slot_bytes)
+        self.name = self.shm.name
+        self.free = deque(range(slots))
+        self.lock = threading.Lock()
+
+    def put(self, content):
+        length = len(content)
+        if length > self.slot_bytes:
+            return None
+        with self.lock:
+            if not self.free:
+                return None
+            slot = self.free.popleft()
+        offset = slot * self.slot_bytes
+        self.shm.buf[offset:offset + length] = content
+        return offset, length
+
+    def release(self, descriptor):
+        with self.lock:
+            self.free.append(descriptor[0] // self.slot_bytes)
+
+    def close(self):
+        self.shm.close()
+        self.shm.unlink()
+
+# Shared blocks a parse worker process has attached to, by name
+_attached = {}
+
+def _attach(name):
+    shm = _attached.get(name)
+    if shm is None:
+        if sys.version_info >= (3, 13):
+            # The creating process owns (and unlinks) the block
+            shm = shared_memory.SharedMemory(name=name, track=False)
+        else:
+            shm = shared_memory.SharedMemory(name=name)
+        _attached[name] = shm
+    return shm
+
+def parse_shared(parse, item, name, offset, length):
+    """Parse worker entry point: read the body from its shared slot, then parse it"""
+    content = bytes(_attach(name).buf[offset:offset + length])
+    return parse(item, content)
+
+class ParsePipeline:
+    """Two-stage pipeline: I/O threads fetch raw bytes, a process pool parses them
+
+    fetch(item) runs on the I/O threads and returns the page bytes (or None).
+    parse(item, content) runs in a parse worker process and returns a
+    compact, picklable record (or None); it must be a module-level
+    function. finish(item, record), if given, runs back on the I/O threads
+    for follow-up network work such as image downloads.
+
+    Fetching pauses while max_pending pages are waiting to be parsed, so a
+    slow parse stage bounds memory instead of piling up page bodies.
+    Bodies reach the workers through a SharedBodyRing, so only a small
+    descriptor is pickled per page; shared_memory=False pickles the bytes.
+    """
+
+    def __init__(self, fetch_workers=8, parse_workers=None, max_pending=None,
+                 shared_memory=True, slot_bytes=DEFAULT_SLOT_BYTES):
+        self.fetch_workers = fetch_workers
+        self.parse_workers = parse_workers or os.cpu_count() or 1
+        self.max_pending = max_pending or self.parse_workers * 4
+        self.shared_memory = shared_memory
+        self.slot_bytes = slot_bytes
+        self.io_executor = None
+        self.parse_executor = None
+        self.ring = None
+
+    def start(self):
+        if self.io_executor is None:
+            self.io_executor = ThreadPoolExecutor(max_workers=self.fetch_workers)
+            # The I/O threads are already running, so parse workers must not be plain forks
+            if 'forkserver' in multiprocessing.get_all_start_methods():
+                context = multiprocessing.get_context('forkserver')
+            else:
+                context = multiprocessing.get_context('spawn')
+            self.parse_executor = ProcessPoolExecutor(max_workers=self.parse_workers, mp_context=context)
+            if self.shared_memory:
+                # One slot per page that can be waiting on the parse stage
+                slots = self.max_pending + self.fetch_workers * 2
+                self.ring = SharedBodyRing(slots=slots, slot_bytes=self.slot_bytes)
+            logger.info(f"🏭 Pipeline: {self.fetch_workers} fetch threads, {self.parse_workers} parse processes")
+
+    def run(self, items, fetch, parse, finish=None):
+        """Yield (item, record) as records complete; failures yield (item, None)"""
+        self.start()
+        pending = iter(items)
+        fetching, parsing, finishing = {}, {}, {}
+        window = self.fetch_workers * 2
+        try:
+            while True:
+                # Keep the fetchers saturated unless the parse stage is backed up
+                while len(fetching) < window and len(parsing) < self.max_pending:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    fetching[self.io_executor.submit(fetch, item)] = item
+
+                if not (fetching or parsing or finishing):
+                    return
+
+                done, _ = wait(list(fetching) + list(parsing) + list(finishing), return_when=FIRST_COMPLETED)
+                for future in done:
+                    if future in fetching:
+                        item = fetching.pop(future)
+                        content = self._result(future, item, 'fetch')
+                        if content is None:
+                            yield item, None
+                            continue
+                        try:
+                            parsing[self._submit_parse(parse, item, content)] = item
+                        except BrokenProcessPool as e:
+                            logger.error(f"❌ parse pool unavailable for {item}: {str(e)}")
+                            yield item, None
+                    elif future in parsing:
+                        item = parsing.pop(future)
+                        record = self._result(future, item, 'parse')
+                        if record is not None and finish is not None:
+                            finishing[self.io_executor.submit(finish, item, record)] = item
+                        else:
+                            yield item, record
+                    else:
+                        item = finishing.pop(future)
+                        yield item, self._result(future, item, 'finish')
+        finally:
+            # Caller stopped early - drop queued work
+            for future in list(fetching) + list(parsing) + list(finishing):
+                future.cancel()
+
+    def _submit_parse(self, parse, item, content):
+        descriptor = self.ring.put(content) if self.ring is not None else None
+        if descriptor is None:
+            return self.parse_executor.submit(parse, item, content)
+        try:
+            future = self.parse_executor.submit(parse_shared, parse, item, self.ring.name, *descriptor)
+        except BaseException:
+            self.ring.release(descriptor)
+            raise
+        # Runs once the worker has finished (or the job was cancelled), never while the slot is being read
+        future.add_done_callback(lambda _, ring=self.ring: ring.release(descriptor))
+        return future
+
+    def _result(self, future, item, stage):
+        try:
+            return future.result()
+        except Exception as e:
+            logger.error(f"❌ {stage} failed for {item}: {str(e)}")
+            return None
+
+    def close(self):
+        """Shut down both worker pools"""
+        if self.io_executor is not None:
+            self.io_executor.shutdown(wait=False, cancel_futures=True)
+            self.parse_executor.shutdown(wait=True, cancel_futures=True)
+            self.io_executor = self.parse_executor = None
+        if self.ring is not None:
+            self.ring.close()
+            self.ring = None
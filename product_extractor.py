@@ -0,0 +1,601 @@
+#!/usr/bin/env python3
+
+import re
+from functools import lru_cache
+from urllib.parse import urljoin
+from lxml import etree
+from bs4.dammit import EncodingDetector
+
+# Field rules for product pages, in priority order where order matters
+NAME_SELECTORS = [
+    'h1.product-name', 'h1', '.product-title',
+    '.pdt-name', '[class*="product-name"]', '.item-name'
+]
+PRICE_CONTAINER_SELECTOR = '.price-container, .product-price, .pdt-price'
+CURRENT_PRICE_SELECTOR = '.current-price, .special-price, .discounted-price'
+ORIGINAL_PRICE_SELECTOR = '.original-price, .regular-price, .mrp'
+SPEC_TABLE_SELECTOR = '.specifications table, .product-specs table, .details table'
+SPEC_DL_SELECTOR = '.specifications dl, .product-details dl'
+SPEC_LI_SELECTOR = '.specifications li, .product-details li, .specs li'
+IMAGE_SELECTORS = [
+    '.product-image img', '.pdt-image img', '.gallery img',
+    '.product-gallery img', '.zoom-image img',
+    'img[src*="catalog/product"]', 'img[alt*="Ring"], img[alt*="Necklace"]'
+]
+DESCRIPTION_SELECTORS = [
+    '.product-description', '.description', '.pdt-description',
+    '.product-details .description', '.summary', '.product-summary'
+]
+AVAILABILITY_SELECTORS = [
+    '.availability', '.stock-status', '.in-stock', '.out-of-stock',
+    '[class*="stock"]', '[class*="availability"]'
+]
+BREADCRUMB_SELECTOR = '.breadcrumb a, .breadcrumbs a'
+
+PRICE_PATTERN = re.compile(r'₹[\d,]+')
+
+# Strings under these tags are not page text (BeautifulSoup's get_text skips them too)
+NON_TEXT_TAGS = frozenset(('script', 'style', 'template'))
+# Rows, cells and definition terms matter only inside a matched spec table / list
+STRUCTURAL_TAGS = frozenset(('tr', 'td', 'th', 'dt', 'dd'))
+EMPTY = frozenset()
+
+# Fields IncrementalProductExtractor can wait for, and the ones it waits for by default
+INCREMENTAL_FIELDS = ('name', 'price', 'original_price', 'description', 'availability',
+                      'image_urls', 'specifications')
+DEFAULT_REQUIRED_FIELDS = ('name', 'price', 'image_urls', 'specifications')
+# A gallery / spec list counts as complete once this many elements have started since its last match
+LIST_QUIET_ELEMENTS = 200
+# Bytes buffered before the encoding is decided and parsing starts
+HEAD_BYTES = 8192
+
+_TOKEN_RE = re.compile(r'(?:[^\s\[]|\[[^\]]*\])+')
+_COMPOUND_RE = re.compile(r'([a-z0-9]+)?((?:\.[\w-]+|\[[\w-]+\*?="[^"]*"\])*)$', re.I)
+_PART_RE = re.compile(r'\.([\w-]+)|\[([\w-]+)(\*?)="([^"]*)"\]')
+
+class Compound:
+    """One compound selector: tag, classes and attribute tests (substring or exact)"""
+
+    __slots__ = ('tag', 'classes', 'contains', 'equals')
+
+    def __init__(self, tag, classes, contains, equals=()):
+        self.tag = tag
+        self.classes = classes
+        self.contains = contains
+        self.equals = equals
+
+    def matches(self, tag, classes, attrs):
+        if self.tag is not None and self.tag != tag:
+            return False
+        if self.classes and not self.classes <= classes:
+            return False
+        for name, value in self.contains:
+            if value not in attrs.get(name, ''):
+                return False
+        for name, value in self.equals:
+            if attrs.get(name) != value:
+                return False
+        return True
+
+@lru_cache(maxsize=None)
+def compile_selector(selector):
+    """Compile a selector group into chains of Compounds (descendant combinators only)
+
+    Only the forms the field rules use are supported: tag, .class,
+    [attr*="value"], [attr="value"], and at most one descendant step.
+    Compiled once per selector.
+    """
+    chains = []
+    for alternative in selector.split(','):
+        chain = []
+        for token in _TOKEN_RE.findall(alternative):
+            match = _COMPOUND_RE.match(token)
+            if not match:
+                raise ValueError(f"Unsupported selector: {selector!r}")
+            tag = match.group(1).lower() if match.group(1) else None
+            classes, contains, equals = set(), [], []
+            for class_name, attr, substring, value in _PART_RE.findall(match.group(2)):
+                if class_name:
+                    classes.add(class_name)
+                elif substring:
+                    contains.append((attr, value))
+                else:
+                    equals.append((attr, value))
+            chain.append(Compound(tag, frozenset(classes), tuple(contains), tuple(equals)))
+        if not 1 <= len(chain) <= 2:
+            raise ValueError(f"Only 'ancestor descendant' pairs are supported: {selector!r}")
+        chains.append(tuple(chain))
+    return tuple(chains)
+
+class SelectorIndex:
+    """Compiled selectors indexed by tag or by a class of their rightmost compound
+
+    Each element is only tested against entries it might match. Compounds
+    used as ancestors are numbered so callers can keep a counter of open
+    elements matching each, which answers 'ancestor descendant' without
+    looking at the stack. Lookups are memoized per tag/class combination,
+    which templated pages repeat constantly.
+    """
+
+    def __init__(self, keyed_chains):
+        self.by_tag, self.by_class, self.generic = {}, {}, []
+        self.ancestor_by_tag, self.ancestor_by_class, self.ancestor_generic = {}, {}, []
+        ancestor_ids = {}
+        for key, chains in keyed_chains:
+            for chain in chains:
+                ancestor = None
+                if len(chain) == 2:
+                    compound = chain[0]
+                    compound_key = (compound.tag, compound.classes, compound.contains, compound.equals)
+                    if compound_key not in ancestor_ids:
+                        ancestor_ids[compound_key] = len(ancestor_ids)
+                        self._add(compound, (ancestor_ids[compound_key], compound), self.ancestor_by_tag,
+                                  self.ancestor_by_class, self.ancestor_generic)
+                    ancestor = ancestor_ids[compound_key]
+                self._add(chain[-1], (key, chain[-1], ancestor), self.by_tag, self.by_class, self.generic)
+        self.ancestor_count = len(ancestor_ids)
+        self.cache = {}
+
+    @staticmethod
+    def _add(compound, entry, by_tag, by_class, generic):
+        if compound.classes:
+            by_class.setdefault(next(iter(compound.classes)), []).append(entry)
+        elif compound.tag is not None:
+            by_tag.setdefault(compound.tag, []).append(entry)
+        else:
+            generic.append(entry)
+
+    def entries(self, tag, classes):
+        """(rule entries, ancestor entries) an element with this tag and classes may match"""
+        key = (tag, classes)
+        entries = self.cache.get(key)
+        if entries is None:
+            rules = list(self.by_tag.get(tag, ()))
+            ancestors = list(self.ancestor_by_tag.get(tag, ()))
+            for class_name in classes:
+                rules.extend(self.by_class.get(class_name, ()))
+                ancestors.extend(self.ancestor_by_class.get(class_name, ()))
+            entries = (rules + self.generic, ancestors + self.ancestor_generic)
+            self.cache[key] = entries
+        return entries
+
+class Rule:
+    """A compiled selector plus the handler that receives its matching elements"""
+
+    __slots__ = ('name', 'chains', 'handler', 'active')
+
+    def __init__(self, name, selector, handler, active=True):
+        self.name = name
+        self.chains = compile_selector(selector)
+        self.handler = handler
+        self.active = active
+
+class Element:
+    """An open element on the walk's stack"""
+
+    __slots__ = ('tag', 'classes', 'attrs', 'opened', 'parts', 'on_text', 'on_end')
+
+    def __init__(self, tag, classes, attrs):
+        self.tag = tag
+        self.classes = classes
+        self.attrs = attrs
+        self.opened = None
+        self.parts = None
+        self.on_text = None
+        self.on_end = None
+
+class FirstMatchField:
+    """Ordered selectors; the first selector whose first match passes `accept` wins
+
+    Mirrors `for selector in selectors: elem = soup.select_one(selector)`.
+    Each selector stops being evaluated after its first match, and the
+    whole field stops once a winner can no longer be beaten.
+    """
+
+    def __init__(self, name, selectors, accept):
+        self.accept = accept
+        self.results = [None] * len(selectors)
+        # seq of the latest element any selector matched
+        self.matched_seq = None
+        self.rules = [
+            Rule(f"{name}:{i}", selector, self._matcher(i))
+            for i, selector in enumerate(selectors)
+        ]
+
+    def _matcher(self, index):
+        def on_match(walk, element):
+            self.rules[index].active = False
+            self.matched_seq = walk.seq
+            walk.capture_text(element, lambda text: self._resolved(index, text))
+        return on_match
+
+    def _resolved(self, index, text):
+        self.results[index] = text
+        if self.value() is not None:
+            for rule in self.rules:
+                rule.active = False
+
+    def value(self):
+        """Winning text, or None while a better selector could still match"""
+        for rule, text in zip(self.rules, self.results):
+            if text is None:
+                if rule.active:
+                    return None
+                continue
+            if self.accept(text):
+                return text
+        return None
+
+    def final(self):
+        for text in self.results:
+            if text is not None and self.accept(text):
+                return text
+        return None
+
+class ProductPageWalk:
+    """One pass over a product page, fed as parser events (an lxml parser target)"""
+
+    def __init__(self):
+        self.stack = []
+        self.seq = 0
+        self.pending = []
+        self.text_parts = []
+        self.active_parts = []
+        self.skip_depth = 0
+
+        self.name = FirstMatchField('name', NAME_SELECTORS, bool)
+        self.description = FirstMatchField('description', DESCRIPTION_SELECTORS, lambda text: len(text) > 20)
+        self.availability = FirstMatchField('availability', AVAILABILITY_SELECTORS, lambda text: True)
+
+        self.price = None
+        self.original_price = None
+        self.current_price_rule = Rule('current_price', CURRENT_PRICE_SELECTOR, self._on_current_price, active=False)
+        self.original_price_rule = Rule('original_price', ORIGINAL_PRICE_SELECTOR, self._on_original_price, active=False)
+        self.container_rule = Rule('price_container', PRICE_CONTAINER_SELECTOR, self._on_price_container)
+
+        self.tables = []
+        self.open_tables = []
+        self.rows = []
+        self.open_rows = []
+        self.dls = []
+        self.open_dls = []
+        self.spec_items = []
+        self.breadcrumbs = []
+        self.images = [[] for _ in IMAGE_SELECTORS]
+        self.last_image_seq = None
+        self.last_spec_seq = None
+
+        rules = self.name.rules + self.description.rules + self.availability.rules + [
+            self.container_rule, self.current_price_rule, self.original_price_rule,
+            Rule('spec_table', SPEC_TABLE_SELECTOR, self._on_spec_table),
+            Rule('spec_dl', SPEC_DL_SELECTOR, self._on_spec_dl),
+            Rule('spec_li', SPEC_LI_SELECTOR, self._on_spec_li),
+            Rule('breadcrumb', BREADCRUMB_SELECTOR, self._on_breadcrumb),
+        ] + [
+            Rule(f"image:{i}", selector, self._image_matcher(i))
+            for i, selector in enumerate(IMAGE_SELECTORS)
+        ]
+        self.index = SelectorIndex((rule, rule.chains) for rule in rules)
+        self.open_counts = [0] * self.index.ancestor_count
+
+    # Text capture -------------------------------------------------------
+
+    def capture_text(self, element, callback):
+        """Call callback with element.get_text(strip=True) once the element closes"""
+        if element.parts is None:
+            element.parts = []
+            element.on_text = []
+            self.active_parts.append(element.parts)
+        element.on_text.append(callback)
+
+    def on_end(self, element, callback):
+        if element.on_end is None:
+            element.on_end = []
+        element.on_end.append(callback)
+
+    def _flush(self):
+        if not self.pending:
+            return
+        text = ''.join(self.pending)
+        self.pending = []
+        if self.skip_depth:
+            return
+        self.text_parts.append(text)
+        stripped = text.strip()
+        if stripped:
+            for parts in self.active_parts:
+                parts.append(stripped)
+
+    # Parser target interface ----------------------------------------------
+
+    def start(self, tag, attrib):
+        if self.pending:
+            self._flush()
+        self.seq += 1
+        if not isinstance(tag, str):
+            self.stack.append(None)
+            return
+        classes = frozenset(attrib['class'].split()) if 'class' in attrib else EMPTY
+        open_counts = self.open_counts
+
+        rule_entries, ancestor_entries = self.index.entries(tag, classes)
+
+        matched = []
+        for rule, compound, ancestor in rule_entries:
+            if rule.active and (ancestor is None or open_counts[ancestor]) and rule not in matched \
+                    and compound.matches(tag, classes, attrib):
+                matched.append(rule)
+        opened = [index for index, compound in ancestor_entries if compound.matches(tag, classes, attrib)]
+
+        structural = tag in STRUCTURAL_TAGS and (self.open_tables or self.open_rows or self.open_dls)
+        if not (matched or opened or structural or tag in NON_TEXT_TAGS):
+            # Nothing to track until this element closes
+            self.stack.append(None)
+            return
+
+        element = Element(tag, classes, attrib)
+        self.stack.append(element)
+        if opened:
+            element.opened = opened
+            for index in opened:
+                open_counts[index] += 1
+        if tag in NON_TEXT_TAGS:
+            self.skip_depth += 1
+        if structural:
+            self._structure(tag, element)
+        for rule in matched:
+            rule.handler(self, element)
+
+    def end(self, tag):
+        if self.pending:
+            self._flush()
+        if not self.stack:
+            return
+        element = self.stack.pop()
+        if element is None:
+            return
+        if element.tag in NON_TEXT_TAGS:
+            self.skip_depth -= 1
+        if element.opened:
+            for index in element.opened:
+                self.open_counts[index] -= 1
+        if element.parts is not None:
+            # Captures open and close with their elements, so this one is the innermost
+            self.active_parts.pop()
+            text = ''.join(element.parts)
+            for callback in element.on_text:
+                callback(text)
+        if element.on_end is not None:
+            for callback in element.on_end:
+                callback()
+
+    def data(self, text):
+        self.pending.append(text)
+
+    def comment(self, text):
+        self._flush()
+
+    def close(self):
+        self._flush()
+        while self.stack:
+            self.end(None)
+        return self.result()
+
+    # Structural handlers (rows, cells and definition terms of matched specs)
+
+    def _structure(self, tag, element):
+        self.last_spec_seq = self.seq
+        if tag == 'tr' and self.open_tables:
+            row = {'seq': self.seq, 'tables': tuple(self.open_tables), 'cells': [], 'count': 0}
+            self.rows.append(row)
+            self.open_rows.append(row)
+            self.on_end(element, self.open_rows.pop)
+        elif tag in ('td', 'th'):
+            for row in self.open_rows:
+                row['count'] += 1
+                if len(row['cells']) < 2:
+                    self._capture_into(element, row['cells'])
+        elif tag in ('dt', 'dd'):
+            for dl in self.open_dls:
+                self._capture_into(element, dl[tag])
+
+    def _capture_into(self, element, target):
+        index = len(target)
+        target.append('')
+
+        def store(text):
+            target[index] = text
+        self.capture_text(element, store)
+
+    # Rule handlers ------------------------------------------------------
+
+    def _on_price_container(self, walk, element):
+        # Only the first container counts; the price rules look inside it only
+        self.container_rule.active = False
+        self.current_price_rule.active = True
+        self.original_price_rule.active = True
+
+        def leave():
+            self.current_price_rule.active = False
+            self.original_price_rule.active = False
+        self.on_end(element, leave)
+
+    def _on_current_price(self, walk, element):
+        self.current_price_rule.active = False
+        self.capture_text(element, lambda text: setattr(self, 'price', text))
+
+    def _on_original_price(self, walk, element):
+        self.original_price_rule.active = False
+        self.capture_text(element, lambda text: setattr(self, 'original_price', text))
+
+    def _on_spec_table(self, walk, element):
+        self.last_spec_seq = self.seq
+        self.tables.append(self.seq)
+        self.open_tables.append(self.seq)
+        self.on_end(element, self.open_tables.pop)
+
+    def _on_spec_dl(self, walk, element):
+        self.last_spec_seq = self.seq
+        dl = {'dt': [], 'dd': []}
+        self.dls.append(dl)
+        self.open_dls.append(dl)
+        self.on_end(element, self.open_dls.pop)
+
+    def _on_spec_li(self, walk, element):
+        self.last_spec_seq = self.seq
+        self._capture_into(element, self.spec_items)
+
+    def _on_breadcrumb(self, walk, element):
+        self._capture_into(element, self.breadcrumbs)
+
+    def _image_matcher(self, index):
+        def on_match(walk, element):
+            attrs = element.attrs
+            src = attrs.get('src') or attrs.get('data-src') or attrs.get('data-original')
+            if src:
+                self.images[index].append(src)
+                self.last_image_seq = self.seq
+        return on_match
+
+    # Result ---------------------------------------------------------------
+
+    def filled(self, field):
+        """Whether a field already holds its value, so the rest of the page is not needed for it
+
+        Single values count once no better selector can still match, or
+        once a fallback has held for LIST_QUIET_ELEMENTS elements. List
+        fields (images, specs) count once something was found and
+        LIST_QUIET_ELEMENTS elements have gone by without another match.
+        """
+        if field in ('name', 'description', 'availability'):
+            rules = getattr(self, field)
+            if rules.value() is not None:
+                return True
+            return (rules.final() is not None and self.seq - rules.matched_seq >= LIST_QUIET_ELEMENTS)
+        if field in ('price', 'original_price'):
+            return bool(getattr(self, field))
+        if field == 'image_urls':
+            return (self.last_image_seq is not None and self.seq - self.last_image_seq >= LIST_QUIET_ELEMENTS
+                    and bool(self.image_urls()))
+        if field == 'specifications':
+            return (self.last_spec_seq is not None and self.seq - self.last_spec_seq >= LIST_QUIET_ELEMENTS
+                    and not (self.open_tables or self.open_dls) and bool(self.specifications()))
+        raise ValueError(f"Unknown field {field!r}")
+
+    def specifications(self):
+        specs = {}
+        for table in self.tables:
+            for row in self.rows:
+                if table in row['tables'] and row['count'] >= 2:
+                    key = row['cells'][0].lower()
+                    value = row['cells'][1]
+                    if key and value:
+                        specs[key] = value
+        for dl in self.dls:
+            for key, value in zip(dl['dt'], dl['dd']):
+                key = key.lower()
+                if key and value:
+                    specs[key] = value
+        for text in self.spec_items:
+            if ':' in text:
+                key, value = text.split(':', 1)
+                specs[key.strip().lower()] = value.strip()
+        return specs
+
+    def image_urls(self):
+        urls = []
+        for sources in self.images:
+            for src in sources:
+                if src.startswith('//'):
+                    src = 'https:' + src
+                elif src.startswith('/'):
+                    src = urljoin("https://www.pcjeweller.com", src)
+                if src not in urls and 'catalog/product' in src:
+                    urls.append(src)
+        return urls
+
+    def result(self):
+        price = self.price or ''
+        if not price:
+            price_match = PRICE_PATTERN.search(''.join(self.text_parts))
+            if price_match:
+                price = price_match.group()
+        return {
+            'name': self.name.final() or '',
+            'price': price,
+            'original_price': self.original_price or '',
+            'specifications': self.specifications(),
+            'image_urls': self.image_urls(),
+            'description': self.description.final() or '',
+            'availability': self.availability.final() or '',
+            'subcategory': self.breadcrumbs[-1] if len(self.breadcrumbs) > 1 else '',
+        }
+
+def extract_product_fields(content):
+    """Walk a product page once and return its raw fields
+
+    The page is parsed by lxml straight into ProductPageWalk's handlers,
+    so no tree is built and every field rule is evaluated in the same pass.
+    Keys: name, price, original_price, specifications (dict), image_urls,
+    description, availability, subcategory.
+    """
+    encoding = EncodingDetector.find_declared_encoding(content, is_html=True) or 'utf-8'
+    parser = etree.HTMLParser(target=ProductPageWalk(), encoding=encoding)
+    parser.feed(content)
+    return parser.close()
+
+class IncrementalProductExtractor:
+    """Push-parser front end to ProductPageWalk for bodies that arrive in chunks
+
+    feed() each chunk as it is read off the socket; it returns True once
+    every required field is filled, and the caller can stop reading and
+    close the connection. result() returns the fields seen so far, or,
+    if the whole page was fed without stopping early, exactly what
+    extract_product_fields would return.
+    """
+
+    def __init__(self, required=DEFAULT_REQUIRED_FIELDS):
+        unknown = set(required) - set(INCREMENTAL_FIELDS)
+        if unknown:
+            raise ValueError(f"Cannot wait for {sorted(unknown)}, expected fields from {INCREMENTAL_FIELDS}")
+        self.required = tuple(required)
+        self.walk = ProductPageWalk()
+        self.parser = None
+        self.head = []
+        self.bytes_fed = 0
+        self.done = False
+        self.fields = None
+
+    @property
+    def started(self):
+        return self.bytes_fed > 0
+
+    def _start(self):
+        head = b''.join(self.head)
+        self.head = None
+        encoding = EncodingDetector.find_declared_encoding(head, is_html=True, search_entire_document=True) or 'utf-8'
+        self.parser = etree.HTMLParser(target=self.walk, encoding=encoding)
+        self.parser.feed(head)
+
+    def feed(self, chunk):
+        if self.done:
+            return True
+        self.bytes_fed += len(chunk)
+        if self.parser is None:
+            self.head.append(chunk)
+            if self.bytes_fed < HEAD_BYTES:
+                return False
+            self._start()
+        else:
+            self.parser.feed(chunk)
+        if all(self.walk.filled(field) for field in self.required):
+            self.done = True
+            self.fields = self.walk.result()
+        return self.done
+
+    def result(self):
+        if self.fields is None:
+            if self.parser is None:
+                self._start()
+            self.fields = self.parser.close()
+        return self.fields
@@ -0,0 +1,105 @@
+#!/usr/bin/env python3
+
+import logging
+import threading
+import time
+from urllib.parse import urlparse
+
+logger = logging.getLogger(__name__)
+
+# Responses that mean the site wants us to slow down
+THROTTLE_STATUSES = {403, 429, 503}
+
+class TokenBucket:
+    """Token bucket for a single host"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def reserve(self):
+        """Take one token and return how long the caller must wait before using it"""
+        with self.lock:
+            now = time.monotonic()
+            self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+            self.updated = now
+            self.tokens -= 1
+            if self.tokens >= 0:
+                return 0.0
+            return -self.tokens / self.rate
+
+class AdaptiveRateLimiter:
+    """Per-host token buckets tuned by response health (AIMD)
+
+    Every healthy response raises the host's rate additively up to max_rate;
+    a 429/403/503 or a failed request cuts it multiplicatively down to
+    min_rate and drains the bucket, so the crawl settles at the highest
+    rate the site tolerates.
+    """
+
+    def __init__(self, initial_rate=1.0, min_rate=0.05, max_rate=8.0,
+                 increase=0.1, backoff=0.5, burst=2):
+        self.initial_rate = initial_rate
+        self.min_rate = min_rate
+        self.max_rate = max_rate
+        self.increase = increase
+        self.backoff = backoff
+        self.burst = burst
+        self.buckets = {}
+        self.lock = threading.Lock()
+
+    def bucket(self, url):
+        """Return the bucket for the URL's host, creating it on first use"""
+        host = urlparse(url).netloc
+        with self.lock:
+            if host not in self.buckets:
+                self.buckets[host] = TokenBucket(self.initial_rate, self.burst)
+            return self.buckets[host]
+
+    def reserve(self, url):
+        """Non-blocking: claim a slot for the URL's host and return the delay in seconds"""
+        return self.bucket(url).reserve()
+
+    def acquire(self, url):
+        """Block until a request to the URL's host is allowed"""
+        delay = self.reserve(url)
+        if delay > 0:
+            time.sleep(delay)
+        return delay
+
+    def record(self, url, status_code):
+        """Adjust the host's rate from a response status; None for a request that failed without one"""
+        bucket = self.bucket(url)
+        with bucket.lock:
+            if status_code is None or status_code in THROTTLE_STATUSES:
+                old_rate = bucket.rate
+                bucket.rate = max(self.min_rate, bucket.rate * self.backoff)
+                bucket.tokens = min(bucket.tokens, 0)
+                logger.warning(f"🐢 {status_code or 'Failed request'} from {urlparse(url).netloc}: rate {old_rate:.2f} -> {bucket.rate:.2f} req/s")
+            elif 200 <= status_code < 400:
+                bucket.rate = min(self.max_rate, bucket.rate + self.increase)
+
+    def get(self, session, url, **kwargs):
+        """GET through any requests-style session under the limiter"""
+        self.acquire(url)
+        response = session.get(url, **kwargs)
+        self.record(url, response.status_code)
+        return response
+
+    def current_rate(self, url):
+        """Current allowed requests/second for the URL's host"""
+        return self.bucket(url).rate
+
+_shared_limiter = None
+_shared_limiter_lock = threading.Lock()
+
+def get_rate_limiter():
+    """Return the process-wide rate limiter shared by every scraper"""
+    global _shared_limiter
+    with _shared_limiter_lock:
+        if _shared_limiter is None:
+            _shared_limiter = AdaptiveRateLimiter()
+        return _shared_limiter
@@ -0,0 +1,354 @@
+#!/usr/bin/env python3
+
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from collections import Counter
+from pathlib import Path
+from url_patterns import normalize_url, url_kind
+from http_clients import stream_get
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_CACHE_DIR = "http_cache"
+DEFAULT_MAX_BYTES = 1024 * 1024 * 1024  # 1 GB of bodies
+
+# Seconds a cached response stays fresh, per URL kind (see url_patterns.url_kind)
+DEFAULT_TTLS = {
+    'listing': 6 * 3600,
+    'product': 24 * 3600,
+    'image': 30 * 24 * 3600,
+    'page': 3600,
+}
+
+def validator_key(etag, last_modified):
+    """Stand-in body hash for a page whose body was not kept: its validators, or None without any"""
+    if etag:
+        return f"etag:{etag}"
+    if last_modified:
+        return f"lm:{last_modified}"
+    return None
+
+class CachedResponse:
+    """Minimal requests-style response rebuilt from the cache"""
+
+    def __init__(self, url, status_code, content, headers, encoding=None, body_hash=None):
+        self.url = url
+        self.status_code = status_code
+        self.content = content
+        self.headers = headers
+        self.encoding = encoding or 'utf-8'
+        self.body_hash = body_hash
+        self.from_cache = True
+        # Set when the server answered 304 Not Modified for this body
+        self.not_modified = False
+
+    @property
+    def text(self):
+        return self.content.decode(self.encoding, errors='replace')
+
+class ResponseCache:
+    """On-disk HTTP response cache
+
+    Bodies live in a content-addressed store (bodies/ab/<sha256>) so pages
+    with identical bytes are stored once. A SQLite index maps normalized
+    URLs to body hashes with fetch and last-access times; freshness comes
+    from per-URL-kind TTLs and the store is kept under max_bytes by evicting
+    the least recently used entries.
+
+    ETag / Last-Modified validators are kept for pages and images so stale
+    entries are revalidated with a conditional GET, and extracted product
+    records are kept per body hash so an unchanged page is never re-parsed.
+    Pages read only until their fields were extracted (response.truncated)
+    keep no body; their record is keyed by the page's validators instead,
+    and callers that name the extractor (record_extractor) get a bodiless
+    304 CachedResponse back for them, whose record load_record finds.
+    """
+
+    def __init__(self, cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_MAX_BYTES, ttls=None):
+        self.cache_dir = Path(cache_dir)
+        self.bodies_dir = self.cache_dir / "bodies"
+        self.bodies_dir.mkdir(parents=True, exist_ok=True)
+        self.max_bytes = max_bytes
+        self.ttls = dict(DEFAULT_TTLS, **(ttls or {}))
+        self.hits = 0
+        self.misses = 0
+        self.lock = threading.Lock()
+        # Body hashes being written by store(); eviction leaves their files alone
+        self.storing = Counter()
+        self.db = sqlite3.connect(str(self.cache_dir / "index.sqlite3"), check_same_thread=False)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS entries (
+                url TEXT PRIMARY KEY,
+                body_hash TEXT NOT NULL,
+                size INTEGER NOT NULL,
+                status INTEGER NOT NULL,
+                headers TEXT NOT NULL,
+                encoding TEXT,
+                fetched_at REAL NOT NULL,
+                accessed_at REAL NOT NULL
+            )
+        """)
+        self.db.execute("CREATE INDEX IF NOT EXISTS entries_accessed ON entries (accessed_at)")
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS validators (
+                url TEXT PRIMARY KEY,
+                etag TEXT,
+                last_modified TEXT,
+                checked_at REAL NOT NULL
+            )
+        """)
+        self.db.execute("""
+            CREATE TABLE IF NOT EXISTS records (
+                url TEXT NOT NULL,
+                extractor TEXT NOT NULL,
+                body_hash TEXT NOT NULL,
+                record TEXT NOT NULL,
+                PRIMARY KEY (url, extractor)
+            )
+        """)
+        self.db.commit()
+
+    def _body_path(self, body_hash):
+        return self.bodies_dir / body_hash[:2] / body_hash
+
+    def ttl_for(self, url):
+        return self.ttls.get(url_kind(url), self.ttls['page'])
+
+    def _record_key(self, key, extractor):
+        """(validator key, checked_at) of a page kept only as a record by extractor, or None (lock held)"""
+        row = self.db.execute(
+            "SELECT etag, last_modified, checked_at FROM validators WHERE url = ?", (key,)
+        ).fetchone()
+        if row is None:
+            return None
+        record_key = validator_key(row[0], row[1])
+        found = self.db.execute(
+            "SELECT 1 FROM records WHERE url = ? AND extractor = ? AND body_hash = ?",
+            (key, extractor, record_key)
+        ).fetchone()
+        return (record_key, row[2]) if found else None
+
+    def record_response(self, url, record_key, headers=None):
+        """Bodiless 304 response standing for a page whose record is kept under record_key"""
+        response = CachedResponse(url, 304, b'', headers or {}, body_hash=record_key)
+        response.not_modified = True
+        return response
+
+    def lookup(self, url, allow_stale=False, record_extractor=None):
+        """Return a fresh CachedResponse for the URL (or a stale one if allowed), or None
+
+        With record_extractor, a page kept only as that extractor's record
+        and checked within its TTL comes back as a bodiless 304 response.
+        """
+        key = normalize_url(url)
+        with self.lock:
+            row = self.db.execute(
+                "SELECT body_hash, status, headers, encoding, fetched_at FROM entries WHERE url = ?",
+                (key,)
+            ).fetchone()
+            if row is None and record_extractor is not None and not allow_stale:
+                record = self._record_key(key, record_extractor)
+                if record is not None and time.time() - record[1] <= self.ttl_for(key):
+                    self.hits += 1
+                    return self.record_response(url, record[0])
+            if row is None or (not allow_stale and time.time() - row[4] > self.ttl_for(key)):
+                self.misses += 1
+                return None
+            body_hash, status, headers, encoding, _ = row
+            try:
+                content = self._body_path(body_hash).read_bytes()
+            except FileNotFoundError:
+                self.db.execute("DELETE FROM entries WHERE url = ?", (key,))
+                self.db.commit()
+                self.misses += 1
+                return None
+            self.db.execute("UPDATE entries SET accessed_at = ? WHERE url = ?", (time.time(), key))
+            self.db.commit()
+            self.hits += 1
+        return CachedResponse(url, status, content, json.loads(headers), encoding, body_hash)
+
+    def store(self, url, response):
+        """Store a successful response body under the URL (never a challenge or block page)"""
+        if response.status_code != 200 or getattr(response, 'from_cache', False):
+            return
+        if getattr(response, 'page_kind', 'page') != 'page':
+            return
+        # Bodies cut short once their fields were extracted are not the page, but its
+        # validators still identify it: records extracted from it are keyed by those
+        if getattr(response, 'truncated', False):
+            response.body_hash = validator_key(response.headers.get('ETag'), response.headers.get('Last-Modified'))
+            self.save_validators(url, response)
+            return
+        content = response.content
+        body_hash = hashlib.sha256(content).hexdigest()
+        body_path = self._body_path(body_hash)
+        with self.lock:
+            self.storing[body_hash] += 1
+        try:
+            # Written outside the lock; until its row is in, _evict leaves this body alone
+            if not body_path.exists():
+                body_path.parent.mkdir(exist_ok=True)
+                tmp_path = body_path.with_suffix(f".tmp{threading.get_ident()}")
+                tmp_path.write_bytes(content)
+                os.replace(tmp_path, body_path)
+            now = time.time()
+            headers = json.dumps(dict(response.headers))
+            with self.lock:
+                self.db.execute(
+                    "INSERT OR REPLACE INTO entries VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                    (normalize_url(url), body_hash, len(content), response.status_code,
+                     headers, response.encoding, now, now)
+                )
+                self.db.commit()
+        finally:
+            with self.lock:
+                self.storing[body_hash] -= 1
+                if not self.storing[body_hash]:
+                    del self.storing[body_hash]
+        with self.lock:
+            self._evict()
+        self.save_validators(url, response)
+
+    def save_validators(self, url, response):
+        """Remember ETag / Last-Modified from a response (page or image)"""
+        etag = response.headers.get('ETag')
+        last_modified = response.headers.get('Last-Modified')
+        if not etag and not last_modified:
+            return
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO validators VALUES (?, ?, ?, ?)",
+                (normalize_url(url), etag, last_modified, time.time())
+            )
+            self.db.commit()
+
+    def validator_headers(self, url):
+        """If-None-Match / If-Modified-Since headers for a URL seen before ({} if none)"""
+        with self.lock:
+            row = self.db.execute(
+                "SELECT etag, last_modified FROM validators WHERE url = ?", (normalize_url(url),)
+            ).fetchone()
+        headers = {}
+        if row:
+            if row[0]:
+                headers['If-None-Match'] = row[0]
+            if row[1]:
+                headers['If-Modified-Since'] = row[1]
+        return headers
+
+    def revalidate(self, url, response):
+        """Handle a 304 for a cached page: refresh its age and return the stored body"""
+        key = normalize_url(url)
+        with self.lock:
+            self.db.execute("UPDATE entries SET fetched_at = ? WHERE url = ?", (time.time(), key))
+            self.db.commit()
+        self.save_validators(url, response)
+        cached = self.lookup(url, allow_stale=True)
+        if cached is not None:
+            cached.not_modified = True
+        return cached
+
+    def conditional_headers(self, url, record_extractor=None):
+        """Validator headers for a page only if its old body is still in the cache
+
+        With record_extractor, also for a page kept only as that
+        extractor's record.
+        """
+        key = normalize_url(url)
+        with self.lock:
+            row = self.db.execute("SELECT body_hash FROM entries WHERE url = ?", (key,)).fetchone()
+            record = self._record_key(key, record_extractor) if record_extractor is not None else None
+        if (row is None or not self._body_path(row[0]).exists()) and record is None:
+            return {}
+        return self.validator_headers(url)
+
+    def fetch(self, session, url, rate_limiter=None, headers=None, record_extractor=None, **kwargs):
+        """GET via the cache: serve a fresh entry, revalidate a stale one, or fetch and store
+
+        record_extractor names the extractor whose records the caller
+        reuses; pages kept only as its record are then served and
+        revalidated too, as bodiless 304 responses.
+        """
+        cached = self.lookup(url, record_extractor=record_extractor)
+        if cached is not None:
+            return cached
+        request_headers = dict(headers or {})
+        validators = self.conditional_headers(url, record_extractor)
+        request_headers.update(validators)
+        response = stream_get(session, url, rate_limiter=rate_limiter, headers=request_headers, **kwargs)
+        if response.status_code == 304:
+            cached = self.revalidate(url, response)
+            if cached is not None:
+                return cached
+            if record_extractor is not None and validators:
+                # Only the record was kept; it is keyed by the validators just sent
+                record_key = validator_key(validators.get('If-None-Match'), validators.get('If-Modified-Since'))
+                return self.record_response(url, record_key, dict(response.headers))
+        self.store(url, response)
+        return response
+
+    def load_record(self, url, extractor, response):
+        """Record previously extracted from exactly this body, or None"""
+        body_hash = getattr(response, 'body_hash', None)
+        if body_hash is None:
+            return None
+        with self.lock:
+            row = self.db.execute(
+                "SELECT record FROM records WHERE url = ? AND extractor = ? AND body_hash = ?",
+                (normalize_url(url), extractor, body_hash)
+            ).fetchone()
+        return json.loads(row[0]) if row else None
+
+    def save_record(self, url, extractor, response, record):
+        """Keep an extracted record keyed by the body it came from"""
+        body_hash = getattr(response, 'body_hash', None) or hashlib.sha256(response.content).hexdigest()
+        with self.lock:
+            self.db.execute(
+                "INSERT OR REPLACE INTO records VALUES (?, ?, ?, ?)",
+                (normalize_url(url), extractor, body_hash, json.dumps(record, ensure_ascii=False))
+            )
+            self.db.commit()
+
+    def _evict(self):
+        """Drop least recently used entries until bodies fit in max_bytes (lock held)
+
+        Bodies a concurrent store() is writing keep their file even when
+        an older entry sharing them is dropped.
+        """
+        total = self.db.execute(
+            "SELECT COALESCE(SUM(size), 0) FROM (SELECT DISTINCT body_hash, size FROM entries)"
+        ).fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        rows = self.db.execute("SELECT url, body_hash, size FROM entries ORDER BY accessed_at").fetchall()
+        for url, body_hash, size in rows:
+            if total <= self.max_bytes:
+                break
+            self.db.execute("DELETE FROM entries WHERE url = ?", (url,))
+            still_used = self.db.execute(
+                "SELECT 1 FROM entries WHERE body_hash = ? LIMIT 1", (body_hash,)
+            ).fetchone()
+            if not still_used and body_hash not in self.storing:
+                self._body_path(body_hash).unlink(missing_ok=True)
+                total -= size
+        self.db.commit()
+        logger.info(f"🧹 Response cache trimmed to {total / 1024 / 1024:.1f} MB")
+
+    def stats(self):
+        return {'hits': self.hits, 'misses': self.misses}
+
+_shared_cache = None
+_shared_cache_lock = threading.Lock()
+
+def get_response_cache():
+    """Return the process-wide response cache shared by every scraper"""
+    global _shared_cache
+    with _shared_cache_lock:
+        if _shared_cache is None:
+            _shared_cache = ResponseCache()
+        return _shared_cache
@@ -0,0 +1,120 @@
+#!/usr/bin/env python3
+
+import heapq
+import logging
+import random
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+logger = logging.getLogger(__name__)
+
+class DelayedRetryQueue:
+    """Heap of (due time, item, attempt) ordered by when each retry falls due"""
+
+    def __init__(self):
+        self.heap = []
+        self.counter = 0
+        self.lock = threading.Lock()
+
+    def push(self, item, attempt, delay):
+        with self.lock:
+            self.counter += 1
+            heapq.heappush(self.heap, (time.monotonic() + delay, self.counter, item, attempt))
+
+    def pop_due(self):
+        """Remove and return (item, attempt) pairs whose retry time has come"""
+        now = time.monotonic()
+        due = []
+        with self.lock:
+            while self.heap and self.heap[0][0] <= now:
+                _, _, item, attempt = heapq.heappop(self.heap)
+                due.append((item, attempt))
+        return due
+
+    def time_until_due(self):
+        """Seconds until the next retry is due, or None if nothing is parked"""
+        with self.lock:
+            if not self.heap:
+                return None
+            return max(0.0, self.heap[0][0] - time.monotonic())
+
+    def __len__(self):
+        with self.lock:
+            return len(self.heap)
+
+class RetryScheduler:
+    """Non-blocking retries with exponential backoff and jitter
+
+    A failed item is parked in a DelayedRetryQueue instead of sleeping its
+    worker; run() keeps the workers busy with other items and resubmits
+    each retry once its backoff has elapsed.
+    """
+
+    def __init__(self, base_delay=5.0, max_delay=60.0, max_attempts=3, jitter=0.5):
+        self.base_delay = base_delay
+        self.max_delay = max_delay
+        self.max_attempts = max_attempts
+        self.jitter = jitter
+
+    def backoff(self, attempt):
+        """Delay after failed attempt number `attempt` (1-based)"""
+        delay = min(self.max_delay, self.base_delay * 2 ** (attempt - 1))
+        return delay * random.uniform(1 - self.jitter, 1 + self.jitter)
+
+    def schedule(self, queue, item, attempt):
+        """Park item for another attempt; False once it has used up its attempts"""
+        if attempt >= self.max_attempts:
+            return False
+        delay = self.backoff(attempt)
+        queue.push(item, attempt, delay)
+        logger.info(f"⏳ Retry {attempt + 1}/{self.max_attempts} in {delay:.1f}s: {item}")
+        return True
+
+    def run(self, items, work, max_workers=4):
+        """Run work(item) over items on a thread pool, yielding (item, result) as they finish
+
+        A result of None (or an exception) counts as a failure and the item
+        is retried after its backoff; once its attempts are used up it is
+        yielded with None.
+        """
+        queue = DelayedRetryQueue()
+        pending = iter(items)
+        in_flight = {}
+        window = max_workers * 2
+        executor = ThreadPoolExecutor(max_workers=max_workers)
+        try:
+            while True:
+                # Due retries go first, then fresh items, up to the window
+                for item, attempt in queue.pop_due():
+                    in_flight[executor.submit(work, item)] = (item, attempt + 1)
+                while len(in_flight) < window:
+                    item = next(pending, None)
+                    if item is None:
+                        break
+                    in_flight[executor.submit(work, item)] = (item, 1)
+
+                if not in_flight:
+                    delay = queue.time_until_due()
+                    if delay is None:
+                        return
+                    # Nothing to run until the next retry falls due
+                    time.sleep(delay)
+                    continue
+
+                done, _ = wait(in_flight, timeout=queue.time_until_due(), return_when=FIRST_COMPLETED)
+                for future in done:
+                    item, attempt = in_flight.pop(future)
+                    try:
+                        result = future.result()
+                    except Exception as e:
+                        logger.error(f"❌ {item}: {str(e)}")
+                        result = None
+                    if result is not None:
+                        yield item, result
+                    elif not self.schedule(queue, item, attempt):
+                        yield item, None
+        finally:
+            for future in in_flight:
+                future.cancel()
+            executor.shutdown(wait=False)
@@ -19,8 +19,22 @@ import io
 import logging
 from typing import List, Dict, Optional
 from dataclasses import dataclass, asdict
+from functools import partial
 import threading
 from concurrent.futures import ThreadPoolExecutor, as_completed
+import importlib.util
+from rate_limiter import get_rate_limiter
+from response_cache import get_response_cache
+from clearance_pool import get_clearance_pool
+from http_clients import stream_get, read_body
+from fetch_strategy import FetchLadder, get_browser_fetcher
+from html_parsing import parse_html, resolve_backend
+from parse_pipeline import ParsePipeline
+from image_pipeline import ImagePipeline, DEFAULT_IMAGE_WORKERS
+from image_store import get_image_store
+from image_variants import get_image_processor
+from selector_profiler import get_selector_profiler
+from image_urls import canonical_image_urls
 
 # Configure logging
 logging.basicConfig(
@@ -33,6 +47,9 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
+# httpx only speaks HTTP/2 when the optional h2 package is installed
+HTTP2_AVAILABLE = importlib.util.find_spec("h2") is not None
+
 @dataclass
 class Product:
     """Product data structure"""
@@ -63,12 +80,173 @@ class Product:
         if self.image_files is None:
             self.image_files = []
 
+def parse_product_page(product_url: str, content: bytes, category: str, base_url: str,
+                       parser_backend: str, profiler=None, image_size=None) -> Optional[Product]:
+    """Extract product data from a product page's bytes
+
+    Module-level so the parse stage can run it in a worker process.
+    image_size picks among resized copies of a photo (see canonical_image_urls).
+    """
+    profiler = profiler or get_selector_profiler()
+    soup = parse_html(content, parser_backend)
+    
+    product = Product()
+    product.product_url = product_url
+    product.category = category
+    
+    try:
+        # Extract product name
+        name_selectors = [
+            'h1.product-name', 'h1.product-title', '.product-name h1', 
+            'h1', '.product-title', '[data-role="product-name"]'
+        ]
+        name_elem = profiler.select_first(soup, 'robust.name', name_selectors)
+        if name_elem:
+            product.name = name_elem.get_text(strip=True)
+        
+        # Extract price
+        price_selectors = [
+            '.price-current', '.current-price', '.price-final', 
+            '.special-price', '.price .amount', '.price-box .price'
+        ]
+        price_elem = profiler.select_first(soup, 'robust.price', price_selectors)
+        if price_elem:
+            product.price = price_elem.get_text(strip=True)
+        
+        # Extract original price
+        original_price_selectors = [
+            '.price-old', '.old-price', '.price-was', '.regular-price'
+        ]
+        price_elem = profiler.select_first(soup, 'robust.original_price', original_price_selectors)
+        if price_elem:
+            product.original_price = price_elem.get_text(strip=True)
+        
+        # Extract specifications
+        spec_data = {}
+        
+        # Try table format
+        spec_tables = soup.select('table.product-specs, .product-attributes table, .specifications table')
+        for table in spec_tables:
+            rows = table.select('tr')
+            for row in rows:
+                cells = row.select('td, th')
+                if len(cells) >= 2:
+                    key = cells[0].get_text(strip=True).lower()
+                    value = cells[1].get_text(strip=True)
+                    spec_data[key] = value
+        
+        # Try list format
+        spec_lists = soup.select('.product-specs li, .specifications li, .product-attributes li')
+        for item in spec_lists:
+            text = item.get_text(strip=True)
+            if ':' in text:
+                key, value = text.split(':', 1)
+                spec_data[key.strip().lower()] = value.strip()
+        
+        # Try div format
+        spec_divs = soup.select('.spec-item, .attribute-item, .product-detail-item')
+        for item in spec_divs:
+            label = item.select_one('.label, .key, .name')
+            value = item.select_one('.value, .val, .content')
+            if label and value:
+                spec_data[label.get_text(strip=True).lower()] = value.get_text(strip=True)
+        
+        # Map specifications to product fields
+        product.weight = spec_data.get('weight', '') or spec_data.get('gross weight', '')
+        product.metal = spec_data.get('metal', '') or spec_data.get('metal type', '')
+        product.purity = spec_data.get('purity', '') or spec_data.get('gold purity', '')
+        product.stone = spec_data.get('stone', '') or spec_data.get('gemstone', '')
+        product.size = spec_data.get('size', '') or spec_data.get('ring size', '')
+        product.color = spec_data.get('color', '') or spec_data.get('metal color', '')
+        product.sku = spec_data.get('sku', '') or spec_data.get('product code', '')
+        
+        # Extract description
+        desc_selectors = [
+            '.product-description', '.product-details', '.description', 
+            '.product-info', '.product-summary'
+        ]
+        desc_elem = profiler.select_first(soup, 'robust.description', desc_selectors)
+        if desc_elem:
+            product.description = desc_elem.get_text(strip=True)[:500]  # Limit description
+        
+        # Extract image URLs
+        img_selectors = [
+            '.product-image img', '.product-gallery img', '.product-photos img',
+            '.main-image img', '.gallery-image img', 'img[src*="product"]'
+        ]
+        for images in profiler.select_each(soup, 'robust.images', img_selectors):
+            for img in images:
+                src = img.get('src') or img.get('data-src')
+                if src:
+                    if src.startswith('/'):
+                        src = urljoin(base_url, src)
+                    if src not in product.image_urls:
+                        product.image_urls.append(src)
+        # One URL per photo, not one per resize of it
+        product.image_urls = canonical_image_urls(product.image_urls, size=image_size)
+        
+        # Extract availability
+        availability_selectors = [
+            '.availability', '.stock-status', '.in-stock', '.out-of-stock'
+        ]
+        avail_elem = profiler.select_first(soup, 'robust.availability', availability_selectors)
+        if avail_elem:
+            product.availability = avail_elem.get_text(strip=True)
+        
+        # Set brand
+        product.brand = "PC Jeweller"
+        
+        # Set subcategory
+        breadcrumbs = soup.select('.breadcrumb a, .breadcrumbs a')
+        if breadcrumbs:
+            product.subcategory = breadcrumbs[-1].get_text(strip=True)
+        
+        logger.info(f"✓ Extracted product: {product.name[:50]}...")
+        return product
+        
+    except Exception as e:
+        logger.error(f"✗ Error extracting product data from {product_url}: {str(e)}")
+        return None
+
+def parse_product_record(product_url: str, content: bytes, category: str, base_url: str, parser_backend: str,
+                         adaptive_selectors: bool = False, prune_after: int = 50, image_size=None):
+    """Parse-stage entry point: (product, selector counts) so the parent can merge the profile"""
+    profiler = get_selector_profiler()
+    profiler.adaptive = adaptive_selectors
+    profiler.prune_after = prune_after
+    product = parse_product_page(product_url, content, category, base_url, parser_backend, profiler, image_size)
+    return product, profiler.drain()
+
 class RobustScraper:
-    def __init__(self, max_products_per_category=150):
+    def __init__(self, max_products_per_category=150, rate_limiter=None, response_cache=None, parser_backend=None,
+                 fetch_workers=3, parse_workers=None, selector_profiler=None, adaptive_selectors=False,
+                 image_workers=DEFAULT_IMAGE_WORKERS, image_queue_size=None, image_store=None,
+                 image_processor=None, process_images=True, image_size=None):
         self.max_products_per_category = max_products_per_category
+        # Longest side in pixels to pick among resized copies of a photo (None: the largest copy)
+        self.image_size = image_size
+        # Fetch threads feed a pool of parse processes (parse_workers defaults to one per core)
+        self.pipeline = ParsePipeline(fetch_workers=fetch_workers, parse_workers=parse_workers)
+        # Image downloads have their own workers, so page fetching never waits on them
+        self.images = ImagePipeline(workers=image_workers, max_queued=image_queue_size)
+        # Image bytes are stored once by content hash; category folders hold links to them
+        self.image_store = image_store or get_image_store()
+        # Thumbnails / web-sized variants are made in worker processes as images land
+        self.image_processor = (image_processor or get_image_processor()) if process_images else None
+        if self.image_processor is not None:
+            self.image_store.processor = self.image_processor
+        # Per-selector hit rate and cost; adaptive reorders and prunes the fallback lists
+        self.selector_profiler = selector_profiler or get_selector_profiler()
+        if adaptive_selectors:
+            self.selector_profiler.adaptive = True
+        # 'html.parser', 'lxml' or 'selectolax'; extractors see the same API on each
+        self.parser_backend = resolve_backend(parser_backend)
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.response_cache = response_cache or get_response_cache()
         self.base_url = "https://www.pcjeweller.com"
         self.session = None
         self.cloudscraper_session = None
+        self.httpx_client = None
         self.ua = UserAgent()
         self.products = []
         self.failed_urls = []
@@ -98,15 +276,39 @@ class RobustScraper:
         self.session.mount("http://", adapter)
         self.session.mount("https://", adapter)
         
-        # CloudScraper session (bypasses Cloudflare)
-        self.cloudscraper_session = cloudscraper.create_scraper(
-            browser={
-                'browser': 'chrome',
-                'platform': 'linux',
-                'desktop': True
-            }
+        # CloudScraper session (bypasses Cloudflare) from the shared clearance pool
+        self.cloudscraper_session = get_clearance_pool()
+        
+        # Long-lived httpx client shared by all worker threads, so fallback
+        # requests reuse warm connections and multiplex over HTTP/2
+        self.httpx_client = httpx.Client(
+            http2=HTTP2_AVAILABLE,
+            timeout=30,
+            limits=httpx.Limits(max_connections=20, max_keepalive_connections=10)
         )
         
+        # Cheapest first; the scoreboard reorders per URL kind as results come in
+        self.fetch_ladder = FetchLadder({
+            'requests': self._fetch_with_requests,
+            'httpx': self._fetch_with_httpx,
+            'cloudscraper': self._fetch_with_cloudscraper,
+            'browser': self._fetch_with_browser,
+        }, rate_limiter=self.rate_limiter)
+        
+    def close(self):
+        """Release pooled connections held by the sessions"""
+        if self.httpx_client is not None:
+            self.httpx_client.close()
+        self.session.close()
+        self.cloudscraper_session.close()
+        self.fetch_ladder.scoreboard.save()
+        get_browser_fetcher().close()
+        self.pipeline.close()
+        self.images.close()
+        if self.image_processor is not None:
+            self.image_processor.close()
+        self.selector_profiler.save()
+        
     def get_headers(self):
         """Generate realistic headers"""
         return {
@@ -124,35 +326,61 @@ class RobustScraper:
             'Cache-Control': 'max-age=0',
         }
     
-    def fetch_page(self, url: str, method='cloudscraper') -> Optional[BeautifulSoup]:
-        """Fetch page with multiple fallback methods"""
-        methods = ['cloudscraper', 'requests', 'httpx']
-        if method in methods:
-            methods = [method] + [m for m in methods if m != method]
-        
-        for method_name in methods:
-            try:
-                if method_name == 'cloudscraper':
-                    response = self.cloudscraper_session.get(url, timeout=30)
-                elif method_name == 'requests':
-                    response = self.session.get(url, headers=self.get_headers(), timeout=30)
-                elif method_name == 'httpx':
-                    with httpx.Client(headers=self.get_headers(), timeout=30) as client:
-                        response = client.get(url)
-                
-                if response.status_code == 200:
-                    logger.info(f"✓ Successfully fetched {url} using {method_name}")
-                    return BeautifulSoup(response.content, 'html.parser')
-                else:
-                    logger.warning(f"✗ Failed to fetch {url} using {method_name}: {response.status_code}")
-                    
-            except Exception as e:
-                logger.error(f"✗ Error fetching {url} with {method_name}: {str(e)}")
-                
-            # Random delay between attempts
-            time.sleep(random.uniform(1, 3))
+    # Rungs only wait for the rate limiter; the ladder records the outcome of the whole fetch
+    def _fetch_with_cloudscraper(self, url, headers):
+        self.rate_limiter.acquire(url)
+        return stream_get(self.cloudscraper_session, url, headers=headers, timeout=30)
         
-        return None
+    def _fetch_with_requests(self, url, headers):
+        self.rate_limiter.acquire(url)
+        return stream_get(self.session, url, headers={**self.get_headers(), **headers}, timeout=30)
+        
+    def _fetch_with_httpx(self, url, headers):
+        request = self.httpx_client.build_request('GET', url, headers={**self.get_headers(), **headers})
+        self.rate_limiter.acquire(url)
+        response = self.httpx_client.send(request, stream=True)
+        try:
+            read_body(response)
+        finally:
+            response.close()
+        return response
+        
+    def _fetch_with_browser(self, url, headers):
+        self.rate_limiter.acquire(url)
+        return get_browser_fetcher()(url, headers)
+    
+    def fetch_content(self, url: str, method=None) -> Optional[bytes]:
+        """Fetch page bytes, starting with the cheapest method known to work for this kind of URL"""
+        cached = self.response_cache.lookup(url)
+        if cached is not None:
+            logger.info(f"✓ Cache hit for {url}")
+            return cached.content
+        
+        # A stale cached copy lets the server answer 304 instead of resending the page
+        conditional = self.response_cache.conditional_headers(url)
+        method_name, response = self.fetch_ladder.fetch(url, headers=conditional, preferred=method)
+        
+        if method_name is not None and response.status_code == 304:
+            cached = self.response_cache.revalidate(url, response)
+            if cached is not None:
+                logger.info(f"✓ Not modified: {url}")
+                return cached.content
+            method_name, response = self.fetch_ladder.fetch(url, preferred=method_name)
+        
+        if method_name is None or response.status_code != 200:
+            logger.error(f"✗ Failed to fetch {url} with every method")
+            return None
+        
+        self.response_cache.store(url, response)
+        logger.info(f"✓ Successfully fetched {url} using {method_name}")
+        return response.content
+    
+    def fetch_page(self, url: str, method=None) -> Optional[BeautifulSoup]:
+        """Fetch and parse a page"""
+        content = self.fetch_content(url, method)
+        if content is None:
+            return None
+        return parse_html(content, self.parser_backend)
     
     def extract_category_from_url(self, url: str) -> str:
         """Extract category from URL"""
@@ -228,136 +456,11 @@ class RobustScraper:
     
     def extract_product_data(self, product_url: str, category: str) -> Optional[Product]:
         """Extract product data from product page"""
-        soup = self.fetch_page(product_url)
-        if not soup:
-            return None
-        
-        product = Product()
-        product.product_url = product_url
-        product.category = category
-        
-        try:
-            # Extract product name
-            name_selectors = [
-                'h1.product-name', 'h1.product-title', '.product-name h1', 
-                'h1', '.product-title', '[data-role="product-name"]'
-            ]
-            for selector in name_selectors:
-                name_elem = soup.select_one(selector)
-                if name_elem:
-                    product.name = name_elem.get_text(strip=True)
-                    break
-            
-            # Extract price
-            price_selectors = [
-                '.price-current', '.current-price', '.price-final', 
-                '.special-price', '.price .amount', '.price-box .price'
-            ]
-            for selector in price_selectors:
-                price_elem = soup.select_one(selector)
-                if price_elem:
-                    product.price = price_elem.get_text(strip=True)
-                    break
-            
-            # Extract original price
-            original_price_selectors = [
-                '.price-old', '.old-price', '.price-was', '.regular-price'
-            ]
-            for selector in original_price_selectors:
-                price_elem = soup.select_one(selector)
-                if price_elem:
-                    product.original_price = price_elem.get_text(strip=True)
-                    break
-            
-            # Extract specifications
-            spec_data = {}
-            
-            # Try table format
-            spec_tables = soup.select('table.product-specs, .product-attributes table, .specifications table')
-            for table in spec_tables:
-                rows = table.select('tr')
-                for row in rows:
-                    cells = row.select('td, th')
-                    if len(cells) >= 2:
-                        key = cells[0].get_text(strip=True).lower()
-                        value = cells[1].get_text(strip=True)
-                        spec_data[key] = value
-            
-            # Try list format
-            spec_lists = soup.select('.product-specs li, .specifications li, .product-attributes li')
-            for item in spec_lists:
-                text = item.get_text(strip=True)
-                if ':' in text:
-                    key, value = text.split(':', 1)
-                    spec_data[key.strip().lower()] = value.strip()
-            
-            # Try div format
-            spec_divs = soup.select('.spec-item, .attribute-item, .product-detail-item')
-            for item in spec_divs:
-                label = item.select_one('.label, .key, .name')
-                value = item.select_one('.value, .val, .content')
-                if label and value:
-                    spec_data[label.get_text(strip=True).lower()] = value.get_text(strip=True)
-            
-            # Map specifications to product fields
-            product.weight = spec_data.get('weight', '') or spec_data.get('gross weight', '')
-            product.metal = spec_data.get('metal', '') or spec_data.get('metal type', '')
-            product.purity = spec_data.get('purity', '') or spec_data.get('gold purity', '')
-            product.stone = spec_data.get('stone', '') or spec_data.get('gemstone', '')
-            product.size = spec_data.get('size', '') or spec_data.get('ring size', '')
-            product.color = spec_data.get('color', '') or spec_data.get('metal color', '')
-            product.sku = spec_data.get('sku', '') or spec_data.get('product code', '')
-            
-            # Extract description
-            desc_selectors = [
-                '.product-description', '.product-details', '.description', 
-                '.product-info', '.product-summary'
-            ]
-            for selector in desc_selectors:
-                desc_elem = soup.select_one(selector)
-                if desc_elem:
-                    product.description = desc_elem.get_text(strip=True)[:500]  # Limit description
-                    break
-            
-            # Extract image URLs
-            img_selectors = [
-                '.product-image img', '.product-gallery img', '.product-photos img',
-                '.main-image img', '.gallery-image img', 'img[src*="product"]'
-            ]
-            for selector in img_selectors:
-                images = soup.select(selector)
-                for img in images:
-                    src = img.get('src') or img.get('data-src')
-                    if src:
-                        if src.startswith('/'):
-                            src = urljoin(self.base_url, src)
-                        if src not in product.image_urls:
-                            product.image_urls.append(src)
-            
-            # Extract availability
-            availability_selectors = [
-                '.availability', '.stock-status', '.in-stock', '.out-of-stock'
-            ]
-            for selector in availability_selectors:
-                avail_elem = soup.select_one(selector)
-                if avail_elem:
-                    product.availability = avail_elem.get_text(strip=True)
-                    break
-            
-            # Set brand
-            product.brand = "PC Jeweller"
-            
-            # Set subcategory
-            breadcrumbs = soup.select('.breadcrumb a, .breadcrumbs a')
-            if breadcrumbs:
-                product.subcategory = breadcrumbs[-1].get_text(strip=True)
-            
-            logger.info(f"✓ Extracted product: {product.name[:50]}...")
-            return product
-            
-        except Exception as e:
-            logger.error(f"✗ Error extracting product data from {product_url}: {str(e)}")
+        content = self.fetch_content(product_url)
+        if content is None:
             return None
+        return parse_product_page(product_url, content, category, self.base_url, self.parser_backend,
+                                  self.selector_profiler, self.image_size)
     
     def download_image(self, image_url: str, category: str, product_name: str, img_index: int) -> Optional[str]:
         """Download and save product image"""
@@ -368,27 +471,18 @@ class RobustScraper:
             
             # Generate filename
             safe_name = re.sub(r'[^\w\s-]', '', product_name.lower()[:30])
-            safe_name = re.sub(r'[-\s]+', '-', safe_name)
-            
-            # Get file extension
-            parsed_url = urlparse(image_url)
-            ext = parsed_url.path.split('.')[-1] if '.' in parsed_url.path else 'jpg'
-            if ext not in ['jpg', 'jpeg', 'png', 'webp']:
-                ext = 'jpg'
+            safe_name = re.sub(r'[-\s]+', '-', safe_name).strip('-') or 'product'
             
-            filename = f"{safe_name}_{img_index}.{ext}"
-            filepath = category_dir / filename
+            # Download image (URLs already in the store are not fetched again)
+            filepath, result = self.image_store.save(
+                self.session, image_url, category_dir, f"{safe_name}_{img_index}",
+                rate_limiter=self.rate_limiter, timeout=30, cache=self.response_cache
+            )
+            if not result:
+                raise Exception(f"image request refused for {image_url}")
             
-            # Download image
-            response = self.session.get(image_url, stream=True, timeout=30)
-            response.raise_for_status()
-            
-            # Save image
-            with open(filepath, 'wb') as f:
-                for chunk in response.iter_content(chunk_size=8192):
-                    f.write(chunk)
-            
-            logger.info(f"✓ Downloaded image: {filename}")
+            if result == 'downloaded':
+                logger.info(f"✓ Downloaded image: {filepath.name}")
             return str(filepath)
             
         except Exception as e:
@@ -396,19 +490,28 @@ class RobustScraper:
             return None
     
     def process_product(self, product_url: str, category: str) -> Optional[Product]:
-        """Process a single product - extract data and download images"""
+        """Process a single product - extract data and queue its images"""
         product = self.extract_product_data(product_url, category)
         if not product:
             return None
-        
-        # Download images
-        for i, img_url in enumerate(product.image_urls[:5]):  # Limit to 5 images per product
-            filepath = self.download_image(img_url, category, product.name, i)
+        return self.download_product_images(product_url, product)
+    
+    def finish_product(self, product_url: str, record) -> Optional[Product]:
+        """Merge the parse worker's selector counts, then queue the product's images"""
+        product, selector_counts = record
+        self.selector_profiler.merge(selector_counts)
+        if product is None:
+            return None
+        return self.download_product_images(product_url, product)
+    
+    def download_product_images(self, product_url: str, product: Product) -> Product:
+        """Queue a parsed product's images; image_files fills in as they land"""
+        def add_file(filepath):
             if filepath:
                 product.image_files.append(filepath)
-            
-            # Small delay between image downloads
-            time.sleep(0.5)
+        
+        for i, img_url in enumerate(product.image_urls[:5]):  # Limit to 5 images per product
+            self.images.submit(self.download_image, img_url, product.category, product.name, i, on_done=add_file)
         
         return product
     
@@ -425,29 +528,19 @@ class RobustScraper:
             logger.warning(f"⚠️ No product links found for category: {category}")
             return []
         
-        # Process products with threading
+        # Fetch on I/O threads, parse in worker processes, download images back on I/O threads
         category_products = []
-        with ThreadPoolExecutor(max_workers=3) as executor:
-            futures = {
-                executor.submit(self.process_product, url, category): url 
-                for url in product_links
-            }
-            
-            for future in as_completed(futures):
-                try:
-                    product = future.result()
-                    if product:
-                        category_products.append(product)
-                        self.scraped_count += 1
-                        logger.info(f"✅ Scraped product {self.scraped_count}: {product.name[:50]}...")
-                    else:
-                        self.failed_urls.append(futures[future])
-                except Exception as e:
-                    logger.error(f"❌ Error processing product: {str(e)}")
-                    self.failed_urls.append(futures[future])
-                
-                # Random delay between products
-                time.sleep(random.uniform(0.5, 2))
+        parse = partial(parse_product_record, category=category, base_url=self.base_url,
+                        parser_backend=self.parser_backend, adaptive_selectors=self.selector_profiler.adaptive,
+                        prune_after=self.selector_profiler.prune_after, image_size=self.image_size)
+        results = self.pipeline.run(product_links, self.fetch_content, parse, finish=self.finish_product)
+        for url, product in results:
+            if product:
+                category_products.append(product)
+                self.scraped_count += 1
+                logger.info(f"✅ Scraped product {self.scraped_count}: {product.name[:50]}...")
+            else:
+                self.failed_urls.append(url)
         
         logger.info(f"✅ Completed scraping {category}: {len(category_products)} products")
         return category_products
@@ -504,9 +597,10 @@ class RobustScraper:
             # Save progress periodically
             if (i + 1) % 5 == 0:
                 self.save_to_csv(self.products, f"products_progress_{i+1}.csv")
-            
-            # Longer delay between categories
-            time.sleep(random.uniform(3, 7))
+        
+        # Every image_files list is complete once the queue drains
+        self.images.join()
+        self.image_store.write_manifest()
         
         # Final save
         self.save_to_csv(self.products, "final_products.csv")
@@ -517,6 +611,9 @@ class RobustScraper:
                 for url in self.failed_urls:
                     f.write(f"{url}\n")
         
+        self.selector_profiler.log_summary()
+        self.close()
+        
         logger.info(f"🎉 Scraping completed!")
         logger.info(f"📊 Total products scraped: {len(self.products)}")
         logger.info(f"❌ Failed URLs: {len(self.failed_urls)}")
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import threading
+import time
+from pathlib import Path
+
+logger = logging.getLogger(__name__)
+
+DEFAULT_PROFILE_FILE = "selector_profile.json"
+
+class SelectorProfiler:
+    """Hit rate and time spent per selector in the extractors' fallback lists
+
+    Counts are kept per (group, selector), where a group is one fallback
+    list such as 'robust.name'. With adaptive=True, first-match lists are
+    tried in order of observed hit rate and selectors that have not hit
+    once in prune_after pages are dropped, so common pages resolve on the
+    first selector. Persisted to disk so the next run starts with what
+    this one learned.
+    """
+
+    def __init__(self, path=DEFAULT_PROFILE_FILE, adaptive=False, prune_after=50):
+        self.path = Path(path) if path else None
+        self.adaptive = adaptive
+        self.prune_after = prune_after
+        self.stats = {}
+        # Counts not yet handed to another process with drain()
+        self.pending = {}
+        self.lock = threading.Lock()
+        self._load()
+
+    def _load(self):
+        if self.path is None:
+            return
+        try:
+            with open(self.path, 'r', encoding='utf-8') as f:
+                report = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError):
+            return
+        for group, selectors in report.items():
+            for selector, entry in selectors.items():
+                self.stats[(group, selector)] = [entry['tries'], entry['hits'], entry['seconds']]
+
+    def _add(self, table, key, tries, hits, seconds):
+        entry = table.setdefault(key, [0, 0, 0.0])
+        entry[0] += tries
+        entry[1] += hits
+        entry[2] += seconds
+
+    def record(self, group, selector, hit, seconds):
+        key = (group, selector)
+        with self.lock:
+            self._add(self.stats, key, 1, int(hit), seconds)
+            self._add(self.pending, key, 1, int(hit), seconds)
+
+    def drain(self):
+        """Counts recorded since the last drain, for merging into another process's profiler"""
+        with self.lock:
+            pending, self.pending = self.pending, {}
+        return [(group, selector, *entry) for (group, selector), entry in pending.items()]
+
+    def merge(self, counts):
+        with self.lock:
+            for group, selector, tries, hits, seconds in counts:
+                self._add(self.stats, (group, selector), tries, hits, seconds)
+
+    def hit_rate(self, group, selector):
+        entry = self.stats.get((group, selector))
+        return entry[1] / entry[0] if entry and entry[0] else None
+
+    def order(self, group, selectors, reorder=True):
+        """Selectors to try for a group: by hit rate (adaptive only), never-hit ones pruned"""
+        if not self.adaptive:
+            return list(selectors)
+        with self.lock:
+            ranked = []
+            for position, selector in enumerate(selectors):
+                tries, hits, _ = self.stats.get((group, selector), (0, 0, 0.0))
+                if hits == 0 and tries >= self.prune_after:
+                    continue
+                # Untried selectors rank as certain hits until they have been seen
+                rate = hits / tries if tries else 1.0
+                ranked.append((-rate if reorder else 0, position, selector))
+        if not ranked:
+            return list(selectors)
+        return [selector for _, _, selector in sorted(ranked)]
+
+    def select_first(self, soup, group, selectors, accept=None):
+        """soup.select_one over a fallback list: first element found (and accepted), or None"""
+        for selector in self.order(group, selectors):
+            start = time.perf_counter()
+            element = soup.select_one(selector)
+            hit = element is not None and (accept is None or accept(element))
+            self.record(group, selector, hit, time.perf_counter() - start)
+            if hit:
+                return element
+        return None
+
+    def select_each(self, soup, group, selectors):
+        """soup.select for every selector of an accumulating list, yielding its elements in list order"""
+        for selector in self.order(group, selectors, reorder=False):
+            start = time.perf_counter()
+            elements = soup.select(selector)
+            self.record(group, selector, bool(elements), time.perf_counter() - start)
+            yield elements
+
+    def report(self):
+        """{group: {selector: stats}} with the most useful selectors first"""
+        with self.lock:
+            items = sorted(self.stats.items(), key=lambda item: (item[0][0], -item[1][1], item[1][2]))
+        report = {}
+        for (group, selector), (tries, hits, seconds) in items:
+            report.setdefault(group, {})[selector] = {
+                'tries': tries,
+                'hits': hits,
+                'hit_rate': round(hits / tries, 4) if tries else 0.0,
+                'seconds': round(seconds, 6),
+                'avg_ms': round(seconds / tries * 1000, 3) if tries else 0.0,
+            }
+        return report
+
+    def save(self):
+        if self.path is None:
+            return
+        data = json.dumps(self.report(), indent=2)
+        with open(self.path, 'w', encoding='utf-8') as f:
+            f.write(data)
+
+    def log_summary(self):
+        """Log selectors that never hit and the slowest group of the run"""
+        report = self.report()
+        for group, selectors in report.items():
+            dead = [s for s, entry in selectors.items() if entry['hits'] == 0 and entry['tries'] >= self.prune_after]
+            spent = sum(entry['seconds'] for entry in selectors.values())
+            logger.info(f"🎯 {group}: {len(selectors)} selectors, {spent:.2f}s, {len(dead)} never hit")
+            for selector in dead:
+                logger.info(f"   ✗ never hit: {selector}")
+
+_shared_profiler = None
+_shared_lock = threading.Lock()
+
+def get_selector_profiler():
+    """Return the process-wide selector profiler"""
+    global _shared_profiler
+    with _shared_lock:
+        if _shared_profiler is None:
+            _shared_profiler = SelectorProfiler()
+        return _shared_profiler
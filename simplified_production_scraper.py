@@ -11,13 +11,21 @@ from urllib.parse import urljoin
 from bs4 import BeautifulSoup
 from pathlib import Path
 import re
+from http_clients import get_image_session, download_to_file, DEFAULT_IMAGE_POOL_SIZE
+from rate_limiter import get_rate_limiter
+from response_cache import get_response_cache
+from clearance_pool import get_clearance_pool
 
 class SimplifiedProductionScraper:
     """Simplified but robust production scraper"""
     
-    def __init__(self, max_products_per_category=150):
+    def __init__(self, max_products_per_category=150, image_pool_size=DEFAULT_IMAGE_POOL_SIZE, rate_limiter=None,
+                 response_cache=None):
         self.max_products = max_products_per_category
-        self.scraper = cloudscraper.create_scraper()
+        self.scraper = get_clearance_pool()
+        self.rate_limiter = rate_limiter or get_rate_limiter()
+        self.response_cache = response_cache or get_response_cache()
+        self.image_session = get_image_session(pool_size=image_pool_size)
         self.products = []
         self.images_downloaded = 0
         self.setup_directories()
@@ -35,7 +43,7 @@ class SimplifiedProductionScraper:
         """Extract product links from category page"""
         try:
             print(f"🔍 Getting products from: {category_url}")
-            response = self.scraper.get(category_url, timeout=30)
+            response = self.response_cache.fetch(self.scraper, category_url, rate_limiter=self.rate_limiter, timeout=30)
             if response.status_code != 200:
                 return []
                 
@@ -73,7 +81,7 @@ class SimplifiedProductionScraper:
     def extract_product_details(self, product_url, category):
         """Extract product details"""
         try:
-            response = self.scraper.get(product_url, timeout=30)
+            response = self.response_cache.fetch(self.scraper, product_url, rate_limiter=self.rate_limiter, timeout=30)
             if response.status_code != 200:
                 return None
                 
@@ -131,18 +139,16 @@ class SimplifiedProductionScraper:
             filename = f"{name_safe}_{img_index}.jpg"
             filepath = category_dir / filename
             
-            if filepath.exists():
-                return str(filepath)
-            
-            # Download
+            # Download (existing files are revalidated)
             headers = {'User-Agent': 'Mozilla/5.0 (compatible; PCJScraper/1.0)'}
-            response = requests.get(image_url, stream=True, timeout=20, headers=headers)
+            result = download_to_file(
+                self.image_session, image_url, filepath,
+                cache=self.response_cache, rate_limiter=self.rate_limiter, timeout=20, headers=headers
+            )
+            if result == 'not_modified':
+                return str(filepath)
             
-            if response.status_code == 200:
-                with open(filepath, 'wb') as f:
-                    for chunk in response.iter_content(chunk_size=8192):
-                        f.write(chunk)
-                
+            if result == 'downloaded':
                 self.images_downloaded += 1
                 if self.images_downloaded % 10 == 0:
                     print(f"📷 Downloaded {self.images_downloaded} images")
@@ -180,16 +186,11 @@ class SimplifiedProductionScraper:
                     # Download images
                     for k, img_url in enumerate(product['image_urls']):
                         self.download_image(img_url, category_name, product['name'], k)
-                        time.sleep(0.5)
                     
                     all_products.append(product)
-                
-                time.sleep(2)  # Respectful delay
             
             if len(all_products) >= self.max_products:
                 break
-            
-            time.sleep(5)  # Delay between URLs
         
         print(f"✅ {category_name}: {len(all_products)} products completed")
         return all_products
@@ -261,15 +262,10 @@ class SimplifiedProductionScraper:
                         writer.writerow(row)
                 
                 print(f"💾 Progress saved: {progress_file}")
-            
-            # Long delay between categories
-            if i < len(categories) - 1:
-                delay = random.uniform(30, 60)
-                print(f"⏳ Waiting {delay:.1f}s before next category...")
-                time.sleep(delay)
         
         # Save final results
         self.save_results(all_products)
+        self.scraper.close()
         
         print(f"\\n🎉 SCRAPING COMPLETED!")
         print(f"📊 Total products: {len(all_products)}")
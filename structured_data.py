@@ -0,0 +1,254 @@
+#!/usr/bin/env python3
+
+import importlib.util
+import json
+import logging
+import re
+from urllib.parse import urljoin
+from lxml import etree
+from bs4.dammit import EncodingDetector
+
+logger = logging.getLogger(__name__)
+
+ORJSON_AVAILABLE = importlib.util.find_spec("orjson") is not None
+
+if ORJSON_AVAILABLE:
+    import orjson
+    json_loads = orjson.loads
+    JSONDecodeError = orjson.JSONDecodeError
+else:
+    json_loads = json.loads
+    JSONDecodeError = json.JSONDecodeError
+
+# Script types whose body is JSON worth decoding
+LD_JSON_TYPE = 'application/ld+json'
+EMBEDDED_JSON_TYPES = ('application/json', 'text/x-magento-init')
+
+# Keys gallery widgets use for an image URL in embedded JSON
+GALLERY_IMAGE_KEYS = ('full', 'img', 'image', 'large', 'zoom')
+IMAGE_URL_PATTERN = re.compile(r'\.(?:jpe?g|png|webp|gif)(?:\?|$)', re.IGNORECASE)
+
+# Nesting depth searched in embedded JSON blobs
+MAX_JSON_DEPTH = 12
+
+class StructuredDataScan:
+    """lxml parser target keeping only <meta> attributes and JSON <script> bodies"""
+
+    def __init__(self):
+        self.meta = []
+        self.ld_json = []
+        self.embedded_json = []
+        self.parts = None
+        self.target = None
+
+    def start(self, tag, attrib):
+        if tag == 'meta':
+            key = attrib.get('property') or attrib.get('name')
+            if key:
+                self.meta.append((key.lower(), attrib.get('content', '')))
+        elif tag == 'script':
+            script_type = attrib.get('type', '').strip().lower()
+            if script_type == LD_JSON_TYPE:
+                self.parts, self.target = [], self.ld_json
+            elif script_type in EMBEDDED_JSON_TYPES:
+                self.parts, self.target = [], self.embedded_json
+
+    def end(self, tag):
+        if tag == 'script' and self.parts is not None:
+            self.target.append(''.join(self.parts))
+            self.parts = self.target = None
+
+    def data(self, text):
+        if self.parts is not None:
+            self.parts.append(text)
+
+    def close(self):
+        return self
+
+def decode_blobs(blobs):
+    """Decoded JSON documents, skipping blobs that do not parse"""
+    documents = []
+    for blob in blobs:
+        blob = blob.strip()
+        if not blob:
+            continue
+        try:
+            documents.append(json_loads(blob))
+        except (JSONDecodeError, ValueError):
+            logger.debug(f"Skipping undecodable JSON blob ({len(blob)} chars)")
+    return documents
+
+def iter_ld_nodes(document):
+    """Every JSON-LD node in a document: top level, lists and @graph members"""
+    if isinstance(document, list):
+        for item in document:
+            yield from iter_ld_nodes(item)
+    elif isinstance(document, dict):
+        yield document
+        if isinstance(document.get('@graph'), list):
+            for item in document['@graph']:
+                yield from iter_ld_nodes(item)
+
+def is_product_node(node):
+    node_type = node.get('@type')
+    if isinstance(node_type, list):
+        return 'Product' in node_type
+    return node_type == 'Product'
+
+def first_value(value, key='name'):
+    """Plain value of a JSON-LD property that may be a list or a nested object"""
+    if isinstance(value, list):
+        value = value[0] if value else None
+    if isinstance(value, dict):
+        value = value.get(key) or value.get('value') or value.get('@id')
+    return value
+
+def format_price(amount, currency=None):
+    """Price in the ₹123,456 form the page-text regexes produce"""
+    if amount in (None, ''):
+        return ''
+    try:
+        number = float(str(amount).replace(',', ''))
+    except ValueError:
+        return str(amount)
+    text = f"{int(number):,}" if number.is_integer() else f"{number:,.2f}"
+    if currency in (None, '', 'INR'):
+        return f"₹{text}"
+    return f"{currency} {text}"
+
+def availability_label(value):
+    """'https://schema.org/InStock' -> 'In Stock'"""
+    value = str(first_value(value) or '')
+    value = value.rstrip('/').rsplit('/', 1)[-1]
+    return re.sub(r'(?<=[a-z])(?=[A-Z])', ' ', value)
+
+def offer_prices(offers):
+    """(price, original price, currency, availability) from a schema.org offers value"""
+    if isinstance(offers, list):
+        offers = offers[0] if offers else {}
+    if not isinstance(offers, dict):
+        return '', '', None, ''
+    currency = offers.get('priceCurrency')
+    price = offers.get('price', offers.get('lowPrice'))
+    original = offers.get('highPrice') if 'price' not in offers else None
+    spec = offers.get('priceSpecification')
+    if price is None and isinstance(spec, dict):
+        price = spec.get('price')
+        currency = currency or spec.get('priceCurrency')
+    return price, original, currency, offers.get('availability', '')
+
+def image_list(value):
+    """Image URLs from a JSON-LD image property (string, list or ImageObject)"""
+    if isinstance(value, str):
+        return [value]
+    if isinstance(value, dict):
+        url = value.get('url') or value.get('contentUrl')
+        return [url] if isinstance(url, str) else []
+    if isinstance(value, list):
+        return [url for item in value for url in image_list(item)]
+    return []
+
+def gallery_images(node, depth=0):
+    """Image URLs under gallery-style keys anywhere in an embedded JSON blob"""
+    if depth > MAX_JSON_DEPTH:
+        return
+    if isinstance(node, dict):
+        for key, value in node.items():
+            if isinstance(value, str):
+                if key in GALLERY_IMAGE_KEYS and IMAGE_URL_PATTERN.search(value):
+                    yield value
+            else:
+                yield from gallery_images(value, depth + 1)
+    elif isinstance(node, list):
+        for item in node:
+            yield from gallery_images(item, depth + 1)
+
+def absolute_image_url(src, base_url):
+    if src.startswith('//'):
+        return 'https:' + src
+    if src.startswith('/'):
+        return urljoin(base_url, src)
+    return src
+
+def extract_structured_fields(content, base_url):
+    """Product fields from JSON-LD, OpenGraph meta and embedded JSON, without a DOM
+
+    Returns a dict holding only the fields the page's structured data
+    provides (name, price, original_price, description, sku, brand,
+    availability, metal, color, weight, keywords, image_urls). JSON-LD wins
+    over OpenGraph, which wins over embedded gallery blobs.
+    """
+    encoding = EncodingDetector.find_declared_encoding(content, is_html=True) or 'utf-8'
+    parser = etree.HTMLParser(target=StructuredDataScan(), encoding=encoding)
+    parser.feed(content)
+    scan = parser.close()
+
+    fields = {}
+    images = []
+
+    def add_images(urls):
+        for url in urls:
+            url = absolute_image_url(url.strip(), base_url)
+            if url and url not in images:
+                images.append(url)
+
+    # schema.org Product
+    for document in decode_blobs(scan.ld_json):
+        for node in iter_ld_nodes(document):
+            if not is_product_node(node):
+                continue
+            if node.get('name'):
+                fields.setdefault('name', str(first_value(node['name'])).strip())
+            if node.get('description'):
+                fields.setdefault('description', str(first_value(node['description'])).strip()[:400])
+            if node.get('sku'):
+                fields.setdefault('sku', str(first_value(node['sku'])))
+            if node.get('brand'):
+                fields.setdefault('brand', str(first_value(node['brand'])))
+            if node.get('material'):
+                fields.setdefault('metal', str(first_value(node['material'])))
+            if node.get('color'):
+                fields.setdefault('color', str(first_value(node['color'])))
+            if node.get('weight'):
+                weight = node['weight']
+                if isinstance(weight, dict):
+                    weight = f"{weight.get('value', '')} {weight.get('unitText') or weight.get('unitCode', '')}".strip()
+                fields.setdefault('weight', str(weight))
+            price, original, currency, availability = offer_prices(node.get('offers'))
+            if price not in (None, ''):
+                fields.setdefault('price', format_price(price, currency))
+            if original not in (None, ''):
+                fields.setdefault('original_price', format_price(original, currency))
+            if availability:
+                fields.setdefault('availability', availability_label(availability))
+            add_images(image_list(node.get('image')))
+
+    # OpenGraph and product meta
+    meta = {}
+    for key, value in scan.meta:
+        if key in ('og:image', 'og:image:secure_url'):
+            add_images([value])
+        else:
+            meta.setdefault(key, value)
+    if meta.get('og:title'):
+        fields.setdefault('name', meta['og:title'].strip())
+    description = meta.get('og:description') or meta.get('description')
+    if description:
+        fields.setdefault('description', description[:400])
+    amount = meta.get('product:price:amount') or meta.get('og:price:amount')
+    if amount:
+        fields.setdefault('price', format_price(amount, meta.get('product:price:currency') or meta.get('og:price:currency')))
+    if meta.get('product:availability'):
+        fields.setdefault('availability', availability_label(meta['product:availability']))
+    if meta.get('product:retailer_item_id'):
+        fields.setdefault('sku', meta['product:retailer_item_id'])
+    if meta.get('keywords'):
+        fields['keywords'] = meta['keywords']
+
+    # Gallery / product JSON embedded by the storefront
+    for document in decode_blobs(scan.embedded_json):
+        add_images(gallery_images(document))
+
+    if images:
+        fields['image_urls'] = images
+    return fields
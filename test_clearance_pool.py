@@ -0,0 +1,109 @@
+#!/usr/bin/env python3
+"""Clearance pool: only a real solve is persisted and shared
+
+Run offline with: python -m pytest -q test_clearance_pool.py
+"""
+
+import json
+import threading
+import time
+
+import pytest
+import requests
+
+from clearance_pool import ClearanceSessionPool
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class FakeScraper(requests.Session):
+    """Session whose warm-up GET answers from a script of (status, sets clearance) outcomes"""
+
+    def __init__(self, outcomes, calls):
+        super().__init__()
+        self.outcomes = outcomes
+        self.calls = calls
+        self.closed = False
+
+    def get(self, url, **kwargs):
+        self.calls.append(url)
+        outcome = self.outcomes.pop(0) if self.outcomes else (200, True)
+        if isinstance(outcome, Exception):
+            raise outcome
+        status, clearance = outcome
+        if clearance:
+            self.cookies.set('cf_clearance', 'token', domain='.pcjeweller.com', path='/')
+        return FakeResponse(status)
+
+    def close(self):
+        self.closed = True
+        super().close()
+
+def make_pool(tmp_path, outcomes, **kwargs):
+    calls = []
+    pool = ClearanceSessionPool(state_file=tmp_path / "cf_clearance.json", retry_delay=0, **kwargs)
+    scrapers = []
+
+    def create_scraper():
+        scraper = FakeScraper(outcomes, calls)
+        scrapers.append(scraper)
+        return scraper
+    pool._create_scraper = create_scraper
+    return pool, calls, scrapers
+
+def test_failed_warmups_are_neither_saved_nor_adopted(tmp_path):
+    outcomes = [(403, False), (503, False), requests.ConnectionError("reset")]
+    pool, calls, _ = make_pool(tmp_path, outcomes, solve_attempts=3, retry_after=3600)
+    session = pool.get_session()
+    assert len(calls) == 3
+    assert not (tmp_path / "cf_clearance.json").exists()
+    assert pool.state is None
+    assert 'cf_clearance' not in session.cookies
+    # No new solve until retry_after has passed
+    pool.get_session()
+    assert len(calls) == 3
+    pool.close()
+
+def test_200_without_clearance_cookie_is_not_a_solve(tmp_path):
+    pool, calls, _ = make_pool(tmp_path, [(200, False)], solve_attempts=1)
+    pool.get_session()
+    assert pool.state is None
+    assert not (tmp_path / "cf_clearance.json").exists()
+    pool.close()
+
+def test_retry_then_share_clearance(tmp_path):
+    pool, calls, _ = make_pool(tmp_path, [(403, False), (200, True)], solve_attempts=3)
+    sessions = []
+    threads = [threading.Thread(target=lambda: sessions.append(pool.get_session())) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    # One solve (two warm-ups) for all threads, and every thread carries its cookie
+    assert len(calls) == 2
+    assert all(session.cookies.get('cf_clearance') == 'token' for session in sessions)
+    state = json.loads((tmp_path / "cf_clearance.json").read_text())
+    assert state['expires_at'] > time.time()
+    pool.close()
+
+def test_saved_clearance_is_reused(tmp_path):
+    pool, calls, _ = make_pool(tmp_path, [(200, True)])
+    pool.get_session()
+    pool.close()
+    again, again_calls, _ = make_pool(tmp_path, [])
+    assert again.get_session().cookies.get('cf_clearance') == 'token'
+    assert again_calls == []
+    again.close()
+
+def test_close_stops_refresher_and_closes_sessions(tmp_path):
+    pool, _, scrapers = make_pool(tmp_path, [(200, True)])
+    pool.get_session()
+    refresher = pool.refresher
+    assert refresher.is_alive()
+    pool.close()
+    assert not refresher.is_alive()
+    assert all(scraper.closed for scraper in scrapers)
+    # Still usable afterwards, from the saved clearance
+    assert pool.get_session().cookies.get('cf_clearance') == 'token'
+    pool.close()
@@ -0,0 +1,85 @@
+#!/usr/bin/env python3
+"""Fetch ladder escalation order, scoreboard promotion and rate limiter feedback
+
+Run offline with: python -m pytest -q test_fetch_strategy.py
+"""
+
+import pytest
+
+from fetch_strategy import FetchLadder, MethodScoreboard
+from rate_limiter import AdaptiveRateLimiter
+
+PRODUCT_URL = "https://www.pcjeweller.com/the-aria-diamond-ring-ar01.html"
+
+class FakeResponse:
+    def __init__(self, status_code):
+        self.status_code = status_code
+
+class Rung:
+    """Fetcher answering every URL with one status, or raising"""
+
+    def __init__(self, name, calls, status=200):
+        self.name = name
+        self.calls = calls
+        self.status = status
+
+    def __call__(self, url, headers):
+        self.calls.append(self.name)
+        if isinstance(self.status, Exception):
+            raise self.status
+        return FakeResponse(self.status)
+
+@pytest.fixture
+def limiter():
+    return AdaptiveRateLimiter(initial_rate=1.0, increase=0.1, backoff=0.5)
+
+def make_ladder(statuses, limiter, scoreboard=None):
+    calls = []
+    fetchers = {name: Rung(name, calls, status) for name, status in statuses.items()}
+    scoreboard = scoreboard or MethodScoreboard(path=None, min_trials=3)
+    return FetchLadder(fetchers, scoreboard=scoreboard, rate_limiter=limiter), calls
+
+def test_untried_methods_escalate_in_insertion_order(limiter):
+    ladder, calls = make_ladder({'requests': 403, 'httpx': ConnectionError("reset"), 'cloudscraper': 200}, limiter)
+    method, response = ladder.fetch(PRODUCT_URL)
+    assert method == 'cloudscraper' and response.status_code == 200
+    assert calls == ['requests', 'httpx', 'cloudscraper']
+
+def test_escalated_failures_do_not_slow_the_host(limiter):
+    ladder, _ = make_ladder({'requests': 403, 'cloudscraper': 200}, limiter)
+    ladder.fetch(PRODUCT_URL)
+    # Only the final 200 is recorded: one additive increase, no halving
+    assert limiter.current_rate(PRODUCT_URL) == pytest.approx(1.1)
+
+def test_failure_on_every_rung_is_recorded_once(limiter):
+    ladder, _ = make_ladder({'requests': 403, 'cloudscraper': 503}, limiter)
+    assert ladder.fetch(PRODUCT_URL)[0] is None
+    assert limiter.current_rate(PRODUCT_URL) == pytest.approx(0.5)
+
+def test_scoreboard_promotes_the_working_method(limiter):
+    ladder, calls = make_ladder({'requests': 403, 'cloudscraper': 200}, limiter)
+    for _ in range(3):
+        ladder.fetch(PRODUCT_URL)
+    del calls[:]
+    # requests has failed min_trials times for product URLs; cloudscraper now goes first
+    assert ladder.fetch(PRODUCT_URL)[0] == 'cloudscraper'
+    assert calls == ['cloudscraper']
+    # Other URL kinds still start from the cheapest rung
+    del calls[:]
+    ladder.fetch("https://www.pcjeweller.com/jewellery/rings.html")
+    assert calls == ['requests', 'cloudscraper']
+
+def test_preferred_method_goes_first(limiter):
+    ladder, calls = make_ladder({'requests': 200, 'cloudscraper': 200}, limiter)
+    assert ladder.fetch(PRODUCT_URL, preferred='cloudscraper')[0] == 'cloudscraper'
+    assert calls == ['cloudscraper']
+
+def test_scoreboard_survives_a_restart(tmp_path, limiter):
+    path = tmp_path / "scoreboard.json"
+    ladder, _ = make_ladder({'requests': 403, 'cloudscraper': 200}, limiter,
+                            MethodScoreboard(path=path, min_trials=3))
+    for _ in range(3):
+        ladder.fetch(PRODUCT_URL)
+    ladder.scoreboard.save()
+    assert MethodScoreboard(path=path, min_trials=3).order('product', ['requests', 'cloudscraper']) == [
+        'cloudscraper', 'requests']
@@ -0,0 +1,150 @@
+#!/usr/bin/env python3
+"""Resumable, verified image downloads against a scripted fake server
+
+Run offline with: python -m pytest -q test_http_clients.py
+"""
+
+import io
+import random
+
+import pytest
+import requests
+from PIL import Image
+from requests.structures import CaseInsensitiveDict
+
+from http_clients import download_to_file
+
+IMAGE_URL = "https://cf-cdn.pcjeweller.com/public/uploads/catalog/product/preview/a/ARIA-1.jpg"
+
+def jpeg_bytes(seed):
+    rng = random.Random(seed)
+    image = Image.new('RGB', (64, 64))
+    image.putdata([(rng.randrange(256), rng.randrange(256), rng.randrange(256)) for _ in range(64 * 64)])
+    buffer = io.BytesIO()
+    image.save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+IMAGE = jpeg_bytes(1)
+HALF = len(IMAGE) // 2
+
+class FakeResponse:
+    """Streams its body in chunks, optionally dropping the connection after them"""
+
+    def __init__(self, status_code, body=b'', headers=None, drop=False):
+        self.status_code = status_code
+        self.body = body
+        self.headers = CaseInsensitiveDict(headers or {})
+        self.drop = drop
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_content(self, chunk_size=1):
+        for start in range(0, len(self.body), 1024):
+            yield self.body[start:start + 1024]
+        if self.drop:
+            raise requests.exceptions.ChunkedEncodingError("connection dropped")
+
+class FakeSession:
+    """Answers each GET with the next scripted response and keeps the request headers"""
+
+    def __init__(self, *responses):
+        self.responses = list(responses)
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None, **kwargs):
+        self.requests.append(dict(headers or {}))
+        return self.responses.pop(0)
+
+def full(body=IMAGE, **headers):
+    return FakeResponse(200, body, {'Content-Length': str(len(body)), **headers})
+
+def truncated(length, drop=False, **headers):
+    """200 announcing the whole image but ending after length bytes"""
+    return FakeResponse(200, IMAGE[:length], {'Content-Length': str(len(IMAGE)), **headers}, drop=drop)
+
+def partial(start, body=IMAGE, **headers):
+    return FakeResponse(206, body[start:], {'Content-Range': f"bytes {start}-{len(body) - 1}/{len(body)}", **headers})
+
+@pytest.fixture
+def target(tmp_path):
+    return tmp_path / "aria.jpg"
+
+def part_of(target):
+    return target.with_name(target.name + '.part')
+
+def test_truncated_body_is_resumed_with_range(target):
+    session = FakeSession(truncated(HALF, ETag='"v1"'), partial(HALF))
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert session.requests[1]['Range'] == f"bytes={HALF}-"
+    assert session.requests[1]['If-Range'] == '"v1"'
+    assert target.read_bytes() == IMAGE
+    assert not part_of(target).exists()
+
+def test_gives_up_after_resume_attempts_and_keeps_part(target):
+    stalled = [FakeResponse(206, b'', {'Content-Range': f"bytes {HALF}-{len(IMAGE) - 1}/{len(IMAGE)}"})
+               for _ in range(2)]
+    session = FakeSession(truncated(HALF), *stalled)
+    assert download_to_file(session, IMAGE_URL, target, resume_attempts=2) is None
+    assert not target.exists()
+    # Kept so the next call resumes instead of starting over
+    assert part_of(target).read_bytes() == IMAGE[:HALF]
+
+    session = FakeSession(partial(HALF))
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert session.requests[0]['Range'] == f"bytes={HALF}-"
+    assert target.read_bytes() == IMAGE
+
+def test_206_for_the_wrong_offset_restarts(target):
+    part_of(target).write_bytes(IMAGE[:HALF])
+    session = FakeSession(partial(0), full())
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert 'Range' not in session.requests[1]
+    assert target.read_bytes() == IMAGE
+    assert not part_of(target).exists()
+
+def test_416_with_complete_part_is_renamed(target):
+    part_of(target).write_bytes(IMAGE)
+    session = FakeSession(FakeResponse(416, headers={'Content-Range': f"bytes */{len(IMAGE)}"}))
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert len(session.requests) == 1
+    assert target.read_bytes() == IMAGE
+    assert not part_of(target).exists()
+
+def test_416_with_incomplete_part_restarts(target):
+    part_of(target).write_bytes(IMAGE[:HALF])
+    session = FakeSession(FakeResponse(416, headers={'Content-Range': f"bytes */{len(IMAGE) + 10}"}), full())
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert 'Range' not in session.requests[1]
+    assert target.read_bytes() == IMAGE
+
+def test_if_range_200_replaces_stale_part(target):
+    changed = jpeg_bytes(2)
+    # The image changed since the first part: the server ignores Range and resends it whole
+    session = FakeSession(truncated(HALF, drop=True, ETag='"v1"'), full(changed, ETag='"v2"'))
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert session.requests[1]['If-Range'] == '"v1"'
+    assert target.read_bytes() == changed
+    assert not part_of(target).exists()
+
+def test_content_length_ignored_under_content_encoding(target):
+    # Content-Length is the compressed size; the body arrives decoded and longer
+    session = FakeSession(FakeResponse(200, IMAGE, {'Content-Length': str(HALF), 'Content-Encoding': 'gzip'}))
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert len(session.requests) == 1
+    assert target.read_bytes() == IMAGE
+
+def test_jpeg_without_eoi_is_discarded(target):
+    session = FakeSession(FakeResponse(200, IMAGE[:IMAGE.rindex(b'\xff\xd9')]))
+    assert download_to_file(session, IMAGE_URL, target) is None
+    assert not target.exists()
+    assert not part_of(target).exists()
+
+def test_damaged_existing_file_is_replaced(target):
+    target.write_bytes(IMAGE[:HALF])
+    session = FakeSession(full())
+    assert download_to_file(session, IMAGE_URL, target) == 'downloaded'
+    assert target.read_bytes() == IMAGE
@@ -0,0 +1,90 @@
+#!/usr/bin/env python3
+"""Image store revalidation of stored URLs with the response cache
+
+Run offline with: python -m pytest -q test_image_store.py
+"""
+
+import io
+
+import pytest
+import requests
+from PIL import Image
+from requests.structures import CaseInsensitiveDict
+
+from image_store import ImageStore
+from response_cache import ResponseCache
+
+IMAGE_URL = "https://www.pcjeweller.com/media/catalog/product/a/r/aria.jpg"
+
+def jpeg_bytes(color):
+    buffer = io.BytesIO()
+    Image.new('RGB', (8, 8), color).save(buffer, 'JPEG')
+    return buffer.getvalue()
+
+class FakeSession:
+    """Serves one image with an ETag and answers matching conditional GETs with 304"""
+
+    def __init__(self, body, etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None, **kwargs):
+        headers = dict(headers or {})
+        self.requests.append(headers)
+        response = requests.Response()
+        response.url = url
+        response.headers = CaseInsensitiveDict({'ETag': self.etag, 'Content-Length': str(len(self.body))})
+        if headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response.raw = io.BytesIO(b'')
+        else:
+            response.status_code = 200
+            response.raw = io.BytesIO(self.body)
+        return response
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(cache_dir=tmp_path / "cache")
+
+def test_unchanged_image_is_revalidated_once(tmp_path, cache):
+    session = FakeSession(jpeg_bytes('red'))
+    path, result = ImageStore(tmp_path / "store").fetch(session, IMAGE_URL, cache=cache)
+    assert result == 'downloaded'
+    assert cache.validator_headers(IMAGE_URL) == {'If-None-Match': '"v1"'}
+
+    # Next run: one conditional GET, answered 304, keeps the stored object
+    store = ImageStore(tmp_path / "store")
+    assert store.fetch(session, IMAGE_URL, cache=cache) == (path, 'known')
+    assert session.requests[-1].get('If-None-Match') == '"v1"'
+    assert store.fetch(session, IMAGE_URL, cache=cache) == (path, 'known')
+    assert len(session.requests) == 2
+    assert store.stats()['not_modified'] == 1
+
+def test_changed_image_is_stored_again(tmp_path, cache):
+    session = FakeSession(jpeg_bytes('red'))
+    old_path, _ = ImageStore(tmp_path / "store").fetch(session, IMAGE_URL, cache=cache)
+
+    session.body, session.etag = jpeg_bytes('blue'), '"v2"'
+    store = ImageStore(tmp_path / "store")
+    new_path, result = store.fetch(session, IMAGE_URL, cache=cache)
+    assert result == 'downloaded'
+    assert new_path != old_path and new_path.read_bytes() == session.body
+    assert store.lookup(IMAGE_URL) == new_path
+    assert cache.validator_headers(IMAGE_URL) == {'If-None-Match': '"v2"'}
+
+def test_failed_revalidation_keeps_stored_copy(tmp_path, cache):
+    session = FakeSession(jpeg_bytes('red'))
+    path, _ = ImageStore(tmp_path / "store").fetch(session, IMAGE_URL, cache=cache)
+
+    def refuse(url, **kwargs):
+        raise requests.ConnectionError("reset")
+    session.get = refuse
+    assert ImageStore(tmp_path / "store").fetch(session, IMAGE_URL, cache=cache) == (path, 'known')
+
+def test_without_cache_stored_urls_are_not_refetched(tmp_path):
+    session = FakeSession(jpeg_bytes('red'))
+    store = ImageStore(tmp_path / "store")
+    path, _ = store.fetch(session, IMAGE_URL)
+    assert store.fetch(session, IMAGE_URL) == (path, 'known')
+    assert len(session.requests) == 1
@@ -0,0 +1,58 @@
+#!/usr/bin/env python3
+"""Grouping resized copies of one product photo
+
+Run offline with: python -m pytest -q test_image_urls.py
+"""
+
+from image_urls import canonical_image_urls, image_key, ORIGINAL_SIZE
+
+CDN = "https://cf-cdn.pcjeweller.com/public/uploads/catalog/product"
+MEDIA = "https://www.pcjeweller.com/media/catalog/product"
+HASH = "0123456789abcdef0123456789abcdef"
+
+def test_cdn_variants_share_a_key():
+    keys = {image_key(f"{CDN}/{variant}/a/ARIA-1.jpg") for variant in ('preview', 'custom', 'thumb', 'small')}
+    assert len({key for key, _ in keys}) == 1
+    assert image_key(f"{CDN}/preview/a/ARIA-1.jpg") == ('catalog:a/aria-1.jpg', 500)
+    assert image_key(f"{CDN}/small/a/ARIA-1.jpg?v=3") == ('catalog:a/aria-1.jpg', 100)
+
+def test_magento_cache_copies_group_with_the_original():
+    urls = [
+        f"{MEDIA}/a/r/aria.jpg",
+        f"{MEDIA}/cache/1/a/r/aria.jpg",
+        f"{MEDIA}/cache/{HASH}/a/r/aria.jpg",
+        f"{MEDIA}/cache/1/image/500x/{HASH}/a/r/aria.jpg",
+        f"{MEDIA}/cache/1/small_image/135x135/{HASH}/a/r/aria.jpg",
+        f"{MEDIA}/cache/1/thumbnail/75x/a/r/aria.jpg",
+        f"{MEDIA}/cache/1/swatch_image/30x20/a/r/aria.jpg",
+    ]
+    assert {image_key(url)[0] for url in urls} == {'catalog:a/r/aria.jpg'}
+    assert image_key(urls[0])[1] == ORIGINAL_SIZE
+    assert image_key(urls[3])[1] == 500
+    assert image_key(urls[4])[1] == 135
+    assert image_key(urls[6])[1] == 30
+
+def test_dispersion_folders_are_not_taken_for_a_role():
+    # 'r/' after the cache id is the file's folder, not an image role
+    assert image_key(f"{MEDIA}/cache/1/r/i/ring.jpg")[0] == 'catalog:r/i/ring.jpg'
+    assert image_key(f"{MEDIA}/cache/1/r/i/ring.jpg")[0] != image_key(f"{MEDIA}/cache/1/i/ring.jpg")[0]
+
+def test_other_images_key_on_host_and_path():
+    assert image_key("https://www.pcjeweller.com/skin/logo.png?v=2") == ('www.pcjeweller.com/skin/logo.png', None)
+
+def test_largest_copy_wins_by_default():
+    urls = [f"{CDN}/small/a/ARIA-1.jpg", f"{CDN}/preview/a/ARIA-1.jpg", f"{CDN}/thumb/a/ARIA-1.jpg",
+            f"{CDN}/thumb/a/ARIA-2.jpg"]
+    assert canonical_image_urls(urls) == [f"{CDN}/preview/a/ARIA-1.jpg", f"{CDN}/thumb/a/ARIA-2.jpg"]
+
+def test_size_picks_the_smallest_large_enough_copy():
+    urls = [f"{CDN}/small/a/ARIA-1.jpg", f"{CDN}/preview/a/ARIA-1.jpg", f"{CDN}/thumb/a/ARIA-1.jpg"]
+    assert canonical_image_urls(urls, size=300) == [f"{CDN}/thumb/a/ARIA-1.jpg"]
+    assert canonical_image_urls(urls, size=100) == [f"{CDN}/small/a/ARIA-1.jpg"]
+    # Nothing large enough: the largest there is
+    assert canonical_image_urls(urls, size=2000) == [f"{CDN}/preview/a/ARIA-1.jpg"]
+
+def test_unknown_sizes_rank_below_known_ones():
+    urls = [f"{MEDIA}/cache/1/a/r/aria.jpg", f"{MEDIA}/cache/1/image/500x/a/r/aria.jpg"]
+    assert canonical_image_urls(urls) == [urls[1]]
+    assert canonical_image_urls([urls[0], "https://example.com/x.jpg"]) == [urls[0], "https://example.com/x.jpg"]
@@ -0,0 +1,60 @@
+#!/usr/bin/env python3
+"""Image variants from sources in modes JPEG cannot store
+
+Run offline with: python -m pytest -q test_image_variants.py
+"""
+
+import pytest
+from PIL import Image
+
+from image_variants import make_variants
+
+VARIANTS = {
+    'thumb': {'max_size': 16, 'format': 'jpeg', 'quality': 90},
+    'web': {'max_size': 32, 'format': 'webp', 'quality': 90},
+    'dark': {'max_size': 16, 'format': 'jpeg', 'quality': 90, 'background': (0, 0, 0)},
+}
+
+def half_transparent(mode):
+    """64x64 red (gray for LA) image whose left half is fully transparent"""
+    if mode == 'LA':
+        image = Image.new('LA', (64, 64), (100, 255))
+        image.paste((0, 0), (0, 0, 32, 64))
+    elif mode == 'P':
+        image = Image.new('P', (64, 64), 1)
+        image.putpalette([0, 255, 0] + [255, 0, 0] * 255)
+        image.paste(0, (0, 0, 32, 64))
+        image.info['transparency'] = 0
+    else:
+        image = Image.new('RGBA', (64, 64), (255, 0, 0, 255))
+        image.paste((0, 255, 0, 0), (0, 0, 32, 64))
+    return image
+
+def store_png(tmp_path, image, name):
+    path = tmp_path / f"{name}.png"
+    image.save(path, 'PNG')
+    return path
+
+@pytest.mark.parametrize("mode", ['RGBA', 'P', 'LA'])
+def test_transparent_sources(tmp_path, mode):
+    source = store_png(tmp_path, half_transparent(mode), f"{mode.lower()}hash")
+    written = make_variants(source, tmp_path / "variants", VARIANTS)
+    assert set(written) == set(VARIANTS)
+
+    with Image.open(written['thumb']) as thumb:
+        assert thumb.format == 'JPEG' and thumb.mode in ('RGB', 'L') and thumb.size == (16, 16)
+        # Transparent half on the white background, not the hidden colour underneath
+        assert min(thumb.convert('RGB').getpixel((2, 8))) > 240
+    with Image.open(written['dark']) as dark:
+        assert max(dark.convert('RGB').getpixel((2, 8))) < 15
+    with Image.open(written['web']) as web:
+        assert web.format == 'WEBP' and web.size == (32, 32)
+
+def test_16_bit_grayscale_source(tmp_path):
+    image = Image.new('I;16', (64, 64), 32768)
+    source = store_png(tmp_path, image, "deephash")
+    written = make_variants(source, tmp_path / "variants", VARIANTS)
+    with Image.open(written['thumb']) as thumb:
+        assert thumb.mode == 'L'
+        # Scaled to 8 bits rather than clipped to white
+        assert 120 <= thumb.getpixel((8, 8)) <= 136
@@ -0,0 +1,202 @@
+#!/usr/bin/env python3
+"""The single-pass lxml extractors against the BeautifulSoup logic they replaced
+
+Run offline with: python -m pytest -q test_page_extraction.py
+"""
+
+import re
+from pathlib import Path
+from urllib.parse import urljoin
+
+import pytest
+from bs4 import BeautifulSoup
+
+import all_jewellery_scraper
+import optimized_scraper
+import production_scraper
+from listing_parser import LinkSelector, site_url, strip_query
+from product_extractor import extract_product_fields, IncrementalProductExtractor
+
+FIXTURES = Path(__file__).parent / "test_fixtures"
+
+@pytest.fixture(scope="module")
+def listing_page():
+    return (FIXTURES / "listing_page.html").read_bytes()
+
+@pytest.fixture(scope="module")
+def product_page():
+    return (FIXTURES / "product_page.html").read_bytes()
+
+def soup_links(content, selector):
+    """hrefs soup.select(selector) finds, in document order"""
+    soup = BeautifulSoup(content, 'html.parser')
+    return [link.get('href') for link in soup.select(selector) if link.get('href') is not None]
+
+def legacy_product_links(content):
+    """ProductionScraper.parse_product_links before the link scan"""
+    soup = BeautifulSoup(content, 'html.parser')
+    product_links = set()
+    selectors = [
+        '.productListing a[href*=".html"]',
+        '.pdt-item-list a[href*=".html"]',
+        'a[href*="-ring-"], a[href*="-necklace-"], a[href*="-earring-"], a[href*="-bracelet-"], '
+        'a[href*="-pendant-"], a[href*="-chain-"]',
+        'a[title="View Details"]'
+    ]
+    for selector in selectors:
+        for link in soup.select(selector):
+            href = link.get('href')
+            if href and href.endswith('.html'):
+                if href.startswith('/'):
+                    href = urljoin("https://www.pcjeweller.com", href)
+                clean_href = href.split('?')[0]
+                if any(keyword in clean_href.lower() for keyword in
+                       ['-ring-', '-necklace-', '-earring-', '-bracelet-', '-pendant-', '-chain-', '-bangle-']):
+                    product_links.add(clean_href)
+    return product_links
+
+def legacy_product_fields(content):
+    """ProductionScraper.parse_product_details before the single-pass walk"""
+    soup = BeautifulSoup(content, 'html.parser')
+    product = {'name': '', 'price': '', 'original_price': '', 'subcategory': '',
+               'description': '', 'availability': '', 'image_urls': []}
+    for selector in ['h1.product-name', 'h1', '.product-title', '.pdt-name', '[class*="product-name"]', '.item-name']:
+        elem = soup.select_one(selector)
+        if elem and elem.get_text(strip=True):
+            product['name'] = elem.get_text(strip=True)
+            break
+    price_container = soup.select_one('.price-container, .product-price, .pdt-price')
+    if price_container:
+        current_price = price_container.select_one('.current-price, .special-price, .discounted-price')
+        if current_price:
+            product['price'] = current_price.get_text(strip=True)
+        original_price = price_container.select_one('.original-price, .regular-price, .mrp')
+        if original_price:
+            product['original_price'] = original_price.get_text(strip=True)
+    if not product['price']:
+        price_match = re.search(r'₹[\d,]+', soup.get_text())
+        if price_match:
+            product['price'] = price_match.group()
+
+    specs = {}
+    for table in soup.select('.specifications table, .product-specs table, .details table'):
+        for row in table.select('tr'):
+            cells = row.select('td, th')
+            if len(cells) >= 2:
+                key = cells[0].get_text(strip=True).lower()
+                value = cells[1].get_text(strip=True)
+                if key and value:
+                    specs[key] = value
+    for dl in soup.select('.specifications dl, .product-details dl'):
+        for dt, dd in zip(dl.select('dt'), dl.select('dd')):
+            key = dt.get_text(strip=True).lower()
+            value = dd.get_text(strip=True)
+            if key and value:
+                specs[key] = value
+    for item in soup.select('.specifications li, .product-details li, .specs li'):
+        text = item.get_text(strip=True)
+        if ':' in text:
+            key, value = text.split(':', 1)
+            specs[key.strip().lower()] = value.strip()
+    product['specifications'] = specs
+
+    for selector in ['.product-image img', '.pdt-image img', '.gallery img', '.product-gallery img',
+                     '.zoom-image img', 'img[src*="catalog/product"]', 'img[alt*="Ring"], img[alt*="Necklace"]']:
+        for img in soup.select(selector):
+            src = img.get('src') or img.get('data-src') or img.get('data-original')
+            if src:
+                if src.startswith('//'):
+                    src = 'https:' + src
+                elif src.startswith('/'):
+                    src = urljoin("https://www.pcjeweller.com", src)
+                if src not in product['image_urls'] and 'catalog/product' in src:
+                    product['image_urls'].append(src)
+    for selector in ['.product-description', '.description', '.pdt-description',
+                     '.product-details .description', '.summary', '.product-summary']:
+        elem = soup.select_one(selector)
+        if elem:
+            desc_text = elem.get_text(strip=True)
+            if len(desc_text) > 20:
+                product['description'] = desc_text[:400]
+                break
+    for selector in ['.availability', '.stock-status', '.in-stock', '.out-of-stock',
+                     '[class*="stock"]', '[class*="availability"]']:
+        elem = soup.select_one(selector)
+        if elem:
+            product['availability'] = elem.get_text(strip=True)
+            break
+    breadcrumbs = soup.select('.breadcrumb a, .breadcrumbs a')
+    if len(breadcrumbs) > 1:
+        product['subcategory'] = breadcrumbs[-1].get_text(strip=True)
+    return product
+
+LINK_SELECTORS = [
+    production_scraper.LISTING_LINKS,
+    optimized_scraper.LISTING_LINKS,
+    all_jewellery_scraper.PAGE_LINKS,
+    all_jewellery_scraper.listing_links(all_jewellery_scraper.LINK_SELECTORS),
+]
+
+@pytest.mark.parametrize("selector", LINK_SELECTORS)
+def test_link_scan_matches_soup_select(listing_page, selector):
+    links = selector.scan(listing_page)
+    for name, source in selector.selectors.items():
+        assert links[name] == soup_links(listing_page, source), name
+
+def test_link_scan_ancestors_and_attributes():
+    selector = LinkSelector({'listed': '.list a[href*=".html"]', 'details': 'a[title="View Details"]'})
+    links = selector.scan(
+        b'<div class="list"><p><a href="/a.html">a</a></p><a href="/b">b</a></div>'
+        b'<a href="/c.html">c</a><a title="View Details" href="/d.html?x=1">d</a><a title="View">e</a>'
+    )
+    assert links == {'listed': ['/a.html'], 'details': ['/d.html?x=1']}
+
+def test_product_links_match_legacy(listing_page):
+    scraper = production_scraper.ProductionScraper.__new__(production_scraper.ProductionScraper)
+    links = scraper.parse_product_links(production_scraper.LISTING_LINKS.scan(listing_page))
+    assert set(links) == legacy_product_links(listing_page)
+    # As before, hrefs must end in .html before the query is stripped, so query-string links are left out
+    assert "https://www.pcjeweller.com/the-bella-gold-ring-br02.html" not in links
+    assert "https://www.pcjeweller.com/the-aria-diamond-ring-ar01.html" in links
+
+def test_site_url_and_strip_query():
+    assert site_url('/the-aria-diamond-ring-ar01.html') == "https://www.pcjeweller.com/the-aria-diamond-ring-ar01.html"
+    assert site_url('https://cdn.example.com/a.html') == 'https://cdn.example.com/a.html'
+    assert site_url('#top') == '#top'
+    assert strip_query("https://www.pcjeweller.com/a.html?utm_source=x&p=2") == "https://www.pcjeweller.com/a.html"
+    assert strip_query("https://www.pcjeweller.com/a.html") == "https://www.pcjeweller.com/a.html"
+
+def test_product_fields_match_legacy(product_page):
+    fields = extract_product_fields(product_page)
+    legacy = legacy_product_fields(product_page)
+    for name, value in legacy.items():
+        assert fields[name] == value, name
+    assert fields['price'] == '₹12,000'
+    assert fields['specifications']['metal'] == 'Gold'
+    assert 'dataLayer' not in fields['description']
+
+def test_product_fields_with_definition_lists_and_fallback_price():
+    page = (
+        '<html><body><div class="breadcrumb"><a href="/">Home</a><a href="/rings.html">Rings</a></div>'
+        '<h1></h1><div class="product-title">Solitaire Ring</div><p>Now only ₹9,999</p>'
+        '<div class="product-details"><dl><dt>Metal</dt><dd>Platinum</dd><dt>Stone</dt><dd>Diamond</dd></dl>'
+        '<ul><li>Size: 14</li><li>No colon here</li></ul></div>'
+        '<div class="stock-status">Only 2 left</div>'
+        '<img data-src="//cf-cdn.pcjeweller.com/catalog/product/preview/s/SOL.jpg" alt="Solitaire Ring">'
+        '</body></html>'
+    ).encode('utf-8')
+    fields = extract_product_fields(page)
+    legacy = legacy_product_fields(page)
+    for name, value in legacy.items():
+        assert fields[name] == value, name
+    assert fields['name'] == 'Solitaire Ring'
+    assert fields['price'] == '₹9,999'
+    assert fields['specifications'] == {'metal': 'Platinum', 'stone': 'Diamond', 'size': '14'}
+
+@pytest.mark.parametrize("chunk_size", [1, 512, 4096])
+def test_incremental_extractor_matches_single_pass(product_page, chunk_size):
+    extractor = IncrementalProductExtractor()
+    for start in range(0, len(product_page), chunk_size):
+        if extractor.feed(product_page[start:start + chunk_size]):
+            break
+    assert extractor.result() == extract_product_fields(product_page)
@@ -0,0 +1,99 @@
+#!/usr/bin/env python3
+"""Page template routing, one case per template
+
+Run offline with: python -m pytest -q test_page_templates.py
+"""
+
+from pathlib import Path
+
+import pytest
+import requests
+
+from all_jewellery_scraper import AllJewelleryScraper
+from page_templates import classify_page, PAGE_TEMPLATES
+from url_patterns import url_kind
+
+ROOT = Path(__file__).parent
+FIXTURES = ROOT / "test_fixtures"
+
+PRODUCT_URL = "https://www.pcjeweller.com/the-aria-diamond-ring-ar01.html"
+PLAIN_URL = "https://www.pcjeweller.com/the-aria-solitaire-ar01.html"
+PLAIN_PAGE = b"<html><head><title>The Aria Solitaire</title></head><body><h1>The Aria Solitaire</h1></body></html>"
+
+class FakeCache:
+    """Response cache stand-in answering every fetch with one 200 body"""
+
+    def __init__(self, content):
+        self.content = content
+
+    def fetch(self, session, url, **kwargs):
+        response = requests.Response()
+        response.status_code = 200
+        response._content = self.content
+        return response
+
+def test_product_page_by_markers():
+    content = (FIXTURES / "product_page.html").read_bytes()
+    assert classify_page(content, PLAIN_URL) == 'product'
+
+@pytest.mark.parametrize("marker", [
+    b'<meta property="og:type" content="product">',
+    b'<script type="application/ld+json">{"@type": "Product"}</script>',
+    b'<body class="page-product-configurable catalog-product-view">',
+])
+def test_each_product_marker(marker):
+    assert classify_page(b"<html><head>" + marker + b"</head></html>") == 'product'
+
+def test_saved_listing_page():
+    # A search results page saved from the live site
+    content = (ROOT / "page_source.html").read_bytes()
+    assert classify_page(content, "https://www.pcjeweller.com/search?q=ring") == 'listing'
+
+def test_listing_page_by_markers():
+    content = (FIXTURES / "listing_page.html").read_bytes()
+    assert classify_page(content, PLAIN_URL) == 'listing'
+
+def test_challenge_page():
+    content = b"<html><head><title>Just a moment...</title></head><body><div id='cf-chl-widget'></div></body></html>"
+    assert classify_page(content, PRODUCT_URL) == 'challenge'
+    assert classify_page(PLAIN_PAGE, PRODUCT_URL, page_kind='block') == 'challenge'
+
+def test_url_fallback_without_markers():
+    assert classify_page(PLAIN_PAGE, PRODUCT_URL) == 'product'
+    assert classify_page(PLAIN_PAGE, "https://www.pcjeweller.com/jewellery/rings.html?p=2") == 'listing'
+
+def test_unknown_when_nothing_tells():
+    assert classify_page(PLAIN_PAGE, PLAIN_URL) == 'unknown'
+    assert classify_page(PLAIN_PAGE) == 'unknown'
+    assert set(PAGE_TEMPLATES) == {'product', 'listing', 'challenge', 'unknown'}
+
+def test_markers_beyond_sniff_window_are_ignored():
+    content = b"<html><head>" + b" " * 20000 + b'<meta property="og:type" content="product"></head></html>'
+    assert classify_page(content, PLAIN_URL) == 'unknown'
+
+@pytest.mark.parametrize("path", ["/rings.html", "/earrings.html", "/gold-rings.html", "/about-us.html"])
+def test_category_and_cms_urls_are_not_products(path):
+    url = "https://www.pcjeweller.com" + path
+    assert url_kind(url) == 'page'
+    assert classify_page(PLAIN_PAGE, url) == 'unknown'
+
+@pytest.mark.parametrize("path", [
+    "/the-noor-diamond-nose-pin-ships-faster.html",
+    "/classic-mangalsutra-gm101.html",
+])
+def test_product_url_shapes(path):
+    assert url_kind("https://www.pcjeweller.com" + path) == 'product'
+
+def test_cms_page_is_skipped_unless_it_has_product_markers():
+    scraper = AllJewelleryScraper.__new__(AllJewelleryScraper)
+    scraper.page_extractors = {'product': lambda url, response: {'url': url}}
+    scraper.skipped_pages = {}
+    scraper.scraper = scraper.rate_limiter = None
+    url = "https://www.pcjeweller.com/gold-rings.html"
+    cms_page = b"<html><head><title>Gold Rings</title></head><body><div class='cms-content'></div></body></html>"
+    scraper.response_cache = FakeCache(cms_page)
+    assert scraper.extract_product_details(url) is None
+    assert scraper.skipped_pages == {url: 'unknown'}
+
+    scraper.response_cache = FakeCache((FIXTURES / "product_page.html").read_bytes())
+    assert scraper.extract_product_details(url) == {'url': url}
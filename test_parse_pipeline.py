@@ -0,0 +1,72 @@
+#!/usr/bin/env python3
+"""Parse pipeline back-pressure and shared body slots
+
+Run offline with: python -m pytest -q test_parse_pipeline.py
+"""
+
+import time
+
+import pytest
+
+from parse_pipeline import ParsePipeline, SharedBodyRing
+
+SLOT_BYTES = 1024
+OVERSIZE_ITEM = 5
+FAILING_ITEM = 7
+
+def fetch_body(item):
+    size = SLOT_BYTES * 2 if item == OVERSIZE_ITEM else 100 + item
+    return bytes([item]) * size
+
+def parse_body(item, content):
+    if item == FAILING_ITEM:
+        raise ValueError("unparseable page")
+    return {'item': item, 'length': len(content), 'intact': content == bytes([item]) * len(content)}
+
+def wait_for_free_slots(ring, slots, timeout=5):
+    # Slots come back from the futures' done callbacks, which may trail the result by a moment
+    deadline = time.monotonic() + timeout
+    while len(ring.free) < slots and time.monotonic() < deadline:
+        time.sleep(0.01)
+    return len(ring.free)
+
+def test_ring_falls_back_when_full_or_oversize():
+    ring = SharedBodyRing(slots=2, slot_bytes=SLOT_BYTES)
+    try:
+        assert ring.put(b'x' * (SLOT_BYTES + 1)) is None
+        first, second = ring.put(b'a'), ring.put(b'b')
+        assert ring.put(b'c') is None
+        ring.release(first)
+        assert ring.put(b'c') == first
+        ring.release(first)
+        ring.release(second)
+        assert sorted(ring.free) == [0, 1]
+    finally:
+        ring.close()
+
+def test_every_slot_comes_back():
+    pipeline = ParsePipeline(fetch_workers=2, parse_workers=2, max_pending=2, slot_bytes=SLOT_BYTES)
+    items = list(range(1, 25))
+    try:
+        results = dict(pipeline.run(items, fetch_body, parse_body))
+        slots = pipeline.max_pending + pipeline.fetch_workers * 2
+        assert wait_for_free_slots(pipeline.ring, slots) == slots
+    finally:
+        pipeline.close()
+
+    assert sorted(results) == items
+    assert results[FAILING_ITEM] is None
+    assert results[OVERSIZE_ITEM] == {'item': OVERSIZE_ITEM, 'length': SLOT_BYTES * 2, 'intact': True}
+    for item in items:
+        if item not in (FAILING_ITEM, OVERSIZE_ITEM):
+            assert results[item] == {'item': item, 'length': 100 + item, 'intact': True}
+
+def test_early_stop_releases_slots():
+    pipeline = ParsePipeline(fetch_workers=2, parse_workers=2, max_pending=2, slot_bytes=SLOT_BYTES)
+    try:
+        for _ in zip(range(3), pipeline.run(range(1, 25), fetch_body, parse_body)):
+            pass
+        slots = pipeline.max_pending + pipeline.fetch_workers * 2
+        assert wait_for_free_slots(pipeline.ring, slots) == slots
+    finally:
+        pipeline.close()
@@ -0,0 +1,82 @@
+#!/usr/bin/env python3
+"""Every parser backend must extract the same product from the same page
+
+Run offline with: python -m pytest -q test_parser_backends.py
+"""
+
+from dataclasses import asdict
+from pathlib import Path
+
+import pytest
+
+from html_parsing import DEFAULT_PARSER_BACKEND, PARSER_BACKENDS, parse_html, resolve_backend
+from robust_product_scraper import parse_product_page
+from selector_profiler import SelectorProfiler
+
+FIXTURES = Path(__file__).parent / "test_fixtures"
+PRODUCT_URL = "https://www.pcjeweller.com/aria-diamond-ring.html"
+BASE_URL = "https://www.pcjeweller.com"
+
+def available_backends():
+    backends = []
+    for backend in PARSER_BACKENDS:
+        try:
+            parse_html(b"<p></p>", backend)
+        except Exception:
+            continue
+        backends.append(backend)
+    return backends
+
+BACKENDS = available_backends()
+
+@pytest.fixture(scope="module")
+def product_page():
+    return (FIXTURES / "product_page.html").read_bytes()
+
+def extract(content, backend):
+    product = parse_product_page(PRODUCT_URL, content, "rings", BASE_URL, backend, SelectorProfiler(path=None))
+    return asdict(product)
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_backend_matches_html_parser(product_page, backend):
+    assert extract(product_page, backend) == extract(product_page, "html.parser")
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_product_fields(product_page, backend):
+    product = extract(product_page, backend)
+    assert product["name"] == "The Aria Diamond Ring"
+    assert product["price"] == "₹12,000"
+    assert product["original_price"] == "₹15,000"
+    assert product["description"] == "A brilliant-cut diamond set in 18K yellow gold, made for everyday wear."
+    assert product["metal"] == "Gold"
+    assert product["sku"] == "ARIA-1"
+    assert product["color"] == "Yellow"
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_select_skips_context_node(backend):
+    soup = parse_html(b'<div class="price"><span class="price">1</span></div>', backend)
+    outer = soup.select_one(".price")
+    assert [node.get_text() for node in outer.select(".price")] == ["1"]
+    assert outer.select_one(".price").get_text() == "1"
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_get_text_skips_script_and_style(backend):
+    soup = parse_html(
+        b"<div>a<script>var x = 1;</script><style>p {}</style><!-- c --> <b>b</b></div>", backend
+    )
+    div = soup.select_one("div")
+    assert div.get_text(" ", strip=True) == "a b"
+    assert "var x" not in soup.get_text()
+
+@pytest.mark.parametrize("backend", BACKENDS)
+def test_get_missing_and_valueless_attributes(backend):
+    soup = parse_html(b'<option value="1" selected>One</option>', backend)
+    option = soup.select_one("option")
+    assert option.get("value") == "1"
+    assert option.get("selected") == ""
+    assert option.get("data-src") is None
+    assert option.get("data-src", "fallback") == "fallback"
+
+def test_selectolax_is_opt_in():
+    assert DEFAULT_PARSER_BACKEND in ('lxml', 'html.parser')
+    assert resolve_backend() == DEFAULT_PARSER_BACKEND
@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""Response cache reuse for pages read only until their fields were extracted
+
+Run offline with: python -m pytest -q test_response_cache.py
+"""
+
+import io
+import threading
+from pathlib import Path
+
+import pytest
+import requests
+from requests.structures import CaseInsensitiveDict
+
+from production_scraper import ProductionScraper
+from product_extractor import IncrementalProductExtractor
+from response_cache import ResponseCache
+
+PRODUCT_URL = "https://www.pcjeweller.com/the-aria-diamond-ring-ar01.html"
+PRODUCT_PAGE = (Path(__file__).parent / "test_fixtures" / "product_page.html").read_bytes()
+# Long enough that the extractor is done well before the end of the body
+LONG_PRODUCT_PAGE = PRODUCT_PAGE.replace(b'</body>', b'<p>Related products</p>' * 4000 + b'</body>')
+
+class FakeSession:
+    """Serves one page with an ETag and answers matching conditional GETs with 304"""
+
+    def __init__(self, body=PRODUCT_PAGE, etag='"v1"'):
+        self.body = body
+        self.etag = etag
+        self.requests = []
+
+    def get(self, url, headers=None, stream=False, timeout=None, **kwargs):
+        headers = dict(headers or {})
+        self.requests.append(headers)
+        response = requests.Response()
+        response.url = url
+        response.encoding = 'utf-8'
+        response.headers = CaseInsensitiveDict({'ETag': self.etag} if self.etag else {})
+        if self.etag and headers.get('If-None-Match') == self.etag:
+            response.status_code = 304
+            response.raw = io.BytesIO(b'')
+        else:
+            response.status_code = 200
+            response.raw = io.BytesIO(self.body)
+        return response
+
+def stop_at_first_chunk(chunk):
+    return True
+
+@pytest.fixture
+def cache(tmp_path):
+    return ResponseCache(cache_dir=tmp_path / "cache")
+
+def fetch_truncated(cache, session, **kwargs):
+    return cache.fetch(session, PRODUCT_URL, consumer=stop_at_first_chunk, record_extractor='production', **kwargs)
+
+def test_truncated_page_record_is_keyed_by_etag(cache):
+    session = FakeSession()
+    response = fetch_truncated(cache, session)
+    assert response.truncated
+    assert response.body_hash == 'etag:"v1"'
+    cache.save_record(PRODUCT_URL, 'production', response, {'name': 'Aria'})
+
+    # Fresh: answered from the record without a request
+    cached = fetch_truncated(cache, session)
+    assert len(session.requests) == 1
+    assert cached.status_code == 304 and cached.content == b''
+    assert cache.load_record(PRODUCT_URL, 'production', cached) == {'name': 'Aria'}
+
+def test_stale_truncated_page_is_revalidated(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path / "cache", ttls={'product': -1})
+    session = FakeSession()
+    response = fetch_truncated(cache, session)
+    cache.save_record(PRODUCT_URL, 'production', response, {'name': 'Aria'})
+
+    revalidated = fetch_truncated(cache, session)
+    assert session.requests[-1].get('If-None-Match') == '"v1"'
+    assert revalidated.not_modified
+    assert cache.load_record(PRODUCT_URL, 'production', revalidated) == {'name': 'Aria'}
+
+    # A changed page is fetched in full and its old record no longer matches
+    session.etag = '"v2"'
+    changed = fetch_truncated(cache, session)
+    assert changed.status_code == 200 and changed.body_hash == 'etag:"v2"'
+    assert cache.load_record(PRODUCT_URL, 'production', changed) is None
+
+def test_other_callers_never_get_bodiless_responses(cache):
+    session = FakeSession()
+    response = fetch_truncated(cache, session)
+    cache.save_record(PRODUCT_URL, 'production', response, {'name': 'Aria'})
+
+    full = cache.fetch(session, PRODUCT_URL)
+    assert 'If-None-Match' not in session.requests[-1]
+    assert full.status_code == 200 and full.content == PRODUCT_PAGE
+    # Records of other extractors do not make the page revalidatable either
+    assert cache.conditional_headers("https://www.pcjeweller.com/other-ring-x.html", 'production') == {}
+
+def test_truncated_page_without_validators_keeps_no_record_key(cache):
+    response = fetch_truncated(cache, FakeSession(etag=None))
+    assert response.truncated and response.body_hash is None
+
+def test_production_scraper_reuses_record_of_truncated_page(cache):
+    scraper = ProductionScraper.__new__(ProductionScraper)
+    scraper.response_cache = cache
+    scraper.lock = threading.Lock()
+    scraper.total_scraped = 0
+    scraper.image_size = None
+    scraper.record_name = 'production'
+    session = FakeSession(body=LONG_PRODUCT_PAGE)
+
+    extractor = IncrementalProductExtractor(required=('name', 'price'))
+    response = cache.fetch(session, PRODUCT_URL, consumer=extractor.feed, record_extractor='production')
+    assert response.truncated
+    product = scraper.parse_product_details(response, PRODUCT_URL, 'rings', extractor)
+    assert product['name'] == 'The Aria Diamond Ring'
+
+    again = cache.fetch(session, PRODUCT_URL, consumer=IncrementalProductExtractor().feed,
+                        record_extractor='production')
+    assert len(session.requests) == 1
+    assert scraper.parse_product_details(again, PRODUCT_URL, 'rings') == product
+
+def page_response(body):
+    response = requests.Response()
+    response.status_code = 200
+    response.encoding = 'utf-8'
+    response.headers = CaseInsensitiveDict()
+    response._content = body
+    return response
+
+def test_eviction_keeps_bodies_being_stored(tmp_path):
+    body, other = b'a' * 1000, b'b' * 1000
+    cache = ResponseCache(cache_dir=tmp_path / "cache", max_bytes=1500)
+    cache.store("https://www.pcjeweller.com/a.html", page_response(body))
+    body_hash = cache.lookup("https://www.pcjeweller.com/a.html").body_hash
+
+    # Another thread has found this body on disk and is about to insert its own row for it
+    cache.storing[body_hash] += 1
+    cache.store("https://www.pcjeweller.com/b.html", page_response(other))
+    assert cache.lookup("https://www.pcjeweller.com/a.html") is None
+    assert cache._body_path(body_hash).exists()
+    cache.storing[body_hash] -= 1
+
+def test_concurrent_stores_leave_no_dangling_rows(tmp_path):
+    cache = ResponseCache(cache_dir=tmp_path / "cache", max_bytes=5000)
+    bodies = [bytes([65 + i % 3]) * 1000 for i in range(60)]
+
+    def store(i):
+        cache.store(f"https://www.pcjeweller.com/page-{i}.html", page_response(bodies[i]))
+    threads = [threading.Thread(target=store, args=(i,)) for i in range(len(bodies))]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    assert not cache.storing
+    for (body_hash,) in cache.db.execute("SELECT body_hash FROM entries").fetchall():
+        assert cache._body_path(body_hash).exists()
@@ -0,0 +1,77 @@
+#!/usr/bin/env python3
+"""Product fields from JSON-LD and OpenGraph, and their precedence over the DOM
+
+Run offline with: python -m pytest -q test_structured_data.py
+"""
+
+from pathlib import Path
+
+import requests
+
+from all_jewellery_scraper import AllJewelleryScraper
+from selector_profiler import SelectorProfiler
+from structured_data import extract_structured_fields
+
+FIXTURES = Path(__file__).parent / "test_fixtures"
+BASE_URL = "https://www.pcjeweller.com"
+PRODUCT_URL = BASE_URL + "/the-noor-gold-ring-nr01.html"
+STRUCTURED_PAGE = (FIXTURES / "structured_page.html").read_bytes()
+
+def test_json_ld_product_despite_malformed_script():
+    fields = extract_structured_fields(STRUCTURED_PAGE, BASE_URL)
+    assert fields['name'] == "The Noor Gold Ring"
+    assert fields['sku'] == "NOOR-1"
+    assert fields['brand'] == "PC Jeweller"
+    assert fields['price'] == "₹23,450.50"
+    assert fields['availability'] == "In Stock"
+    # JSON-LD images first, then og:image; relative and scheme-less URLs made absolute
+    assert fields['image_urls'] == [
+        "https://www.pcjeweller.com/public/uploads/catalog/product/preview/n/NOOR-1.jpg",
+        "https://cf-cdn.pcjeweller.com/public/uploads/catalog/product/preview/n/NOOR-2.jpg",
+    ]
+    # Not in the JSON-LD, so OpenGraph fills it
+    assert fields['description'] == "OpenGraph description of the Noor ring."
+    assert fields['keywords'] == "Gold, Ring"
+
+def test_og_title_without_json_ld():
+    page = b'<html><head><meta property="og:title" content=" The Ivy Pendant "></head><body></body></html>'
+    assert extract_structured_fields(page, BASE_URL) == {'name': "The Ivy Pendant"}
+
+def test_only_malformed_json_ld_gives_nothing():
+    page = b'<html><head><script type="application/ld+json">{"@type": "Product", </script></head></html>'
+    assert extract_structured_fields(page, BASE_URL) == {}
+
+class FakeCache:
+    def load_record(self, url, extractor, response):
+        return None
+
+    def save_record(self, url, extractor, response, record):
+        pass
+
+def make_scraper():
+    scraper = AllJewelleryScraper.__new__(AllJewelleryScraper)
+    scraper.response_cache = FakeCache()
+    scraper.record_name = 'all_jewellery'
+    scraper.base_url = BASE_URL
+    scraper.image_size = None
+    scraper.selector_profiler = SelectorProfiler(path=None)
+    return scraper
+
+def page_response(content):
+    response = requests.Response()
+    response.status_code = 200
+    response._content = content
+    return response
+
+def test_structured_fields_win_over_dom():
+    product = make_scraper().extract_product_page(PRODUCT_URL, page_response(STRUCTURED_PAGE))
+    assert product['name'] == "The Noor Gold Ring"
+    assert product['price'] == "₹23,450.50"
+    assert product['metal'] == "Gold"
+    assert not any('DOM-ONLY' in url for url in product['image_urls'])
+
+def test_dom_fills_what_structured_data_lacks():
+    page = STRUCTURED_PAGE.replace(b'"offers"', b'"unused_offers"')
+    product = make_scraper().extract_product_page(PRODUCT_URL, page_response(page))
+    assert product['name'] == "The Noor Gold Ring"
+    assert product['price'] == "₹99,999"
@@ -0,0 +1,66 @@
+#!/usr/bin/env python3
+"""URL predictor on links it was not trained on
+
+Run offline with: python -m pytest -q test_url_predictor.py
+"""
+
+import pytest
+
+from url_predictor import ProductUrlPredictor, corpus_examples
+
+# Product pages from outside the training corpus, including other naming templates
+HELD_OUT_PRODUCTS = [
+    "https://www.pcjeweller.com/aria-diamond-ring.html",
+    "https://www.pcjeweller.com/elegant-gold-bangle.html",
+    "https://www.pcjeweller.com/the-ivy-gold-pendant.html",
+    "https://www.pcjeweller.com/the-noor-diamond-nose-pin-ships-faster.html",
+    "https://www.pcjeweller.com/classic-mangalsutra-gm101.html",
+]
+HELD_OUT_OTHER = [
+    "https://www.pcjeweller.com/jewellery/rings.html",
+    "https://www.pcjeweller.com/jewellery/gold-bangles.html",
+    "https://www.pcjeweller.com/collections/wedding.html",
+]
+
+@pytest.fixture(scope="module")
+def examples():
+    examples = corpus_examples()
+    if not any(is_product for _, is_product in examples):
+        pytest.skip("saved link corpus not available")
+    return examples
+
+@pytest.fixture(scope="module")
+def predictor(examples):
+    predictor = ProductUrlPredictor()
+    predictor.train(examples)
+    return predictor
+
+def test_held_out_products_are_never_dropped(predictor):
+    for url in HELD_OUT_PRODUCTS:
+        assert not predictor.droppable(url), (url, predictor.probability(url))
+
+def test_confident_category_pages_are_dropped(predictor):
+    for url in HELD_OUT_OTHER:
+        assert predictor.droppable(url), (url, predictor.probability(url))
+
+def test_partition_keeps_every_url(predictor):
+    urls = HELD_OUT_PRODUCTS + HELD_OUT_OTHER
+    likely, unlikely = predictor.partition(urls)
+    assert sorted(likely + unlikely) == sorted(urls)
+    assert not set(likely) & set(HELD_OUT_OTHER)
+
+def test_corpus_products_held_out(examples):
+    """Train without every third product and check none of those would be dropped"""
+    products = [url for url, is_product in examples if is_product]
+    held_out = set(products[::3])
+    predictor = ProductUrlPredictor()
+    predictor.train([(url, is_product) for url, is_product in examples if url not in held_out])
+    for url in held_out:
+        assert not predictor.droppable(url), url
+    likely, _ = predictor.partition(held_out)
+    assert len(likely) >= len(held_out) // 2
+
+def test_untrained_predictor_keeps_everything():
+    predictor = ProductUrlPredictor()
+    assert predictor.probability(HELD_OUT_OTHER[0]) == 0.5
+    assert not predictor.droppable(HELD_OUT_OTHER[0])
@@ -0,0 +1,55 @@
+#!/usr/bin/env python3
+
+import re
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+BASE_URL = "https://www.pcjeweller.com"
+
+# Query parameters that never change the page we get back
+IGNORED_PARAMS = {'bid', 'gclid', 'fbclid'}
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.webp', '.gif', '.avif')
+
+LISTING_PREFIXES = ('/jewellery/', '/collections/', '/gold-coins/', '/special-offer/', '/best-seller')
+
+PRODUCT_KEYWORDS = ('ring', 'earring', 'necklace', 'pendant', 'bracelet', 'bangle',
+                    'chain', 'mangalsutra', 'nose-pin', 'anklet', 'ships-faster')
+
+def normalize_url(url):
+    """Canonical form of a URL for use as a cache / dedup key
+
+    Lower-cases scheme and host, drops default ports and fragments, removes
+    tracking parameters and sorts the remaining query string.
+    """
+    parts = urlsplit(url.strip())
+    scheme = (parts.scheme or 'https').lower()
+    host = parts.hostname or ''
+    if parts.port and not ((scheme == 'http' and parts.port == 80) or (scheme == 'https' and parts.port == 443)):
+        host = f"{host}:{parts.port}"
+    path = parts.path or '/'
+    query = [
+        (key, value) for key, value in parse_qsl(parts.query, keep_blank_values=True)
+        if key not in IGNORED_PARAMS and not key.startswith('utm_')
+    ]
+    return urlunsplit((scheme, host, path, urlencode(sorted(query)), ''))
+
+# Root-level product slugs: /the-<name>-diamond-ring[-ships-faster].html, or a name of three or
+# more words ending in a SKU (/classic-mangalsutra-gm101.html). Category and CMS pages such as
+# /rings.html or /gold-rings.html have neither shape
+PRODUCT_SLUG = re.compile(r'^/(the-[a-z0-9-]+|[a-z0-9]+(-[a-z0-9]+)+-[a-z]+\d[a-z0-9]*)\.html$')
+
+def is_product_path(path):
+    """Whether a lower-cased URL path has the shape of a product page"""
+    return bool(PRODUCT_SLUG.match(path)) and any(k in path for k in PRODUCT_KEYWORDS)
+
+def url_kind(url):
+    """Coarse URL class: 'image', 'listing', 'product' or 'page'"""
+    parts = urlsplit(url)
+    path = parts.path.lower()
+    if path.endswith(IMAGE_EXTENSIONS) or (parts.hostname or '').startswith('cf-cdn.'):
+        return 'image'
+    if re.search(r'(^|&)(page|p)=\d+', parts.query) or path.startswith(LISTING_PREFIXES):
+        return 'listing'
+    if is_product_path(path):
+        return 'product'
+    return 'page'
@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+
+import json
+import logging
+import math
+import re
+import threading
+from urllib.parse import urlsplit
+from url_patterns import BASE_URL, normalize_url, url_kind
+
+logger = logging.getLogger(__name__)
+
+# Link dumps saved by the discovery scripts: [{url, text, title, ...}, ...]
+DEFAULT_LINK_CORPUS = ('pcjeweller_links.json', 'all_links_selenium.json', 'product_links_selenium.json')
+
+# Anchors that only ever point at a product page on listing tiles
+PRODUCT_ANCHOR_TITLES = {'view details'}
+PRODUCT_ANCHOR_TEXTS = {'buy now'}
+
+# P(product) below which a link counts as a confident non-product. The model learns from a
+# few dozen labelled links, so only near-certain misses may be dropped outright
+DEFAULT_DROP_BELOW = 0.01
+
+TOKEN_SPLIT = re.compile(r'[/\-_.]+')
+
+def url_features(url):
+    """Path tokens plus a few structural tokens (depth, first word, length bucket)"""
+    path = urlsplit(url).path.lower()
+    if path.endswith('.html'):
+        path = path[:-5]
+    tokens = [token for token in TOKEN_SPLIT.split(path) if token]
+    features = [f"depth={path.count('/')}", f"words={min(len(tokens), 8)}"]
+    if tokens:
+        features.append(f"first={tokens[0]}")
+    features.extend(tokens)
+    return features
+
+def corpus_examples(paths=DEFAULT_LINK_CORPUS, base_url=BASE_URL):
+    """(url, is_product) for every same-site .html link in the saved link dumps
+
+    A URL is labelled a product if any anchor pointing at it is a listing
+    tile's 'View Details' / 'BUY NOW' link.
+    """
+    host = urlsplit(base_url).hostname
+    labels = {}
+    for path in paths:
+        try:
+            with open(path, 'r', encoding='utf-8') as f:
+                links = json.load(f)
+        except (FileNotFoundError, json.JSONDecodeError) as e:
+            logger.warning(f"⚠️  Skipping link corpus {path}: {e}")
+            continue
+        for link in links:
+            url = link.get('url', '')
+            parts = urlsplit(url)
+            if parts.hostname != host or not parts.path.endswith('.html'):
+                continue
+            key = normalize_url(url.split('?')[0])
+            is_product = ((link.get('title') or '').strip().lower() in PRODUCT_ANCHOR_TITLES
+                          or (link.get('text') or '').strip().lower() in PRODUCT_ANCHOR_TEXTS)
+            labels[key] = labels.get(key, False) or is_product
+    return list(labels.items())
+
+class ProductUrlPredictor:
+    """Naive Bayes over URL tokens: how likely a link is a product page, before fetching it
+
+    Trained on labelled (url, is_product) examples, by default the saved
+    link corpus. Structural tokens (root-level slug, 'the-' prefix, many
+    words) carry over to product names never seen in training.
+    threshold orders links (partition); drop_below decides which ones
+    are safe to skip entirely (droppable).
+    """
+
+    def __init__(self, threshold=0.5, drop_below=DEFAULT_DROP_BELOW, smoothing=1.0):
+        self.threshold = threshold
+        self.drop_below = drop_below
+        self.smoothing = smoothing
+        self.counts = {True: {}, False: {}}
+        self.totals = {True: 0, False: 0}
+        self.documents = {True: 0, False: 0}
+        self.vocabulary = set()
+
+    @classmethod
+    def from_corpus(cls, paths=DEFAULT_LINK_CORPUS, **kwargs):
+        predictor = cls(**kwargs)
+        examples = corpus_examples(paths)
+        predictor.train(examples)
+        logger.info(f"🔮 URL predictor trained on {len(examples)} links "
+                    f"({predictor.documents[True]} products)")
+        return predictor
+
+    def train(self, examples):
+        for url, is_product in examples:
+            is_product = bool(is_product)
+            self.documents[is_product] += 1
+            counts = self.counts[is_product]
+            for feature in url_features(url):
+                counts[feature] = counts.get(feature, 0) + 1
+                self.totals[is_product] += 1
+                self.vocabulary.add(feature)
+
+    def probability(self, url):
+        """P(product | url tokens); 0.5 before any training"""
+        if not (self.documents[True] and self.documents[False]):
+            return 0.5
+        total_documents = self.documents[True] + self.documents[False]
+        vocabulary = len(self.vocabulary) + 1
+        scores = {}
+        for label in (True, False):
+            score = math.log(self.documents[label] / total_documents)
+            denominator = self.totals[label] + self.smoothing * vocabulary
+            counts = self.counts[label]
+            for feature in url_features(url):
+                score += math.log((counts.get(feature, 0) + self.smoothing) / denominator)
+            scores[label] = score
+        # Normalise in log space
+        top = max(scores.values())
+        product, other = math.exp(scores[True] - top), math.exp(scores[False] - top)
+        return product / (product + other)
+
+    def is_product(self, url):
+        return self.probability(url) >= self.threshold
+
+    def partition(self, urls):
+        """(likely products, most likely first; predicted non-products)"""
+        scored = sorted(((self.probability(url), url) for url in urls), reverse=True)
+        likely = [url for p, url in scored if p >= self.threshold]
+        unlikely = [url for p, url in scored if p < self.threshold]
+        return likely, unlikely
+
+    def droppable(self, url):
+        """Whether a link is confidently not a product: the model is near certain and the URL has no product keyword"""
+        return url_kind(url) != 'product' and self.probability(url) < self.drop_below
+
+_shared_predictor = None
+_shared_lock = threading.Lock()
+
+def get_url_predictor():
+    """Return the process-wide URL predictor, trained on the saved link corpus"""
+    global _shared_predictor
+    with _shared_lock:
+        if _shared_predictor is None:
+            _shared_predictor = ProductUrlPredictor.from_corpus()
+        return _shared_predictor